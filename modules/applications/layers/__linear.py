@@ -8,6 +8,9 @@
 @Copyright 2021 Conghao Wong, All Rights Reserved.
 """
 
+from functools import lru_cache
+
+import numpy as np
 import tensorflow as tf
 
 
@@ -77,23 +80,49 @@ class LinearInterpolation(tf.keras.layers.Layer):
         :param value: values, shape = `(..., n, 2)`
         :return yp: linear interpolations, shape = `(..., m, 2)`
         """
+        return self.interpolate(index, value)
 
-        x = index
-        y = value
-
-        linear_results = []
-        for output_index in range(x.shape[0] - 1):
-            p_start = x[output_index]
-            p_end = x[output_index+1]
-
-            # shape = (..., 2)
-            start = tf.gather(y, output_index, axis=-2)
-            end = tf.gather(y, output_index+1, axis=-2)
-
-            for p in tf.range(p_start+1, p_end+1):
-                linear_results.append(tf.expand_dims(
-                    (end - start) * (p - p_start) / (p_end - p_start)
-                    + start, axis=-2))   # (..., 1, 2)
+    @staticmethod
+    def interpolate(index, value) -> tf.Tensor:
+        """
+        Piecewise linear interpolation, computed as one product with
+        the interpolation matrix of `index`.
+        Values of `index` should be known when tracing graphs
+        (for example, constants).
 
-        # shape = (..., n, 2)
-        return tf.concat(linear_results, axis=-2)
+        :param index: index, shape = `(n)`, where `m = index[-1] - index[0]`
+        :param value: values, shape = `(..., n, 2)`
+        :return yp: linear interpolations, shape = `(..., m, 2)`
+        """
+        if isinstance(index, (tf.Tensor, tf.Variable)):
+            index = tf.get_static_value(index)
+            if index is None:
+                raise ValueError('Index of the interpolation should be ' +
+                                 'known when tracing graphs.')
+
+        index = tuple(np.asarray(index, dtype=np.float32).reshape([-1]))
+        matrix = tf.constant(interpolation_matrix(index),
+                             dtype=tf.as_dtype(value.dtype))
+        return tf.einsum('mn,...nd->...md', matrix, value)
+
+
+@lru_cache(maxsize=None)
+def interpolation_matrix(index: tuple[float]) -> np.ndarray:
+    """
+    Weights of the piecewise linear interpolation, i.e.,
+    `yp = matrix @ y`. Each output step only depends on the two
+    nearest points of `index`.
+    Matrices are cached for each `index`.
+
+    :param index: index, shape = `(n)`, where `m = index[-1] - index[0]`
+    :return matrix: interpolation weights, shape = `(m, n)`
+    """
+    rows = []
+    for i, (p_start, p_end) in enumerate(zip(index[:-1], index[1:])):
+        for p in np.arange(p_start + 1, p_end + 1, dtype=np.float32):
+            w = (p - p_start) / (p_end - p_start)
+            row = np.zeros(len(index), dtype=np.float32)
+            row[i], row[i+1] = 1.0 - w, w
+            rows.append(row)
+
+    return np.array(rows, dtype=np.float32).reshape([-1, len(index)])
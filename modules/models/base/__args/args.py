@@ -106,6 +106,24 @@ class BaseTrainArgs(BaseArgs):
         """
         return self._get('gpu', '0', changeable=True)
 
+    @property
+    def graph_mode(self) -> int:
+        """
+        Controls if run the model forward (with its pre-process and
+        post-process) and train steps as compiled graphs (`tf.function`).
+        Models whose forward can not be traced run eagerly.
+        """
+        return self._get('graph_mode', 0, changeable=True)
+
+    @property
+    def jit(self) -> int:
+        """
+        Controls if compile graphs of the model forward and train steps
+        with XLA (`jit_compile=True`). It also turns on `graph_mode`.
+        Graphs that XLA can not compile run without XLA.
+        """
+        return self._get('jit', 0, changeable=True)
+
     @property
     def save_base_dir(self) -> str:
         """
@@ -70,10 +70,13 @@ class BaseObject():
         Log infomation to files and console
 
         :param s: text to log
-        :param level: log level, canbe `'info'` or `'error'` or `'debug'`
+        :param level: log level, canbe `'info'` or `'warning'` or `'error'` or `'debug'`
         """
         if level == 'info':
             self.logger.info(s)
+
+        elif level == 'warning':
+            self.logger.warning(s)
         
         elif level == 'error':
             self.logger.error(s)
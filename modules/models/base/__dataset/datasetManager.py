@@ -29,6 +29,7 @@ class DatasetManager(BaseObject):
     >>> self.args   # args
     >>> self.dataset_name # name
     >>> self.dataset_info # dataset info
+    >>> self.cache_root # folder to save caches
     ```
 
     Public Methods
@@ -45,6 +46,9 @@ class DatasetManager(BaseObject):
     arg_type = Args
     agent_type = Agent
 
+    # folder to save caches of all datasets
+    cache_root = './dataset_npz'
+
     def __init__(self, args: arg_type, dataset_name: str):
         super().__init__()
         self._args = args
@@ -103,7 +107,7 @@ class DatasetsManager(BaseObject):
         :param mode: load mode, canbe `'test'` or `'train'`
         :return agents: loaded agents. It returns a list of `[train_agents, test_agents]` when `mode` is `'train'`.
         """
-        dir_check('./dataset_npz')
+        dir_check(cls.datasetManager_type.cache_root)
         Dm = cls(args)
 
         if dataset == 'auto':
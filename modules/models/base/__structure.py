@@ -58,8 +58,15 @@ class Model(tf.keras.Model):
     (method) pre_process: (self: Model, model_inputs: list[Tensor], training=None, *args, **kwargs) -> list[Tensor]
     (method) post_process: (self: Model, outputs: list[Tensor], training=None, *args, **kwargs) -> list[Tensor]
     ```
+
+    Set `graph_compatible = False` in models whose `forward` can not run
+    as a graph (for example, it samples with `numpy` when training, and
+    samples would be frozen when tracing).
     """
 
+    # if `forward` can be traced into a graph (see `args.graph_mode`)
+    graph_compatible = True
+
     def __init__(self, Args: Union[Namespace, ArgType],
                  training_structure=None,
                  *args, **kwargs):
@@ -199,6 +206,9 @@ class Structure(BaseObject):
     # Gradient densest operation
     (method) gradient_operations: (self: Structure, model_inputs, gt, loss_move_average: Variable, **kwargs) -> tuple[Tensor, dict[str, Tensor], Tensor]
 
+    # Run a function as a compiled graph (`args.graph_mode`)
+    (method) call_graph_function: (self: Structure, name: str, python_function, *inputs) -> Any
+
     # Entrance of train or test
     (method) run_train_or_test: (self: Structure) -> None
 
@@ -230,6 +240,10 @@ class Structure(BaseObject):
 
         self.important_args = ['lr']
 
+        # compiled functions (`tf.function`) and their trace counts
+        self._graph_functions = {}
+        self.trace_counts = {}
+
     def gpu_config(self):
         os.environ["CUDA_DEVICE_ORDER"] = "PCI_BUS_ID"
         os.environ["CUDA_VISIBLE_DEVICES"] = self.args.gpu.replace('_', ',')
@@ -327,8 +341,91 @@ class Structure(BaseObject):
         :param mode: forward type, canbe `'test'` or `'train'`
         :return outputs: a list (or tuple) of tensor
         """
+        # only tensor inputs are traced, other args run eagerly
+        if self.use_graph and not (args or kwargs):
+            return self.call_graph_function(
+                'forward_{}'.format(training),
+                lambda inputs: self.model.forward(inputs, training),
+                tuple(model_inputs))
+
         return self.model.forward(model_inputs, training, **kwargs)
 
+    @property
+    def use_graph(self) -> bool:
+        """
+        If the model forward and train steps run as graphs.
+        """
+        return bool((self.args.graph_mode or self.args.jit) and
+                    getattr(self.model, 'graph_compatible', False))
+
+    def call_graph_function(self, name: str, python_function, *inputs):
+        """
+        Call `python_function` on `inputs` as a `tf.function`.
+        Functions are made with input signatures of `inputs` (where the
+        batch dimension can be any size), so that partial batches do not
+        retrace them. A new trace is only made (and logged) when other
+        dimensions of inputs change.
+        For each signature, the first call runs eagerly to build all
+        variables. If tracing fails, it keeps running eagerly.
+        Graphs are compiled with XLA when `args.jit` is set. If XLA
+        fails to compile them, they run as plain graphs.
+
+        :param name: name of the function
+        :param python_function: the function to compile, which only
+            takes (nested structures of) tensors as its inputs
+        :param inputs: inputs to the function
+        """
+        signature = tf.nest.map_structure(_relaxed_spec, inputs)
+        key = (name, str(signature))
+
+        if not key in self._graph_functions.keys():
+            self._graph_functions[key] = _EAGER_ONCE
+            return python_function(*inputs)
+
+        if (function := self._graph_functions[key]) is _EAGER_ONCE:
+            jit = bool(self.args.jit)
+            function = self._trace(name, python_function, signature, jit)
+            self._graph_functions[key] = function
+
+            # XLA compiles the graph when it is called for the first time
+            if jit and function is not None:
+                try:
+                    return function(*inputs)
+                except tf.errors.OpError as e:
+                    self.log('Failed to compile `{}` with XLA, '.format(name) +
+                             'run it without XLA. ({}: {})'.format(
+                                 type(e).__name__, e.message),
+                             level='warning')
+                    function = self._trace(name, python_function,
+                                           signature, False)
+                    self._graph_functions[key] = function
+
+        if function is None:
+            return python_function(*inputs)
+
+        return function(*inputs)
+
+    def _trace(self, name: str, python_function, signature, jit: bool):
+        """
+        Make a `tf.function` with the input signature and trace it.
+        Return `None` if it can not be traced.
+        """
+        self.trace_counts[name] = self.trace_counts.get(name, 0) + 1
+        self.log('Tracing `{}` ({} traces{}) with input signature {}.'.format(
+            name, self.trace_counts[name], ', XLA' if jit else '', signature))
+
+        function = tf.function(python_function,
+                               input_signature=list(signature),
+                               jit_compile=jit)
+        try:
+            function.get_concrete_function()
+        except Exception as e:
+            self.log('Failed to trace `{}`, run it eagerly. ({}: {})'.format(
+                name, type(e).__name__, e), level='warning')
+            function = None
+
+        return function
+
     def loss(self, outputs, labels, loss_name_list: list[str] = ['L2'], *args, **kwargs) -> tuple[tf.Tensor, dict[str, tf.Tensor]]:
         """
         Train loss, using L2 loss by default.
@@ -392,6 +489,21 @@ class Structure(BaseObject):
         :return loss_dict: a dict of all loss functions
         :return loss_move_average: Moving average loss
         """
+        # args other than tensors (like `epoch`) are not traced
+        if self.use_graph:
+            return self.call_graph_function(
+                'train_step', self._gradient_operations,
+                tuple(model_inputs), gt,
+                tf.convert_to_tensor(loss_move_average))
+
+        return self._gradient_operations(model_inputs, gt,
+                                         loss_move_average, **kwargs)
+
+    def _gradient_operations(self, model_inputs,
+                             gt,
+                             loss_move_average: tf.Tensor,
+                             **kwargs) -> tuple[tf.Tensor, dict[str, tf.Tensor], tf.Tensor]:
+
         with tf.GradientTape() as tape:
             model_output = self.model_forward(
                 model_inputs, training=True, gt=gt)
@@ -728,6 +840,20 @@ class Structure(BaseObject):
         return results
 
 
+# marks functions whose next call should be traced
+_EAGER_ONCE = 'eager_once'
+
+
+def _relaxed_spec(tensor) -> tf.TensorSpec:
+    """
+    Spec of a tensor whose batch dimension can be any size.
+    """
+    tensor = tf.convert_to_tensor(tensor)
+    shape = tensor.shape.as_list()
+    return tf.TensorSpec([None] + shape[1:] if len(shape) else [],
+                         tensor.dtype)
+
+
 def append_results_to_list(results: list[tf.Tensor], target: list):
     if not len(target):
         [target.append([]) for _ in range(len(results))]
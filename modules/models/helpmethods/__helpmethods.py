@@ -9,9 +9,11 @@
 """
 
 __all__ = ['dir_check', 'softmax', 'predict_linear_for_person',
+           'predict_linear', 'linear_predict_operator',
            'GraphConv_layer', 'GraphConv_func', 'BatchIndex', ]
 
 import os
+from functools import lru_cache
 
 import numpy as np
 import tensorflow as tf
@@ -33,19 +35,51 @@ def softmax(x):
     return np.exp(x)/np.sum(np.exp(x), axis=0)
 
 
-def __predict_linear(x, y, x_p, diff_weights=0):
-    if diff_weights == 0:
-        P = np.diag(np.ones(shape=[x.shape[0]]))
+@lru_cache(maxsize=None)
+def linear_predict_operator(obs_length: int,
+                            time_pred: int,
+                            different_weights=0.95) -> np.ndarray:
+    """
+    Get the (weighted) least squares linear prediction operator `M`,
+    where `M @ position` gives the linear prediction of `position`.
+    Formally, `M = A_p (A^T P A)^{-1} A^T P`.
+    Operators are computed once for each set of inputs and then cached.
+
+    :param obs_length: length of the observed trajectories
+    :param time_pred: length of the predictions (including observations)
+    :param different_weights: weights for different time steps
+    :return M: the operator, shape = `(time_pred, obs_length)`
+    """
+    t = np.arange(obs_length)
+    t_p = np.arange(time_pred)
+
+    if different_weights == 0:
+        P = np.diag(np.ones(shape=[obs_length]))
     else:
-        P = np.diag(softmax([(i+1)**diff_weights for i in range(x.shape[0])]))
+        P = np.diag(softmax([(i+1)**different_weights
+                             for i in range(obs_length)]))
 
-    A = np.stack([np.ones_like(x), x]).T
-    A_p = np.stack([np.ones_like(x_p), x_p]).T
-    Y = y.T
-    B = np.matmul(np.matmul(np.matmul(np.linalg.inv(
-        np.matmul(np.matmul(A.T, P), A)), A.T), P), Y)
-    Y_p = np.matmul(A_p, B)
-    return Y_p, B
+    A = np.stack([np.ones_like(t), t]).T
+    A_p = np.stack([np.ones_like(t_p), t_p]).T
+    M = np.matmul(np.matmul(np.matmul(A_p, np.linalg.inv(
+        np.matmul(np.matmul(A.T, P), A))), A.T), P)
+
+    M.flags.writeable = False
+    return M
+
+
+def predict_linear(positions: np.ndarray, time_pred: int,
+                   different_weights=0.95) -> np.ndarray:
+    """
+    Linear prediction for a batch of trajectories with one matmul.
+
+    :param positions: observed trajectories, shape = `(..., obs, 2)`
+    :param time_pred: length of the predictions (including observations)
+    :return predictions: shape = `(..., time_pred, 2)`
+    """
+    M = linear_predict_operator(positions.shape[-2], time_pred,
+                                different_weights)
+    return np.matmul(M, positions)
 
 
 def predict_linear_for_person(position, time_pred, different_weights=0.95) -> np.ndarray:
@@ -53,16 +87,7 @@ def predict_linear_for_person(position, time_pred, different_weights=0.95) -> np
     对二维坐标的最小二乘拟合
     注意：`time_pred`中应当包含现有的长度，如`len(position)=8`, `time_pred=20`时，输出长度为20
     """
-    time_obv = position.shape[0]
-    t = np.arange(time_obv)
-    t_p = np.arange(time_pred)
-    x = position.T[0]
-    y = position.T[1]
-
-    x_p, _ = __predict_linear(t, x, t_p, diff_weights=different_weights)
-    y_p, _ = __predict_linear(t, y, t_p, diff_weights=different_weights)
-
-    return np.stack([x_p, y_p]).T
+    return predict_linear(position, time_pred, different_weights)
 
 
 def GraphConv_layer(output_units, activation=None):
@@ -13,7 +13,7 @@ import copy
 import numpy as np
 
 from .. import base
-from ..helpmethods import predict_linear_for_person
+from ..helpmethods import predict_linear
 
 
 class PredictionAgent(base.Agent):
@@ -204,7 +204,7 @@ class PredictionAgent(base.Agent):
         self.total_frame = (end_frame - start_frame) // frame_step
 
         # Trajectory
-        whole_traj = target_agent.traj[start_frame:end_frame:frame_step]
+        whole_traj = target_agent.get_traj(start_frame, end_frame, frame_step)
         frame_list_current = frame_list[start_frame:end_frame:frame_step]
 
         # data strengthen: noise
@@ -217,15 +217,10 @@ class PredictionAgent(base.Agent):
         self.groundtruth = whole_traj[self.obs_length:]
         self.frame_list_future = frame_list_current[self.obs_length:]
 
-        if linear_predict:
-            self.pred_linear = predict_linear_for_person(
-                self.traj, time_pred=self.total_frame)[self.obs_length:]
-
         # Neighbor info
         self.neighbor_traj = []
-        self.neighbor_traj_linear_pred = []
         for neighbor in neighbor_agents:
-            neighbor_traj = neighbor.traj[start_frame:obs_frame:frame_step]
+            neighbor_traj = neighbor.get_traj(start_frame, obs_frame, frame_step)
             if neighbor_traj.max() >= 5000:
                 available_index = np.where(neighbor_traj.T[0] <= 5000)[0]
                 neighbor_traj[:available_index[0],
@@ -234,10 +229,15 @@ class PredictionAgent(base.Agent):
                               :] = neighbor_traj[available_index[-1]]
             self.neighbor_traj.append(neighbor_traj)
 
-            if linear_predict:
-                pred = predict_linear_for_person(neighbor_traj, time_pred=self.total_frame)[
-                    self.obs_length:]
-                self.neighbor_traj_linear_pred.append(pred)
+        # Linear predictions of the target and all neighbors (in one batch)
+        self.neighbor_traj_linear_pred = []
+        if linear_predict:
+            preds = predict_linear(np.array([self.traj] +
+                                            self.neighbor_traj),
+                                   time_pred=self.total_frame)[:, self.obs_length:]
+
+            self.pred_linear = preds[0]
+            self.neighbor_traj_linear_pred = list(preds[1:])
 
         self.neighbor_number = len(neighbor_agents)
         return self
@@ -0,0 +1,534 @@
+"""
+@Author: Conghao Wong
+@Date: 2026-10-18 14:10:42
+@LastEditors: Conghao Wong
+@LastEditTime: 2026-10-18 15:02:19
+@Description: file content
+@Github: https://github.com/conghaowoooong
+@Copyright 2022 Conghao Wong, All Rights Reserved.
+"""
+
+import os
+import shutil
+from typing import Union
+
+import numpy as np
+
+from .__agent import PredictionAgent
+from .__mapStore import MapStore
+
+
+class AgentBatch():
+    """
+    AgentBatch
+    ----------
+    A batch of agents stored as contiguous arrays (struct-of-arrays).
+    It replaces the `list[PredictionAgent]` passed among the dataset
+    managers and the training structure, so that model inputs can be
+    got by slicing arrays rather than looping over agent objects.
+    Neighbors of all agents are stored as ragged arrays with offsets,
+    i.e., neighbors of the i-th agent are
+    `all_neighbor_traj[neighbor_offsets[i]:neighbor_offsets[i+1]]`.
+    When `neighbor_index` is given, neighbor arrays are shared tables
+    (for example, a `NeighborCache`), and neighbors of the i-th agent
+    are rows `neighbor_index[neighbor_offsets[i]:neighbor_offsets[i+1]]`
+    of them, so that agents with the same neighbors do not copy them.
+    Their zero-padded forms are given by `neighbor_traj` and
+    `neighbor_traj_linear_pred`, with valid items in `neighbor_mask`.
+    Batches sampled from datasets store `traj`, `groundtruth`, and
+    `pred_linear` as `float32` (the same as `PredictionAgent`), and
+    neighbor arrays keep the dtype of the scene data (`float64`).
+    Agents that predict until the end of their trajectories
+    (`pred_frames == -1`) have futures with different lengths.
+    Their futures are padded with their last steps to the longest one,
+    so that `groundtruth[:, -1]` are still their destinations, and
+    only the first `future_length[i]` future steps of the i-th agent
+    (and its neighbors' linear predictions) are valid.
+
+    Properties
+    ----------
+    ```python
+    >>> self.traj           # observed trajectories, shape = (n, obs, 2)
+    >>> self.groundtruth    # future trajectories, shape = (n, pred, 2)
+    >>> self.pred_linear    # linear predictions, shape = (n, pred, 2)
+    >>> self.pred           # predictions, shape = (n, pred, 2)
+    >>> self.frame_list     # frame ids, shape = (n, obs + pred)
+    >>> self.future_length  # (optional) future steps of agents, shape = (n)
+    >>> self.neighbor_offsets       # offsets of neighbors, shape = (n + 1)
+    >>> self.neighbor_index         # (optional) rows of neighbors, shape = (m)
+    >>> self.all_neighbor_traj      # shape = (m, obs, 2)
+    >>> self.all_neighbor_linear_pred   # shape = (m, pred, 2)
+    >>> self.neighbor_number        # number of neighbors, shape = (n)
+    >>> self.neighbor_traj          # shape = (n, max_neighbor, obs, 2)
+    >>> self.neighbor_traj_linear_pred  # shape = (n, max_neighbor, pred, 2)
+    >>> self.neighbor_mask  # valid neighbors, shape = (n, max_neighbor)
+    >>> self.maps           # context maps (array or `MapStore`), shape = (n, h, w)
+    >>> self.map_paras      # map parameters, shape = (n, 2, 2)
+    ```
+
+    Public Methods
+    --------------
+    ```python
+    # make the batch from a list of agents
+    (method) from_agents: (cls: Type[AgentBatch], agents: list[PredictionAgent]) -> AgentBatch
+
+    # concatenate several batches
+    (method) concat: (cls: Type[AgentBatch], batches: list[AgentBatch]) -> AgentBatch
+
+    # number of (valid) future steps of each agent
+    (method) get_future_length: (self: AgentBatch) -> ndarray
+
+    # assign context maps to all agents
+    (method) set_maps: (self: AgentBatch, maps: ndarray, paras: ndarray) -> None
+
+    # get one agent (as a `PredictionAgent` view), or a sub-batch
+    (method) __getitem__: (self: AgentBatch, index: int | slice | ndarray) -> (PredictionAgent | AgentBatch)
+
+    # save to or load from a folder of `.npy` files
+    (method) save: (self: AgentBatch, save_dir: str) -> None
+    (method) load: (cls: Type[AgentBatch], save_dir: str, mmap_mode='r') -> AgentBatch
+    ```
+    """
+
+    __version__ = 2.0
+
+    _save_items = ['traj', 'groundtruth', 'frame_list',
+                   'neighbor_offsets', 'neighbor_index', 'all_neighbor_traj',
+                   'pred_linear', 'all_neighbor_linear_pred',
+                   'future_length']
+
+    def __init__(self, traj: np.ndarray,
+                 groundtruth: np.ndarray,
+                 frame_list: np.ndarray,
+                 neighbor_offsets: np.ndarray = None,
+                 all_neighbor_traj: np.ndarray = None,
+                 pred_linear: np.ndarray = None,
+                 all_neighbor_linear_pred: np.ndarray = None,
+                 neighbor_index: np.ndarray = None,
+                 future_length: np.ndarray = None):
+        """
+        Linear predictions (`pred_linear` and `all_neighbor_linear_pred`)
+        can be `None` when agents are sampled without linear predictions.
+
+        :param neighbor_index: (optional) rows of all neighbors in
+            `all_neighbor_traj` and `all_neighbor_linear_pred`.
+            Neighbors are stored in order (without indexes) if it is `None`.
+        :param future_length: (optional) number of valid future steps of
+            each agent. All future steps are valid if it is `None`.
+        """
+
+        self.traj = traj
+        self.groundtruth = groundtruth
+        self.frame_list = frame_list
+        self.pred_linear = pred_linear
+        self.future_length = future_length
+
+        if neighbor_offsets is None:
+            neighbor_offsets = np.zeros(len(traj) + 1, dtype=np.int64)
+
+        if all_neighbor_traj is None:
+            all_neighbor_traj = np.zeros([0, traj.shape[1], 2])
+
+        self.neighbor_offsets = neighbor_offsets
+        self.neighbor_index = neighbor_index
+        self.all_neighbor_traj = all_neighbor_traj
+        self.all_neighbor_linear_pred = all_neighbor_linear_pred
+
+        self.pred: np.ndarray = None
+        self.maps: np.ndarray = None
+        self.map_paras: np.ndarray = None
+
+        self._padded = {}
+
+    @property
+    def linear_predict(self) -> bool:
+        return self.pred_linear is not None
+
+    @property
+    def obs_length(self) -> int:
+        return self.traj.shape[1]
+
+    @property
+    def total_frame(self) -> int:
+        """
+        number of all (observed and padded future) steps
+        """
+        return self.traj.shape[1] + self.groundtruth.shape[1]
+
+    def get_future_length(self) -> np.ndarray:
+        """
+        Get the number of valid future steps of each agent.
+
+        :return length: number of future steps, shape = `(n)`
+        """
+        if self.future_length is not None:
+            return self.future_length
+
+        return np.full(len(self), self.groundtruth.shape[1], dtype=np.int64)
+
+    @property
+    def neighbor_number(self) -> np.ndarray:
+        """
+        number of neighbors of each agent, shape = `(n)`
+        """
+        return np.diff(self.neighbor_offsets)
+
+    @property
+    def neighbor_traj(self) -> np.ndarray:
+        """
+        zero-padded observed trajectories of neighbors,
+        shape = `(n, max_neighbor, obs, 2)`
+        """
+        return self._get_padded('all_neighbor_traj')
+
+    @property
+    def neighbor_traj_linear_pred(self) -> np.ndarray:
+        """
+        zero-padded linear predictions of neighbors,
+        shape = `(n, max_neighbor, pred, 2)`
+        """
+        return self._get_padded('all_neighbor_linear_pred')
+
+    @property
+    def neighbor_mask(self) -> np.ndarray:
+        """
+        valid items in the padded neighbor arrays,
+        shape = `(n, max_neighbor)`
+        """
+        count = self.neighbor_number
+        max_neighbor = count.max() if len(count) else 0
+        return np.arange(max_neighbor)[np.newaxis, :] < count[:, np.newaxis]
+
+    def _get_ragged(self, name: str) -> np.ndarray:
+        """
+        Get the ragged array of neighbors that only contains
+        neighbors of agents in this batch.
+        """
+        start, end = self.neighbor_offsets[0], self.neighbor_offsets[-1]
+        if self.neighbor_index is None:
+            return getattr(self, name)[start:end]
+        else:
+            return getattr(self, name)[self.neighbor_index[start:end]]
+
+    def _get_rows(self) -> tuple[np.ndarray, Union[slice, np.ndarray]]:
+        """
+        Get rows of neighbor arrays used by agents in this batch.
+
+        :return index: index of each neighbor in the used rows, shape = `(m)`
+        :return rows: used rows of neighbor arrays
+        """
+        start, end = self.neighbor_offsets[0], self.neighbor_offsets[-1]
+        if self.neighbor_index is None:
+            return np.arange(end - start), slice(start, end)
+
+        rows, index = np.unique(self.neighbor_index[start:end],
+                                return_inverse=True)
+        return index, rows
+
+    def _get_padded(self, name: str) -> np.ndarray:
+        if getattr(self, name) is None:
+            return None
+
+        if not name in self._padded.keys():
+            values = self._get_ragged(name)
+            count = self.neighbor_number
+            max_neighbor = count.max() if len(count) else 0
+            padded = np.zeros((len(self), max_neighbor) + values.shape[1:],
+                              dtype=values.dtype)
+
+            offsets = self.neighbor_offsets - self.neighbor_offsets[0]
+            rows = np.repeat(np.arange(len(self)), count)
+            cols = np.arange(len(values)) - np.repeat(offsets[:-1], count)
+            padded[rows, cols] = values
+            self._padded[name] = padded
+
+        return self._padded[name]
+
+    def __len__(self) -> int:
+        return len(self.traj)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def __getitem__(self, index: Union[int, slice, np.ndarray]):
+        if isinstance(index, (int, np.integer)):
+            return self._get_agent(int(index))
+
+        offsets = self.neighbor_offsets
+        if isinstance(index, slice) and index.step in [None, 1]:
+            # keep views of the ragged arrays
+            start, stop, _ = index.indices(len(self))
+            stop = max(start, stop)
+            new_offsets = offsets[start:stop+1]
+            new_index = self.neighbor_index
+
+        else:
+            # only gather indexes, and share neighbor arrays
+            agents = np.arange(len(self))[index]
+            count = offsets[agents + 1] - offsets[agents]
+            new_offsets = np.concatenate([[0], np.cumsum(count)])
+            new_index = (np.arange(new_offsets[-1]) +
+                         np.repeat(offsets[agents] - new_offsets[:-1], count))
+
+            if self.neighbor_index is not None:
+                new_index = self.neighbor_index[new_index]
+
+        batch = AgentBatch(traj=self.traj[index],
+                           groundtruth=self.groundtruth[index],
+                           frame_list=self.frame_list[index],
+                           neighbor_offsets=new_offsets,
+                           all_neighbor_traj=self.all_neighbor_traj,
+                           pred_linear=_take(self.pred_linear, index),
+                           all_neighbor_linear_pred=self.all_neighbor_linear_pred,
+                           neighbor_index=new_index,
+                           future_length=_take(self.future_length, index))
+
+        batch.pred = _take(self.pred, index)
+        batch.maps = _take(self.maps, index)
+        batch.map_paras = _take(self.map_paras, index)
+        return batch
+
+    def _get_agent(self, index: int) -> PredictionAgent:
+        """
+        Make a `PredictionAgent` whose arrays are views of this batch.
+        """
+        start = self.neighbor_offsets[index]
+        end = self.neighbor_offsets[index+1]
+        rows = (slice(start, end) if self.neighbor_index is None
+                else self.neighbor_index[start:end])
+        obs = self.obs_length
+        pred = (self.groundtruth.shape[1] if self.future_length is None
+                else int(self.future_length[index]))
+        pred_linear = _take(self.pred_linear, index)
+
+        agent = PredictionAgent().load_data({
+            '_traj': self.traj[index],
+            '_traj_future': self.groundtruth[index, :pred],
+            '_traj_pred_linear': _take(pred_linear, slice(pred)),
+            '_frame_list': self.frame_list[index, :obs].tolist(),
+            '_frame_list_future': self.frame_list[index, obs:obs+pred].tolist(),
+            'linear_predict': self.linear_predict,
+            'neighbor_number': int(end - start),
+            'neighbor_traj': list(self.all_neighbor_traj[rows]),
+            'neighbor_traj_linear_pred': (
+                list(self.all_neighbor_linear_pred[rows][:, :pred])
+                if self.linear_predict else []),
+            'obs_length': obs,
+            'total_frame': obs + pred,
+        })
+
+        if self.pred is not None:
+            agent.pred = self.pred[index]
+
+        if self.maps is not None:
+            agent.set_map(self.maps[index], self.map_paras[index])
+
+        return agent
+
+    def set_maps(self, maps: np.ndarray, paras: np.ndarray):
+        """
+        Assign context maps to all agents.
+
+        :param maps: context maps, shape = `(n, h, w)`. It can also be
+            a `MapStore` whose maps are made only when used.
+        :param paras: map parameters of each map, shape = `(n, 2, 2)`
+        """
+        self.maps = maps
+        self.map_paras = paras
+
+    def save(self, save_dir: str):
+        """
+        Save all arrays (except predictions and maps) into a folder
+        as plain `.npy` files, one file for each field.
+        Shared neighbor arrays only keep rows used by this batch.
+        Files are written into a temporary folder first, and then
+        moved to `save_dir`.
+
+        :param save_dir: folder to save the batch
+        """
+        temp_dir = '{}.{}.tmp'.format(save_dir, os.getpid())
+        os.makedirs(temp_dir, exist_ok=True)
+
+        index, rows = self._get_rows()
+        for item in self._save_items:
+            if getattr(self, item) is None:
+                continue
+
+            if item == 'neighbor_offsets':
+                value = self.neighbor_offsets - self.neighbor_offsets[0]
+            elif item == 'neighbor_index':
+                value = index
+            elif item.startswith('all_neighbor'):
+                value = getattr(self, item)[rows]
+            else:
+                value = getattr(self, item)
+
+            np.save(os.path.join(temp_dir, item + '.npy'),
+                    np.ascontiguousarray(value))
+
+        np.savetxt(os.path.join(temp_dir, 'version.txt'),
+                   [self.__version__])
+
+        if os.path.exists(save_dir):
+            shutil.rmtree(save_dir)
+        os.rename(temp_dir, save_dir)
+
+    @classmethod
+    def load(cls, save_dir: str, mmap_mode='r'):
+        """
+        Load the batch from a folder saved by `AgentBatch.save`.
+        Arrays are memory-mapped by default, so that they are read
+        only when used.
+
+        :param save_dir: folder of the saved batch
+        :param mmap_mode: mode to map the files, see `np.load`.
+            Set it to `None` to read all arrays into memory.
+        """
+        arrays = {}
+        for item in cls._save_items:
+            path = os.path.join(save_dir, item + '.npy')
+            if os.path.exists(path):
+                arrays[item] = np.load(path, mmap_mode=mmap_mode)
+
+        return cls(**arrays)
+
+    @classmethod
+    def from_agents(cls, agents: list[PredictionAgent]):
+        """
+        Make the batch from a list of `PredictionAgent` objects.
+        All agents should have the same observation length.
+        Futures with different lengths are padded to the longest one.
+        """
+        if not len(agents):
+            raise ValueError('Can not make a batch from zero agents.')
+
+        obs = len(agents[0].traj)
+        length = np.array([len(a.groundtruth) for a in agents])
+        pred = length.max()
+        linear_predict = all([a.linear_predict for a in agents])
+
+        def stack(items: list[np.ndarray], steps=pred) -> np.ndarray:
+            return np.stack([_pad_steps(np.array(i), steps, axis=0)
+                             for i in items])
+
+        count = [len(a.neighbor_traj) for a in agents]
+        batch = cls(
+            traj=np.stack([a.traj for a in agents]),
+            groundtruth=stack([a.groundtruth for a in agents]),
+            frame_list=stack([a.frame_list for a in agents], steps=obs + pred),
+            neighbor_offsets=np.concatenate([[0], np.cumsum(count)]),
+            all_neighbor_traj=_flatten(
+                [a.neighbor_traj for a in agents], shape=(obs, 2)),
+            pred_linear=(stack([a.pred_linear for a in agents])
+                         if linear_predict else None),
+            all_neighbor_linear_pred=(_flatten(
+                [[_pad_steps(n, pred, axis=0) for n in a.neighbor_traj_linear_pred]
+                 for a in agents],
+                shape=(pred, 2)) if linear_predict else None),
+            future_length=None if np.all(length == pred) else length)
+
+        if all([a.pred is not None for a in agents]):
+            batch.pred = np.stack([a.pred for a in agents])
+
+        if all([a.Map is not None for a in agents]):
+            batch.set_maps(np.stack([a.Map for a in agents]),
+                           np.stack([a.real2grid for a in agents]))
+
+        return batch
+
+    @classmethod
+    def concat(cls, batches: list):
+        """
+        Concatenate several batches into one.
+        Empty batches are skipped, and the first batch is returned
+        if all batches are empty.
+        """
+        non_empty: list[AgentBatch] = [b for b in batches if len(b)]
+        if len(non_empty) <= 1:
+            return non_empty[0] if len(non_empty) else batches[0]
+
+        batches = non_empty
+
+        offsets = [np.zeros(1, dtype=np.int64)]
+        for b in batches:
+            offsets.append(b.neighbor_offsets[1:] -
+                           b.neighbor_offsets[0] + offsets[-1][-1])
+
+        # keep neighbors shared if any batch shares them
+        indexed = any([b.neighbor_index is not None for b in batches])
+        index, rows, count = [], [], 0
+        for b in batches:
+            index_current, rows_current = b._get_rows()
+            index.append(index_current + count)
+            rows.append(rows_current)
+            count += index_current.max() + 1 if len(index_current) else 0
+
+        # futures are padded to the longest one if they have different lengths
+        pred = max([b.groundtruth.shape[1] for b in batches])
+        ragged = any([b.future_length is not None for b in batches])
+
+        def concat(items: list[np.ndarray], steps=pred) -> np.ndarray:
+            return np.concatenate([_pad_steps(i, steps) for i in items])
+
+        linear_predict = all([b.linear_predict for b in batches])
+        batch = cls(
+            traj=np.concatenate([b.traj for b in batches]),
+            groundtruth=concat([b.groundtruth for b in batches]),
+            frame_list=concat([b.frame_list for b in batches],
+                              steps=batches[0].obs_length + pred),
+            neighbor_offsets=np.concatenate(offsets),
+            all_neighbor_traj=np.concatenate(
+                [b.all_neighbor_traj[r] for b, r in zip(batches, rows)]),
+            pred_linear=(concat([b.pred_linear for b in batches])
+                         if linear_predict else None),
+            all_neighbor_linear_pred=(concat(
+                [b.all_neighbor_linear_pred[r] for b, r in zip(batches, rows)])
+                if linear_predict else None),
+            neighbor_index=np.concatenate(index) if indexed else None,
+            future_length=(np.concatenate([b.get_future_length() for b in batches])
+                           if ragged else None))
+
+        if all([b.pred is not None for b in batches]):
+            batch.pred = np.concatenate([b.pred for b in batches])
+
+        if all([isinstance(b.maps, MapStore) for b in batches]):
+            batch.set_maps(MapStore.concat([b.maps for b in batches]),
+                           np.concatenate([b.map_paras for b in batches]))
+
+        elif all([b.maps is not None for b in batches]):
+            batch.set_maps(np.concatenate([b.maps for b in batches]),
+                           np.concatenate([b.map_paras for b in batches]))
+
+        return batch
+
+
+def _take(array: np.ndarray, index):
+    return None if array is None else array[index]
+
+
+def _pad_steps(array: np.ndarray, steps: int, axis=1) -> np.ndarray:
+    """
+    Pad the array to `steps` steps (on `axis`) by repeating its last step.
+    """
+    padding = steps - array.shape[axis]
+    if padding <= 0:
+        return array
+
+    last = np.take(array, [-1], axis=axis)
+    return np.concatenate([array, np.repeat(last, padding, axis=axis)],
+                          axis=axis)
+
+
+def _flatten(items: list[list[np.ndarray]], shape: tuple) -> np.ndarray:
+    """
+    Concatenate lists of arrays into one array,
+    shape = `(total_length, *shape)`.
+
+    :param shape: shape of each array in lists
+    """
+    values = [value for item in items for value in item]
+    if not len(values):
+        return np.zeros((0,) + tuple(shape))
+
+    return np.array(values)
@@ -37,6 +37,8 @@ class PredictionArgs(base.Args):
     def pred_frames(self) -> int:
         """
         Prediction frames.
+        Set it to `-1` to predict until the end of each agent's
+        trajectory (only for models that predict destinations).
         """
         return self._get('pred_frames', 12, changeable=False)
 
@@ -73,6 +75,17 @@ class PredictionArgs(base.Args):
         """
         return self._get('max_batch_size', 20000, changeable=True)
 
+    @property
+    def load_workers(self) -> int:
+        """
+        Number of processes to build dataset caches (agents and maps)
+        of different subsets concurrently.
+        Subsets are built one by one when it is set to `1`.
+        Workers are started with `spawn`, so the entry script should
+        run under `if __name__ == '__main__':` when it is set.
+        """
+        return self._get('load_workers', 1, changeable=True)
+
     @property
     def lr(self) -> float:
         """
@@ -122,6 +135,53 @@ class PredictionArgs(base.Args):
         """
         return self._get('map_half_size', 50, changeable=False)
 
+    @property
+    def map_dtype(self) -> str:
+        """
+        Data type to store social maps on disk, accept `'uint8'`,
+        `'float16'`, and `'float32'`.
+        Maps are dequantized into `float32` only when they are fed
+        into models. Only `'float32'` gives the same maps as before,
+        and `'uint8'` (max error `1/510`) or `'float16'` save disk
+        space but change model inputs.
+        """
+        return self._get('map_dtype', 'float32', changeable=True)
+
+    @property
+    def map_workers(self) -> int:
+        """
+        Number of processes to build social maps of one dataset.
+        Agents are split into chunks and rendered concurrently, with
+        their inputs and outputs in shared memory.
+        Maps are built in the main process when it is set to `1`,
+        or when there are less than `DatasetManager.min_agents_per_worker`
+        agents for each worker.
+        Workers are started with `spawn`, so the entry script should
+        run under `if __name__ == '__main__':` when it is set.
+        """
+        return self._get('map_workers', 1, changeable=True)
+
+    @property
+    def render_maps(self) -> int:
+        """
+        Controls if render social maps on the fly when feeding inputs
+        into models, rather than building and saving them with train
+        agents. Only trajectory maps (guidance maps) of each dataset
+        are built and saved when it is set to `1`.
+        """
+        return self._get('render_maps', 0, changeable=True)
+
+    @property
+    def map_tile_size(self) -> int:
+        """
+        Size of tiles (in grids) to build and save trajectory maps.
+        Trajectory maps are dense arrays (saved as `trajMap.png`) when
+        it is set to `0`. Otherwise, only tiles where trajectories pass
+        through are allocated (saved as `trajMap.npz`), so that maps of
+        large scenes cost memory according to their occupied areas.
+        """
+        return self._get('map_tile_size', 0, changeable=True)
+
     @property
     def K(self) -> int:
         """
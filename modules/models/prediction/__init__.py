@@ -10,9 +10,12 @@
 
 from . import io, loss, process
 from .__agent import PredictionAgent
+from .__agentBatch import AgentBatch
 from .__args import PredictionArgs
 from .dataset._trainManager import (DatasetManager, DatasetsManager,
                                     EntireTrajectory)
 from .__maps import MapManager, get_trajectories
+from .__mapStore import MapStore, SocialMapRenderer
+from .__tiledMap import TiledMap
 from .__structure import Model, Structure
 from .__vis import TrajVisualization
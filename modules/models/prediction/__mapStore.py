@@ -0,0 +1,295 @@
+"""
+@Author: Conghao Wong
+@Date: 2026-10-18 17:05:12
+@LastEditors: Conghao Wong
+@LastEditTime: 2026-10-18 17:05:12
+@Description: file content
+@Github: https://github.com/conghaowoooong
+@Copyright 2022 Conghao Wong, All Rights Reserved.
+"""
+
+from typing import Union
+
+import numpy as np
+
+from .__agent import PredictionAgent
+from .__maps import MapManager
+
+# scale factors to dequantize stored social maps
+QUANTIZE_SCALES = {'uint8': 255.0,
+                   'float16': 1.0,
+                   'float32': 1.0}
+
+
+class SocialMapRenderer():
+    """
+    SocialMapRenderer
+    -----------------
+    Social maps of a batch of agents that are rendered when indexing,
+    rather than being loaded from files.
+    It works like a read-only `float32` array of all social maps
+    (already cut into windows), so that it can replace the stored
+    social maps in a `MapStore`, and maps are rendered on demand
+    in the input pipeline.
+    Rendered maps are the same as those built by `make_maps` before
+    quantizing.
+
+    Properties
+    ----------
+    ```python
+    >>> self.map_manager    # the manager that holds the map size and parameters
+    >>> self.shape          # shape of all maps, (n, 2*half_size, 2*half_size)
+    ```
+
+    Public Methods
+    --------------
+    ```python
+    # render the social map of one agent
+    (method) render: (self: SocialMapRenderer, index: int, out: ndarray = None) -> ndarray
+    ```
+    """
+
+    def __init__(self, map_manager: MapManager,
+                 pred_linear: np.ndarray,
+                 neighbor_linear_pred: np.ndarray,
+                 neighbor_offsets: np.ndarray,
+                 centers: np.ndarray,
+                 half_size: int,
+                 future_length: np.ndarray = None):
+        """
+        :param map_manager: a map manager with the void map and map parameters
+        :param pred_linear: linear predictions of agents, shape = `(n, pred, 2)`
+        :param neighbor_linear_pred: linear predictions of all neighbors,
+            shape = `(m, pred, 2)`
+        :param neighbor_offsets: offsets of each agent's neighbors in
+            `neighbor_linear_pred` (starting from 0), shape = `(n + 1)`
+        :param centers: map centers (in grids), shape = `(n, 2)`
+        :param half_size: half size of maps
+        :param future_length: (optional) number of future steps of each
+            agent, shape = `(n)`. Only the first `future_length[i]` steps
+            of linear predictions are used for the i-th agent if given.
+        """
+        self.map_manager = map_manager
+        self.pred_linear = pred_linear
+        self.neighbor_linear_pred = neighbor_linear_pred
+        self.neighbor_offsets = neighbor_offsets
+        self.centers = centers
+        self.half_size = half_size
+        self.future_length = future_length
+
+    @property
+    def shape(self) -> tuple[int, int, int]:
+        return (len(self), 2 * self.half_size, 2 * self.half_size)
+
+    @property
+    def dtype(self):
+        return np.dtype(np.float32)
+
+    def __len__(self) -> int:
+        return len(self.centers)
+
+    def __getitem__(self, index: Union[int, slice, np.ndarray]) -> np.ndarray:
+        if isinstance(index, (int, np.integer)):
+            return self.render(index)
+
+        rows = np.arange(len(self))[index]
+        maps = np.zeros((len(rows),) + self.shape[1:], dtype=np.float32)
+        for row, out in zip(rows, maps):
+            self.render(row, out=out)
+        return maps
+
+    def render(self, index: int, out: np.ndarray = None) -> np.ndarray:
+        """
+        Render the social map of one agent.
+
+        :param index: index of the agent
+        :param out: (optional) output array, shape = `(2*half_size, 2*half_size)`
+        """
+        offsets = self.neighbor_offsets
+        pred_linear = self.pred_linear[index]
+        neighbors = self.neighbor_linear_pred[offsets[index]:offsets[index+1]]
+
+        if self.future_length is not None:
+            length = self.future_length[index]
+            pred_linear = pred_linear[:length]
+            neighbors = neighbors[:, :length]
+
+        agent = PredictionAgent()
+        agent.pred_linear = pred_linear
+
+        return self.map_manager.build_local_social_map(
+            target_agent=agent,
+            traj_neighbors=neighbors,
+            center=self.centers[index],
+            half_size=self.half_size,
+            out=out)
+
+
+class MapStore():
+    """
+    MapStore
+    --------
+    Context maps of a batch of agents that are made only when used.
+    The context map of each agent is
+    `0.5 * cut_map(traj_map, center) + 0.5 * social_map`, where social
+    maps are (quantized) crops stored in `.npy` files and memory-mapped,
+    and the trajectory map of each dataset is shared by all its agents.
+    Social maps of a source can also be a `SocialMapRenderer`, which
+    renders them when they are gathered.
+    Maps of one or several datasets (sources) are indexed by
+    `(source, row)` of each agent, so that indexing and concatenating
+    stores never read or copy any maps.
+    Maps are dequantized and blended when indexing with an int or when
+    converting into an array (for example, `np.asarray(store[index])`
+    in the input pipeline).
+
+    Properties
+    ----------
+    ```python
+    >>> self.traj_maps      # trajectory map of each source
+    >>> self.social_maps    # stored (or rendered) social maps of each source
+    >>> self.centers        # map centers (in grids) of each source
+    >>> self.index          # (source, row) of each agent, shape = (n, 2)
+    >>> self.shape          # shape of all maps, (n, 2*half_size, 2*half_size)
+    >>> self.nbytes         # size of the stored social maps used
+    ```
+
+    Public Methods
+    --------------
+    ```python
+    # quantize social maps (in [0, 1]) to store them
+    (method) quantize: (maps: ndarray, dtype: str) -> ndarray
+
+    # dequantize stored social maps
+    (method) dequantize: (maps: ndarray) -> ndarray
+
+    # concatenate several stores
+    (method) concat: (cls: Type[MapStore], stores: list[MapStore]) -> MapStore
+    ```
+    """
+
+    def __init__(self, traj_maps: list[np.ndarray],
+                 social_maps: list[np.ndarray],
+                 centers: list[np.ndarray],
+                 half_size: int,
+                 index: np.ndarray = None):
+        """
+        :param traj_maps: trajectory map (or `TiledMap`) of each source,
+            shape = `(a, b)`
+        :param social_maps: stored social maps (or `SocialMapRenderer`s)
+            of each source, shape = `(m, 2*half_size, 2*half_size)`
+        :param centers: map centers (in grids) of each source, shape = `(m, 2)`
+        :param half_size: half size of maps
+        :param index: `(source, row)` of each agent, shape = `(n, 2)`.
+            Default are all rows of the only source.
+        """
+        self.traj_maps = traj_maps
+        self.social_maps = social_maps
+        self.centers = centers
+        self.half_size = half_size
+
+        if index is None:
+            index = np.stack([np.zeros(len(social_maps[0]), dtype=np.int64),
+                              np.arange(len(social_maps[0]))], axis=-1)
+
+        self.index = index
+
+    @property
+    def shape(self) -> tuple[int, int, int]:
+        return (len(self), 2 * self.half_size, 2 * self.half_size)
+
+    @property
+    def ndim(self) -> int:
+        return 3
+
+    @property
+    def dtype(self):
+        return np.dtype(np.float32)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        size (in bytes) of all stored social maps used by this store
+        (rendered social maps cost nothing)
+        """
+        counts = np.bincount(self.index[:, 0], minlength=len(self.social_maps))
+        return int(sum([c * m.itemsize * np.prod(m.shape[1:])
+                        for c, m in zip(counts, self.social_maps)
+                        if isinstance(m, np.ndarray)]))
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __getitem__(self, index: Union[int, slice, np.ndarray]):
+        if isinstance(index, (int, np.integer)):
+            return self._gather(self.index[[index]])[0]
+
+        return MapStore(self.traj_maps, self.social_maps, self.centers,
+                        self.half_size, self.index[index])
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        maps = self._gather(self.index)
+        return maps if dtype is None else maps.astype(dtype)
+
+    def _gather(self, index: np.ndarray) -> np.ndarray:
+        """
+        Make maps of a batch of `(source, row)` indexes.
+
+        :param index: indexes, shape = `(k, 2)`
+        :return maps: context maps, shape = `(k, 2*half_size, 2*half_size)`
+        """
+        maps = np.zeros((len(index),) + self.shape[1:], dtype=np.float32)
+        for source in np.unique(index[:, 0]):
+            positions = np.where(index[:, 0] == source)[0]
+            rows = index[positions, 1]
+
+            cuts = MapManager.cut_map(self.traj_maps[source],
+                                      self.centers[source][rows],
+                                      self.half_size)
+            social = self.dequantize(self.social_maps[source][rows])
+            maps[positions] = 0.5 * cuts + 0.5 * social
+
+        return maps
+
+    @staticmethod
+    def quantize(maps: np.ndarray, dtype: str) -> np.ndarray:
+        """
+        Quantize maps whose values are in [0, 1].
+
+        :param maps: maps, shape = `(..., a, b)`
+        :param dtype: data type to store, accept `'uint8'`,
+            `'float16'`, and `'float32'`
+        """
+        if dtype not in QUANTIZE_SCALES.keys():
+            raise ValueError('Data type `{}` is not supported.'.format(dtype))
+
+        scale = QUANTIZE_SCALES[dtype]
+        if np.issubdtype(np.dtype(dtype), np.integer):
+            return np.round(np.clip(maps, 0.0, 1.0) * scale).astype(dtype)
+        return np.asarray(maps).astype(dtype)
+
+    @staticmethod
+    def dequantize(maps: np.ndarray) -> np.ndarray:
+        """
+        Dequantize maps saved by `quantize` into `float32`.
+        """
+        scale = QUANTIZE_SCALES.get(np.dtype(maps.dtype).name, 1.0)
+        maps = np.asarray(maps).astype(np.float32)
+        return maps if scale == 1.0 else maps / np.float32(scale)
+
+    @classmethod
+    def concat(cls, stores: list):
+        """
+        Concatenate several stores (with the same `half_size`) into one.
+        """
+        stores: list[MapStore] = stores
+        traj_maps, social_maps, centers, index = [], [], [], []
+
+        for store in stores:
+            index.append(store.index + [len(social_maps), 0])
+            traj_maps += store.traj_maps
+            social_maps += store.social_maps
+            centers += store.centers
+
+        return cls(traj_maps, social_maps, centers,
+                   stores[0].half_size, np.concatenate(index))
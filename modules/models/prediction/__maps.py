@@ -8,19 +8,32 @@
 @Copyright 2021 Conghao Wong, All Rights Reserved.
 """
 
+import os
+from collections import OrderedDict
 from typing import Union
 
 import cv2
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 
 from .. import base
 from .__agent import PredictionAgent
 from .__args import PredictionArgs
+from .__spatialIndex import SpatialIndex
+from .__tiledMap import TiledMap
 from .__traj import EntireTrajectory
 from .__utils import activation, calculate_cosine, calculate_length
 
-MASK = cv2.imread('./figures/mask_circle.png')[:, :, 0]/50
-MASKS = {}
+MASK_PATH = os.path.normpath(os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    '..', '..', '..', 'figures', 'mask_circle.png'))
+
+# the base mask is loaded from `MASK_PATH` when it is first used
+MASK = None
+
+# resized masks (at most `MAX_MASKS` ones) cached by their radius
+MASKS: OrderedDict[int, np.ndarray] = OrderedDict()
+MAX_MASKS = 32
 
 
 class MapManager(base.BaseObject):
@@ -40,6 +53,14 @@ class MapManager(base.BaseObject):
             regulation=True
         ) -> np.ndarray
 
+    # build guidanceMap as tiles (for large scenes)
+    >>> MapManager.build_tiled_guidance_map(
+            self:MapManager,
+            agents:list[PredictionAgent],
+            tile_size=256,
+            save=None
+        ) -> TiledMap
+
     # build socialMap (Attention: return `self`)
     >>> MapManager.build_social_map(
             self:MapManager,
@@ -48,6 +69,16 @@ class MapManager(base.BaseObject):
             source=None,
             regulation=True
         ) -> MapManager    
+
+    # build the local window of socialMap without the full map
+    >>> MapManager.build_local_social_map(
+            self:MapManager,
+            target_agent:PredictionAgent,
+            traj_neighbors:np.ndarray,
+            center:np.ndarray,
+            half_size:int,
+            out=None
+        ) -> np.ndarray
     ```
     """
 
@@ -86,18 +117,15 @@ class MapManager(base.BaseObject):
         """
         Init the trajectory map via a list of agents.
 
-        :param agents: a list of agents, or a batch of trajectories
+        :param agents: a list (or an `AgentBatch`) of agents, or a batch
+            of trajectories
 
-        :return guidance_map: initialized trajectory map
+        :return guidance_map: initialized trajectory map (a read-only
+            view of zeros, copy it before drawing on it)
         :return W: map parameter `W`
         :return b: map parameter `b`
         """
-        if issubclass(type(agents[0]), PredictionAgent):
-            traj = get_trajectories(agents)
-        else:
-            traj = agents
-
-        traj = np.array(traj)
+        traj = np.array(_get_trajs(agents))
         # shape of `traj` should be [*, *, 2] or [*, 2]
 
         if len(traj.shape) == 3:
@@ -111,12 +139,14 @@ class MapManager(base.BaseObject):
         a = self.args.window_size_guidance_map
         e = self.args.window_size_expand_meter
 
-        guidance_map = np.zeros([int((x_max - x_min + 2 * e) * a) + 1,
-                                 int((y_max - y_min + 2 * e) * a) + 1])
+        # a read-only view of zeros that costs no memory for large scenes
+        guidance_map = np.broadcast_to(np.float32(0),
+                                       [int((x_max - x_min + 2 * e) * a) + 1,
+                                        int((y_max - y_min + 2 * e) * a) + 1])
         W = np.array([a, a])
         b = np.array([x_min - e, y_min - e])
 
-        return guidance_map.astype(np.float32), W, b
+        return guidance_map, W, b
 
     def build_guidance_map(self, agents: Union[list[PredictionAgent], np.ndarray],
                            source: np.ndarray = None,
@@ -124,7 +154,8 @@ class MapManager(base.BaseObject):
         """
         Build guidance map
 
-        :param agents: a list of agents or trajectories to calculate the map
+        :param agents: a list (or an `AgentBatch`) of agents, or
+            trajectories to calculate the map
         :param source: source map, default are zeros
         :param save: path for saving the guidance map. Support `.jpg` or `.png` format.
         """
@@ -133,16 +164,13 @@ class MapManager(base.BaseObject):
             source = self.void_map
 
         source = source.copy()
-        if issubclass(type(agents[0]), PredictionAgent):
-            trajs = get_trajectories(agents)
-        else:
-            trajs = agents
+        trajs = _get_trajs(agents)
 
         source = self._add_to_map(source,
                                   self.real2grid(trajs),
                                   amplitude=1,
                                   radius=7,
-                                  add_mask=MASK,
+                                  add_mask=load_mask(),
                                   decay=False,
                                   max_limit=False)
 
@@ -154,6 +182,83 @@ class MapManager(base.BaseObject):
 
         return source
 
+    def build_tiled_guidance_map(self, agents: Union[list[PredictionAgent], np.ndarray],
+                                 tile_size=256,
+                                 save: str = None) -> TiledMap:
+        """
+        Build the guidance map as a `TiledMap`.
+        Only tiles that masks of trajectory points cover are allocated
+        and rendered, and all other positions are `1.0` (the same as
+        positions without trajectories in `build_guidance_map`), so
+        that the full-scene map is never made.
+
+        :param agents: a list (or an `AgentBatch`) of agents, or
+            trajectories to calculate the map
+        :param tile_size: side length of tiles
+        :param save: path for saving the (quantized) tiles, support `.npz` format
+        """
+        trajs = _get_trajs(agents)
+        grid_trajs = self.real2grid(trajs)
+        if len(grid_trajs.shape) == 2:
+            grid_trajs = grid_trajs[np.newaxis, :, :]
+
+        n_traj, steps = grid_trajs.shape[:2]
+        impulses = self._get_impulses(np.array(self.void_map.shape),
+                                      grid_trajs,
+                                      np.ones([n_traj, steps], dtype=np.int32),
+                                      7 * np.ones(n_traj, dtype=np.int32),
+                                      load_mask(), amplitude_decay=False)
+
+        t = tile_size
+        tiles: dict[tuple[int, int], np.ndarray] = {}
+        for r, points, weights, mask in impulses:
+            # all (tile, point) pairs where the mask of the point covers the tile
+            low, high = (points - r) // t, (points + r) // t
+            keys, index = [], []
+            for di in range((high - low)[:, 0].max() + 1):
+                for dj in range((high - low)[:, 1].max() + 1):
+                    k = low + [di, dj]
+                    valid = np.where(np.all(k <= high, axis=-1))[0]
+                    keys.append(k[valid])
+                    index.append(valid)
+
+            keys, index = np.concatenate(keys), np.concatenate(index)
+            unique, inverse, counts = np.unique(keys, axis=0,
+                                                return_inverse=True,
+                                                return_counts=True)
+            groups = np.split(index[np.argsort(inverse.reshape([-1]),
+                                               kind='stable')],
+                              np.cumsum(counts)[:-1])
+
+            # render each tile in a buffer that covers masks of its points
+            for key, p in zip(unique, groups):
+                origin = key * t - 2 * r
+                buffer = np.zeros([t + 4 * r, t + 4 * r], dtype=np.float32)
+                self._render_impulses(buffer, r, points[p], weights[p],
+                                      mask, origin=origin)
+
+                key = (int(key[0]), int(key[1]))
+                if not key in tiles.keys():
+                    tiles[key] = np.zeros([t, t], dtype=np.float32)
+                tiles[key] += buffer[2 * r:2 * r + t, 2 * r:2 * r + t]
+
+        # scale tiles in the same way as `build_guidance_map`
+        for key in tiles.keys():
+            tiles[key] = np.minimum(tiles[key], 30)
+
+        value_max = np.max([tile.max() for tile in tiles.values()] or
+                           [np.float32(0)])
+        for key in tiles.keys():
+            tiles[key] = 1 - tiles[key] / value_max
+
+        fill = (1 - np.zeros(1, dtype=np.float32) / value_max)[0]
+        guidance_map = TiledMap(self.void_map.shape, t, tiles, fill)
+
+        if save:
+            guidance_map.quantize().save(save)
+
+        return guidance_map
+
     def build_social_map(self, target_agent: PredictionAgent,
                          traj_neighbors: np.ndarray = [],
                          source: np.ndarray = None,
@@ -171,11 +276,115 @@ class MapManager(base.BaseObject):
         if type(source) == type(None):
             source = self.void_map
 
+        source = source.copy()
+        trajs, amps, rads = self._get_social_items(target_agent,
+                                                   traj_neighbors,
+                                                   max_neighbor)
+
+        source = self._add_to_map(target_map=source,
+                                  grid_trajs=self.real2grid(trajs),
+                                  amplitude=amps,
+                                  radius=rads,
+                                  add_mask=load_mask(),
+                                  max_limit=False,
+                                  decay=True)
+
+        if regulation:
+            if (np.max(source) - np.min(source)) <= 0.01:
+                source = 0.5 * np.ones_like(source)
+            else:
+                source = (source - np.min(source)) / \
+                    (np.max(source) - np.min(source))
+
+        return source
+
+    def build_local_social_map(self, target_agent: PredictionAgent,
+                               traj_neighbors: np.ndarray,
+                               center: np.ndarray,
+                               half_size: int,
+                               out: np.ndarray = None,
+                               max_neighbor=15) -> np.ndarray:
+        """
+        Build the social map of one agent, and only write its local
+        window into `out`.
+        The result is the same as
+        `cut_map(build_social_map(...)[np.newaxis], center[np.newaxis], half_size)[0]`,
+        but the full-scene map is never made. Masks are rendered into
+        a buffer that only covers themselves, and positions outside it
+        are known to be zeros before scaling the map into [0, 1].
+
+        :param target_agent: target `PredictionAgent` object to calculate the map
+        :param traj_neighbors: neighbors' predictions
+        :param center: center of the window (in grids), shape = `(2)`
+        :param half_size: half size of the window
+        :param out: (optional) output array, shape = `(2*half_size, 2*half_size)`
+        :return out: the local social map
+        """
+        if out is None:
+            out = np.zeros([2 * half_size, 2 * half_size], dtype=np.float32)
+
+        trajs, amps, rads = self._get_social_items(target_agent,
+                                                   traj_neighbors,
+                                                   max_neighbor)
+
+        shape = np.array(self.void_map.shape)
+        impulses = self._get_impulses(shape, self.real2grid(trajs),
+                                      amps, rads, load_mask(),
+                                      amplitude_decay=True)
+
+        # the buffer that covers all masks
+        if len(impulses):
+            low = np.min([p.min(axis=0) - r for r, p, _, _ in impulses],
+                         axis=0)
+            high = np.max([p.max(axis=0) + r + 1 for r, p, _, _ in impulses],
+                          axis=0)
+        else:
+            low = high = np.zeros(2, dtype=np.int64)
+
+        buffer = np.zeros(high - low, dtype=self.void_map.dtype)
+        for item in impulses:
+            self._render_impulses(buffer, *item, origin=low)
+
+        # positions outside the buffer are zeros
+        zero = buffer.dtype.type(0)
+        value_min = value_max = zero
+        if buffer.size:
+            value_min, value_max = buffer.min(), buffer.max()
+
+        if buffer.shape != self.void_map.shape:
+            value_min, value_max = min(value_min, zero), max(value_max, zero)
+
+        if (value_max - value_min) <= 0.01:
+            out[:] = 0.5
+            return out
+
+        # window of the map, clipped in the same way as `cut_map`
+        center = np.minimum(np.maximum(np.array(center).astype(np.int32),
+                                       half_size), shape - half_size)
+        w_low, w_high = center - half_size, center + half_size
+
+        out[:] = (zero - value_min) / (value_max - value_min)
+
+        c_low, c_high = np.maximum(low, w_low), np.minimum(high, w_high)
+        if np.all(c_high > c_low):
+            part = buffer[c_low[0] - low[0]:c_high[0] - low[0],
+                          c_low[1] - low[1]:c_high[1] - low[1]]
+            out[c_low[0] - w_low[0]:c_high[0] - w_low[0],
+                c_low[1] - w_low[1]:c_high[1] - w_low[1]] = \
+                (part - value_min) / (value_max - value_min)
+
+        return out
+
+    def _get_social_items(self, target_agent: PredictionAgent,
+                          traj_neighbors: np.ndarray,
+                          max_neighbor=15):
+        """
+        Get trajectories, amplitudes, and radiuses to add to the
+        social map of the target agent.
+        """
         if not type(traj_neighbors) == np.ndarray:
             traj_neighbors = np.array(traj_neighbors)
 
-        source = source.copy()
-
         trajs = []
         amps = []
         rads = []
@@ -214,50 +423,71 @@ class MapManager(base.BaseObject):
 
         if len(trajs) > max_neighbor + 1:
             trajs = np.array(trajs)
-            dis = calculate_length(trajs[:1, 0, :] - trajs[:, 0, :])
-            index = np.argsort(dis)
-            trajs = trajs[index[:max_neighbor+1]]
+            index, _ = SpatialIndex(trajs[:, 0, :]).query(trajs[:1, 0, :],
+                                                          k=max_neighbor+1)
+            trajs = trajs[index[0]]
 
-        source = self._add_to_map(target_map=source,
-                                  grid_trajs=self.real2grid(trajs),
-                                  amplitude=amps,
-                                  radius=rads,
-                                  add_mask=MASK,
-                                  max_limit=False,
-                                  decay=True)
-
-        if regulation:
-            if (np.max(source) - np.min(source)) <= 0.01:
-                source = 0.5 * np.ones_like(source)
-            else:
-                source = (source - np.min(source)) / \
-                    (np.max(source) - np.min(source))
-
-        return source
+        return trajs, amps, rads
 
     @staticmethod
     def cut_map(maps: np.ndarray,
                 centers: np.ndarray,
                 half_size: int) -> np.ndarray:
         """
-        Cut original maps into small local maps
+        Cut original maps into small local maps.
+        Windows are gathered from a strided view of maps, so that
+        one map can be shared by all centers without copying it.
 
-        :param maps: maps, shape = (batch, a, b)
+        :param maps: maps, shape = (batch, a, b), or one map shared
+            by all centers, shape = (a, b), or a `TiledMap` shared
+            by all centers
         :param centers: center positions (in grids), shape = (batch, 2)
+        :return cuts: local maps, shape = (batch, 2*half_size, 2*half_size)
         """
-        batch, a, b = maps.shape[-3:]
-        centers = centers.astype(np.int32)
+        if isinstance(maps, TiledMap):
+            return maps.cut(centers, half_size)
+
+        a, b = maps.shape[-2:]
+        centers = np.array(centers).astype(np.int32)
 
         centers = np.maximum(centers, half_size)
         centers = np.array([np.minimum(centers[:, 0], a - half_size),
                             np.minimum(centers[:, 1], b - half_size)]).T
 
-        cuts = []
-        for m, c in zip(maps, centers):
-            cuts.append(m[c[0] - half_size: c[0] + half_size,
-                          c[1] - half_size: c[1] + half_size])
+        starts = centers - half_size
+        windows = sliding_window_view(maps, (2 * half_size, 2 * half_size),
+                                      axis=(-2, -1))
+
+        if maps.ndim == 2:
+            return windows[starts[:, 0], starts[:, 1]]
+        else:
+            return windows[np.arange(len(starts)), starts[:, 0], starts[:, 1]]
+
+    @staticmethod
+    def blend_maps(traj_map: np.ndarray,
+                   social_maps: np.ndarray,
+                   centers: np.ndarray,
+                   half_size: int,
+                   chunk_size=1024) -> np.ndarray:
+        """
+        Blend local windows of the trajectory map with social maps,
+        i.e., `0.5 * cut_map(traj_map, centers) + 0.5 * social_maps`.
+        Results are written into `social_maps` in place, and windows
+        of the trajectory map are cut chunk by chunk.
+
+        :param traj_map: the trajectory map, shape = (a, b)
+        :param social_maps: local social maps, shape = (batch, 2*half_size, 2*half_size)
+        :param centers: center positions (in grids), shape = (batch, 2)
+        :return social_maps: blended maps (the same array as `social_maps`)
+        """
+        for start in range(0, len(social_maps), chunk_size):
+            end = start + chunk_size
+            cuts = MapManager.cut_map(traj_map, centers[start:end], half_size)
+
+            social_maps[start:end] *= 0.5
+            social_maps[start:end] += 0.5 * cuts
 
-        return np.array(cuts)
+        return social_maps
 
     def _add_to_map(self, target_map: np.ndarray,
                     grid_trajs: np.ndarray,
@@ -286,12 +516,14 @@ class MapManager(base.BaseObject):
         if type(add_mask) == type(None):
             add_mask = np.ones([1, 1], dtype=np.int32)
 
+        if not max_limit:
+            return self._render(target_map, grid_trajs,
+                                amplitude, radius, add_mask,
+                                amplitude_decay=decay)
+
         for traj, a, r in zip(grid_trajs, amplitude, radius):
             r = int(r)
-            if not r in MASKS.keys():
-                MASKS[r] = cv2.resize(add_mask, (r*2+1, r*2+1))
-
-            add_mask = MASKS[r]
+            add_mask = get_mask(add_mask, r)
             target_map = self._add_one_traj(target_map,
                                             traj, a, r,
                                             add_mask,
@@ -300,6 +532,119 @@ class MapManager(base.BaseObject):
 
         return target_map
 
+    def _render(self, target_map: np.ndarray,
+                grid_trajs: np.ndarray,
+                amplitude: np.ndarray,
+                radius: np.ndarray,
+                add_mask: np.ndarray,
+                amplitude_decay=False):
+        """
+        Add masks of all trajectory points to the map (in place).
+        It gives the same map as adding masks point by point with
+        `_add_one_traj` (when `max_limit == False`), but it scatters
+        weighted impulses of all points with the same radius into one
+        map, and then convolves it with the mask only once.
+
+        :param target_map: the map to add to, shape = `(a, b)`
+        :param grid_trajs: trajectories in grids, shape = `(n, steps, 2)`
+        :param amplitude: amplitude of each trajectory, shape = `(n)`,
+            or amplitude of each point, shape = `(n, steps)`
+        :param radius: radius of each trajectory, shape = `(n)`
+        :param add_mask: the mask (before resizing) to add
+        """
+        for item in self._get_impulses(np.array(target_map.shape[:2]),
+                                       grid_trajs, amplitude, radius,
+                                       add_mask, amplitude_decay):
+            self._render_impulses(target_map, *item)
+
+        return target_map
+
+    def _get_impulses(self, shape: np.ndarray,
+                      grid_trajs: np.ndarray,
+                      amplitude: np.ndarray,
+                      radius: np.ndarray,
+                      add_mask: np.ndarray,
+                      amplitude_decay=False,
+                      amplitude_decay_p=np.array([[0.0, 0.7, 1.0], [1.0, 1.0, 0.5]])):
+        """
+        Get impulses (positions and weights) of all points to add,
+        grouped by their radiuses.
+        Args are the same as `_render`.
+
+        :param shape: shape of the (full) map, shape = `(2)`
+        :return impulses: a list of `(radius, points, weights, mask)`
+        """
+        n_traj, steps = grid_trajs.shape[:2]
+        if not n_traj * steps:
+            return []
+
+        # items are zipped with trajectories in `_add_one_traj`
+        amplitude = np.array(amplitude, dtype=np.float64)[:n_traj]
+        radius = np.array(radius, dtype=np.int64).reshape([-1])[:n_traj]
+        grid_trajs = grid_trajs[:len(radius)]
+
+        if amplitude.ndim == 1:
+            amplitude = amplitude[:, np.newaxis]
+
+        if amplitude_decay:
+            amplitude = amplitude * np.interp(np.linspace(0, 1, steps),
+                                              amplitude_decay_p[0],
+                                              amplitude_decay_p[1])
+
+        # new masks are resized from the last used one (as the
+        # point-by-point loop does), so that they are cached the same
+        masks = {}
+        for r in radius[np.append(True, radius[1:] != radius[:-1])]:
+            masks[r] = add_mask = get_mask(add_mask, int(r))
+
+        amplitude = np.broadcast_to(amplitude, grid_trajs.shape[:2])
+        points = grid_trajs.reshape([-1, 2]).astype(np.int64)
+        weights = amplitude.reshape([-1])
+        radius = np.repeat(radius, steps)
+
+        # only points whose masks are all inside the map are added
+        valid = np.all((points - radius[:, np.newaxis] >= 0) &
+                       (points + radius[:, np.newaxis] + 1 < shape), axis=-1)
+
+        impulses = []
+        for r in np.unique(radius[valid]):
+            index = np.where(valid & (radius == r))[0]
+            impulses.append((int(r), points[index], weights[index], masks[r]))
+
+        return impulses
+
+    def _render_impulses(self, target_map: np.ndarray,
+                         radius: int,
+                         points: np.ndarray,
+                         weights: np.ndarray,
+                         mask: np.ndarray,
+                         origin: np.ndarray = (0, 0)):
+        """
+        Add masks of points with the same radius to the map (in place).
+        Only the bounding box of these masks is rendered.
+
+        :param target_map: the map (or a part of the map) to add to
+        :param points: positions of points (in grids), shape = `(n, 2)`
+        :param weights: weight of each point, shape = `(n)`
+        :param mask: the resized mask, shape = `(2*radius+1, 2*radius+1)`
+        :param origin: position of `target_map[0, 0]` in the full map
+        """
+        low = points.min(axis=0) - radius
+        high = points.max(axis=0) + radius + 1
+
+        impulses = np.zeros(high - low, dtype=np.float32)
+        np.add.at(impulses, (points[:, 0] - low[0], points[:, 1] - low[1]),
+                  weights)
+
+        # `filter2D` computes correlations, so the mask is flipped
+        kernel = np.ascontiguousarray(mask[::-1, ::-1], dtype=np.float32)
+        rendered = cv2.filter2D(impulses, -1, kernel,
+                                anchor=(radius, radius),
+                                borderType=cv2.BORDER_CONSTANT)
+
+        low, high = low - origin, high - origin
+        target_map[low[0]:high[0], low[1]:high[1]] += rendered
+
     def real2grid(self, traj: np.ndarray) -> np.ndarray:
         if not type(traj) == np.ndarray:
             traj = np.array(traj)
@@ -338,6 +683,39 @@ class MapManager(base.BaseObject):
         return new_map + source_map
 
 
+def load_mask() -> np.ndarray:
+    """
+    Get the base mask, and load it from `MASK_PATH` when it is
+    first used.
+    """
+    global MASK
+    if MASK is None:
+        if (mask := cv2.imread(MASK_PATH)) is None:
+            raise FileNotFoundError(
+                'Mask file `{}` not found.'.format(MASK_PATH))
+
+        MASK = mask[:, :, 0]/50
+
+    return MASK
+
+
+def get_mask(add_mask: np.ndarray, radius: int) -> np.ndarray:
+    """
+    Get the mask resized to `(2 * radius + 1, 2 * radius + 1)`.
+    Masks are cached in `MASKS` by their radius, and the least
+    recently used one is dropped when there are more than `MAX_MASKS`.
+    """
+    if radius in MASKS.keys():
+        MASKS.move_to_end(radius)
+        return MASKS[radius]
+
+    MASKS[radius] = mask = cv2.resize(add_mask, (radius*2+1, radius*2+1))
+    if len(MASKS) > MAX_MASKS:
+        MASKS.popitem(last=False)
+
+    return mask
+
+
 def get_trajectories(agents: list[PredictionAgent],
                      return_movement=False,
                      return_destination=False,
@@ -355,7 +733,7 @@ def get_trajectories(agents: list[PredictionAgent],
         if issubclass(type(agent), PredictionAgent):
             trajs = agent.traj
         elif issubclass(type(agent), EntireTrajectory):
-            trajs = agent.traj[agent.start_frame:agent.end_frame]
+            trajs = agent.get_traj(agent.start_frame, agent.end_frame)
 
             if return_destination:
                 trajs = trajs[-destination_steps:]
@@ -367,8 +745,28 @@ def get_trajectories(agents: list[PredictionAgent],
             ) else False
             movement += [flag for _ in range(len(trajs))]
 
-        if type(trajs) == np.ndarray:
+        if isinstance(trajs, np.ndarray):
             trajs = trajs.tolist()
         all_trajs += trajs
 
     return (all_trajs, movement) if return_movement else all_trajs
+
+
+def _get_trajs(agents) -> Union[list, np.ndarray]:
+    """
+    Get observed trajectories of agents to build maps.
+    Arrays of a batch of agents (`AgentBatch`) are used directly, rather
+    than making `PredictionAgent` objects one by one.
+
+    :param agents: a list (or an `AgentBatch`) of agents, or trajectories
+    :return trajs: trajectories, or a list of all trajectory points
+    """
+    # `AgentBatch` is not imported, since it imports this module.
+    # Points are `float64`, the same as those given by `get_trajectories`.
+    if isinstance(getattr(agents, 'traj', None), np.ndarray):
+        return agents.traj.astype(np.float64)
+
+    if issubclass(type(agents[0]), PredictionAgent):
+        return get_trajectories(agents)
+
+    return agents
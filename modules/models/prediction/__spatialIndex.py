@@ -0,0 +1,206 @@
+"""
+@Author: Conghao Wong
+@Date: 2026-10-18 15:48:03
+@LastEditors: Conghao Wong
+@LastEditTime: 2026-10-18 15:48:03
+@Description: file content
+@Github: https://github.com/conghaowoooong
+@Copyright 2022 Conghao Wong, All Rights Reserved.
+"""
+
+import numpy as np
+
+from .__utils import calculate_length
+
+
+class SpatialIndex():
+    """
+    SpatialIndex
+    ------------
+    A uniform grid hash of 2D positions (for example, positions of all
+    agents in one frame) that answers batched k-nearest-neighbor queries.
+    Points are bucketed into square cells once when building the index.
+    Each query only computes distances to points in cells around it,
+    and extends the searching window until the k-th nearest distance
+    is proven to be within the window (or searches all points when
+    the window has been extended several times).
+    Results are the same as a stable `np.argsort` on all distances,
+    i.e., equal distances are ordered by indexes of points.
+
+    Properties
+    ----------
+    ```python
+    >>> self.positions      # indexed positions, shape = (n, 2)
+    >>> self.cell_size      # side length of each cell
+    ```
+
+    Public Methods
+    --------------
+    ```python
+    # indexes and distances of the k nearest points of each query
+    (method) query: (self: SpatialIndex, points: ndarray, k: int) -> tuple[ndarray, ndarray]
+    ```
+    """
+
+    # number of points to search all points directly
+    brute_force_limit = 64
+
+    # times to extend the searching window before searching all points
+    max_extend = 4
+
+    def __init__(self, positions: np.ndarray,
+                 cell_size: float = None,
+                 points_per_cell=2):
+        """
+        :param positions: positions to index, shape = `(n, 2)`
+        :param cell_size: side length of cells, default is computed
+            from the density of positions
+        :param points_per_cell: expected number of points in one cell,
+            used when `cell_size` is not given
+        """
+        self.positions = np.reshape(positions, [-1, 2])
+        self.points_per_cell = points_per_cell
+
+        count = len(self.positions)
+        if count <= self.brute_force_limit:
+            self.cell_size = None
+            return
+
+        self.low = self.positions.min(axis=0)
+        size = np.maximum(self.positions.max(axis=0) - self.low, 1e-6)
+
+        if cell_size is None:
+            # cells should not be too small when points are on a line
+            cell_size = max(np.sqrt(np.prod(size) * points_per_cell / count),
+                            size.max() * points_per_cell / count)
+
+        self.cell_size = cell_size
+        self.shape = (np.floor(size / cell_size) + 1).astype(np.int64)
+
+        # sort points by their cells
+        keys = self._get_keys(self._get_cells(self.positions))
+        self.order = np.argsort(keys, kind='stable')
+        self.cell_keys, self.cell_starts = np.unique(keys[self.order],
+                                                     return_index=True)
+        self.cell_ends = np.append(self.cell_starts[1:], count)
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def _get_cells(self, points: np.ndarray) -> np.ndarray:
+        return np.floor((points - self.low) / self.cell_size).astype(np.int64)
+
+    def _get_keys(self, cells: np.ndarray) -> np.ndarray:
+        return cells[..., 0] * self.shape[1] + cells[..., 1]
+
+    def query(self, points: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Find the k nearest indexed points of each query point.
+
+        :param points: query points, shape = `(q, 2)`
+        :param k: number of neighbors
+        :return index: indexes of neighbors sorted by distances,
+            shape = `(q, k)`. It is `-1` when there are less than `k` points.
+        :return distance: distances to neighbors, shape = `(q, k)`.
+            It is `inf` when there are less than `k` points.
+        """
+        points = np.reshape(points, [-1, 2])
+        index = -np.ones([len(points), k], dtype=np.int64)
+        distance = np.inf * np.ones([len(points), k])
+
+        if (not len(points)) or (not len(self)) or (k <= 0):
+            return index, distance
+
+        if self.cell_size is None:
+            self._brute_force(points, k, np.arange(len(points)),
+                              index, distance)
+            return index, distance
+
+        cells = self._get_cells(points)
+        inside = np.all((cells >= 0) & (cells < self.shape), axis=-1)
+
+        # queries outside the grid search all points directly
+        self._brute_force(points, k, np.where(~inside)[0], index, distance)
+
+        active = np.where(inside)[0]
+
+        # the window that is expected to contain `k` points
+        radius = int(np.ceil(np.sqrt(k / (np.pi * self.points_per_cell))))
+        max_radius = radius + self.max_extend
+
+        while len(active) and radius <= max_radius:
+            q, p = self._get_candidates(cells[active], radius)
+            dis = calculate_length(self.positions[p] - points[active][q])
+
+            # points outside the window are farther than `radius * cell_size`,
+            # so a query is done if there are `k` candidates within it
+            covered = dis <= radius * self.cell_size
+            done = np.bincount(q, weights=covered,
+                               minlength=len(active)) >= k
+
+            valid = np.where(done[q] & covered)[0]
+            q, p, dis = q[valid], p[valid], dis[valid]
+
+            # sort candidates by (query, distance, point index)
+            order = np.lexsort((p, dis, q))
+            q, p, dis = q[order], p[order], dis[order]
+
+            counts = np.bincount(q, minlength=len(active))
+            rank = np.arange(len(q)) - (np.cumsum(counts) - counts)[q]
+
+            keep = rank < k
+            index[active[q[keep]], rank[keep]] = p[keep]
+            distance[active[q[keep]], rank[keep]] = dis[keep]
+
+            active = active[~done]
+            radius += 1
+
+        # queries in sparse areas search all points directly
+        self._brute_force(points, k, active, index, distance)
+        return index, distance
+
+    def _get_candidates(self, cells: np.ndarray,
+                        radius: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Get all points in cells around each query cell.
+
+        :param cells: cells of queries, shape = `(q, 2)`
+        :param radius: number of cells to extend around the query cell
+        :return q: query index of each candidate, shape = `(m)`
+        :return p: point index of each candidate, shape = `(m)`
+        """
+        r = np.arange(-radius, radius + 1)
+        offsets = np.stack(np.meshgrid(r, r, indexing='ij'), axis=-1)
+        around = cells[:, np.newaxis, :] + offsets.reshape([1, -1, 2])
+
+        valid = np.all((around >= 0) & (around < self.shape), axis=-1)
+        q, b = np.where(valid)
+        keys = self._get_keys(around[q, b])
+
+        pos = np.minimum(np.searchsorted(self.cell_keys, keys),
+                         len(self.cell_keys) - 1)
+        found = self.cell_keys[pos] == keys
+        q, pos = q[found], pos[found]
+
+        counts = self.cell_ends[pos] - self.cell_starts[pos]
+        offsets = np.repeat(self.cell_starts[pos] - np.cumsum(counts) + counts,
+                            counts)
+        return np.repeat(q, counts), self.order[offsets + np.arange(len(offsets))]
+
+    def _brute_force(self, points: np.ndarray, k: int,
+                     queries: np.ndarray,
+                     index: np.ndarray,
+                     distance: np.ndarray):
+        """
+        Search neighbors of queries on all points, and write results
+        into `index` and `distance` in place.
+        """
+        if not len(queries):
+            return
+
+        dis = calculate_length(self.positions[np.newaxis, :, :] -
+                               points[queries][:, np.newaxis, :])
+        order = np.argsort(dis, axis=-1, kind='stable')[:, :k]
+        index[queries, :order.shape[1]] = order
+        distance[queries, :order.shape[1]] = np.take_along_axis(dis, order,
+                                                                axis=-1)
@@ -17,6 +17,7 @@ from .. import base
 from ..helpmethods import dir_check
 from . import io, loss, process
 from .__agent import PredictionAgent as Agent
+from .__agentBatch import AgentBatch
 from .__args import PredictionArgs
 from .dataset._trainManager import DatasetsManager
 from .__vis import TrajVisualization
@@ -241,6 +242,9 @@ class Structure(base.Structure):
     # Gradient densest operation
     (method) gradient_operations: (self: Structure, model_inputs, gt, loss_move_average: Variable, **kwargs) -> tuple[Tensor, dict[str, Tensor], Tensor]
 
+    # Run a function as a compiled graph (`args.graph_mode`)
+    (method) call_graph_function: (self: Structure, name: str, python_function, *inputs) -> Any
+
     # Entrance of train or test
     (method) run_train_or_test: (self: Structure) -> None
 
@@ -377,18 +381,17 @@ class Structure(base.Structure):
                     self.test(agents=agents, dataset_name=dataset)
 
             elif self.args.test_mode == 'mix':
-                agents = []
-                for dataset_c in info.test_sets:
-                    agents += self.DM_type.load(self.args,
-                                                dataset_c, mode='test')
+                agents = AgentBatch.concat([
+                    self.DM_type.load(self.args, dataset_c, mode='test')
+                    for dataset_c in info.test_sets])
 
                 self.test(agents=agents, dataset_name=self.args.test_set)
 
-    def get_inputs_from_agents(self, input_agents: list[agent_type]) -> tuple[list[tf.Tensor], tf.Tensor]:
+    def get_inputs_from_agents(self, input_agents: AgentBatch) -> tuple[list[tf.Tensor], tf.Tensor]:
         """
         Get inputs for models who only takes `obs_traj` as input.
 
-        :param input_agents: a list of input agents, type = `list[agent_type]`
+        :param input_agents: input agents, type = `AgentBatch` or `list[agent_type]`
         :return model_inputs: a list of traj tensor, `len(model_inputs) = 1`
         :return gt: ground truth trajs, type = `tf.Tensor`
         """
@@ -403,6 +406,8 @@ class Structure(base.Structure):
     def load_dataset(self, *args, **kwargs) -> tuple[tf.data.Dataset, tf.data.Dataset]:
         """
         Load training and val dataset.
+        Inputs are streamed from the loaded agents when iterating
+        datasets, rather than being copied into tensors at once.
 
         :return dataset_train: train dataset, type = `tf.data.Dataset`
         :return dataset_val: val dataset, type = `tf.data.Dataset`
@@ -410,13 +415,10 @@ class Structure(base.Structure):
         agents_train, agents_test = self.DM_type.load(
             self.args, 'auto', mode='train')
 
-        train_data = self.get_inputs_from_agents(agents_train)
-        test_data = self.get_inputs_from_agents(agents_test)
-
-        dataset_train = tf.data.Dataset.from_tensor_slices(train_data)
-        dataset_train = dataset_train.shuffle(len(dataset_train),
-                                              reshuffle_each_iteration=True)
-        dataset_test = tf.data.Dataset.from_tensor_slices(test_data)
+        type_names = self.model_inputs + self.model_groundtruths[:1]
+        dataset_train = io.get_dataset(agents_train, type_names,
+                                       shuffle=True)
+        dataset_test = io.get_dataset(agents_test, type_names)
         return dataset_train, dataset_test
 
     def load_test_dataset(self, *args, **kwargs) -> tf.data.Dataset:
@@ -426,9 +428,8 @@ class Structure(base.Structure):
         :return dataset_train: test dataset, type = `tf.data.Dataset`
         """
         agents = kwargs['agents']
-        test_tensor = self.get_inputs_from_agents(agents)
-        dataset_test = tf.data.Dataset.from_tensor_slices(test_tensor)
-        return dataset_test
+        return io.get_dataset(agents,
+                              self.model_inputs + self.model_groundtruths[:1])
 
     def load_forward_dataset(self, model_inputs: list[agent_type],
                              *args, **kwargs) -> tf.data.Dataset:
@@ -484,7 +485,7 @@ class Structure(base.Structure):
         self.print_parameters(title='dataset options')
 
     def write_test_results(self, model_outputs: list[tf.Tensor],
-                           agents: dict[str, list[agent_type]],
+                           agents: AgentBatch,
                            *args, **kwargs):
 
         testset_name = kwargs['dataset_name']
@@ -505,7 +506,7 @@ class Structure(base.Structure):
             for index, agent in self.log_timebar(agents, 'Saving...'):
                 # write traj
                 output = model_outputs[0][index].numpy()
-                agents[index].pred = output
+                agent.pred = output
 
                 # draw as one image
                 tv.draw(agents=[agent],
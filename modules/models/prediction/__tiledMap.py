@@ -0,0 +1,220 @@
+"""
+@Author: Conghao Wong
+@Date: 2026-10-18 18:32:49
+@LastEditors: Conghao Wong
+@LastEditTime: 2026-10-18 18:32:49
+@Description: file content
+@Github: https://github.com/conghaowoooong
+@Copyright 2022 Conghao Wong, All Rights Reserved.
+"""
+
+import cv2
+import numpy as np
+
+
+class TiledMap():
+    """
+    TiledMap
+    --------
+    A large 2D map stored as square tiles, where only tiles that
+    have been drawn on are allocated, and all other positions have
+    the same `fill` value.
+    Its memory cost scales with the occupied area rather than the
+    extent of the scene.
+    Coarse levels of the map (each one is downsampled by 2 from the
+    last level) are made from tiles when they are first used.
+
+    Properties
+    ----------
+    ```python
+    >>> self.shape          # shape of the (full) map, (a, b)
+    >>> self.tile_size      # side length of tiles
+    >>> self.tiles          # allocated tiles, {(tile_row, tile_col): tile}
+    >>> self.fill           # value of positions in unallocated tiles
+    >>> self.nbytes         # size of allocated tiles
+    ```
+
+    Public Methods
+    --------------
+    ```python
+    # cut local windows, the same as `MapManager.cut_map`
+    (method) cut: (self: TiledMap, centers: ndarray, half_size: int) -> ndarray
+
+    # get a coarse level of the map
+    (method) get_level: (self: TiledMap, level: int) -> TiledMap
+
+    # make the dense map
+    (method) to_dense: (self: TiledMap) -> ndarray
+
+    # quantize (into `uint8`) and dequantize maps to save them
+    (method) quantize: (self: TiledMap, scale=255.0) -> TiledMap
+    (method) dequantize: (self: TiledMap, scale=255.0) -> TiledMap
+
+    # save and load tiles
+    (method) save: (self: TiledMap, path: str) -> None
+    (method) load: (cls: Type[TiledMap], path: str) -> TiledMap
+    ```
+    """
+
+    def __init__(self, shape: tuple[int, int],
+                 tile_size: int,
+                 tiles: dict[tuple[int, int], np.ndarray] = None,
+                 fill=0.0,
+                 dtype=np.float32):
+        """
+        :param shape: shape of the full map, `(a, b)`
+        :param tile_size: side length of tiles
+        :param tiles: allocated tiles, each one has the shape
+            `(tile_size, tile_size)` (tiles on the border are also padded)
+        :param fill: value of positions in unallocated tiles
+        """
+        self.shape = tuple([int(s) for s in shape])
+        self.tile_size = int(tile_size)
+        self.tiles = {} if tiles is None else tiles
+        self.fill = fill
+        self.dtype = np.dtype(dtype)
+
+        self._levels: dict[int, TiledMap] = {}
+
+    @property
+    def ndim(self) -> int:
+        return 2
+
+    @property
+    def nbytes(self) -> int:
+        return int(sum([t.nbytes for t in self.tiles.values()]))
+
+    @property
+    def grid_shape(self) -> tuple[int, int]:
+        """
+        number of tiles on each axis
+        """
+        return tuple([-(-s // self.tile_size) for s in self.shape])
+
+    def cut(self, centers: np.ndarray, half_size: int) -> np.ndarray:
+        """
+        Cut the map into small local maps.
+        Centers are clipped in the same way as `MapManager.cut_map`,
+        and results are the same as cutting the dense map.
+
+        :param centers: center positions (in grids), shape = (batch, 2)
+        :param half_size: half size of windows
+        :return cuts: local maps, shape = (batch, 2*half_size, 2*half_size)
+        """
+        a, b = self.shape
+        t = self.tile_size
+        size = 2 * half_size
+
+        centers = np.array(centers).astype(np.int32).reshape([-1, 2])
+        centers = np.maximum(centers, half_size)
+        centers = np.array([np.minimum(centers[:, 0], a - half_size),
+                            np.minimum(centers[:, 1], b - half_size)]).T
+
+        starts = centers - half_size
+        cuts = np.full((len(starts), size, size), self.fill, dtype=self.dtype)
+
+        for cut, (x0, y0) in zip(cuts, starts):
+            for i in range(x0 // t, (x0 + size - 1) // t + 1):
+                for j in range(y0 // t, (y0 + size - 1) // t + 1):
+                    if (tile := self.tiles.get((i, j))) is None:
+                        continue
+
+                    # overlap of the window and the tile (in the full map)
+                    lx, ly = max(x0, i * t), max(y0, j * t)
+                    hx, hy = min(x0 + size, (i + 1) * t), min(y0 + size, (j + 1) * t)
+                    cut[lx - x0:hx - x0, ly - y0:hy - y0] = \
+                        tile[lx - i * t:hx - i * t, ly - j * t:hy - j * t]
+
+        return cuts
+
+    def get_level(self, level: int):
+        """
+        Get a coarse level of the map, which is downsampled by `2 ** level`
+        (each grid is the mean value of grids it covers).
+        Levels are made only once, and tiles are allocated only where
+        tiles of the full map are allocated.
+
+        :param level: level of the pyramid, `0` is the full map
+        :return map: the coarse map, type = `TiledMap`
+        """
+        if level <= 0:
+            return self
+
+        if not level in self._levels.keys():
+            last = self.get_level(level - 1)
+            if last.tile_size < 2:
+                raise ValueError('Tiles are too small for level {}.'.format(level))
+
+            t = last.tile_size // 2
+            tiles = {key: cv2.resize(tile[:2 * t, :2 * t], (t, t),
+                                     interpolation=cv2.INTER_AREA)
+                     for key, tile in last.tiles.items()}
+
+            self._levels[level] = TiledMap([-(-s // 2) for s in last.shape],
+                                           t, tiles, last.fill, last.dtype)
+
+        return self._levels[level]
+
+    def to_dense(self) -> np.ndarray:
+        """
+        Make the dense map. (It may cost lots of memory for large scenes.)
+        """
+        a, b = self.shape
+        t = self.tile_size
+
+        dense = np.full(self.shape, self.fill, dtype=self.dtype)
+        for (i, j), tile in self.tiles.items():
+            part = dense[i * t:(i + 1) * t, j * t:(j + 1) * t]
+            part[:] = tile[:part.shape[0], :part.shape[1]]
+
+        return dense
+
+    def quantize(self, scale=255.0):
+        """
+        Quantize the map (whose values are in [0, 1]) into `uint8`,
+        in the same way as `cv2.imwrite(path, scale * dense_map)`.
+        """
+        def q(x): return np.clip(np.round(scale * np.float32(x)), 0, 255
+                                 ).astype(np.uint8)
+
+        return TiledMap(self.shape, self.tile_size,
+                        {key: q(tile) for key, tile in self.tiles.items()},
+                        q(self.fill), np.uint8)
+
+    def dequantize(self, scale=255.0):
+        """
+        Dequantize a map saved by `quantize` into `float32`.
+        """
+        def dq(x): return np.asarray(x).astype(np.float32) / scale
+
+        return TiledMap(self.shape, self.tile_size,
+                        {key: dq(tile) for key, tile in self.tiles.items()},
+                        dq(self.fill), np.float32)
+
+    def save(self, path: str):
+        """
+        Save tiles into a `.npz` file.
+        """
+        keys = np.array(list(self.tiles.keys()), dtype=np.int64).reshape([-1, 2])
+        tiles = np.array(list(self.tiles.values()), dtype=self.dtype)
+        tiles = tiles.reshape([-1, self.tile_size, self.tile_size])
+
+        np.savez(path,
+                 shape=np.array(self.shape),
+                 tile_size=self.tile_size,
+                 fill=self.fill,
+                 keys=keys,
+                 tiles=tiles)
+
+    @classmethod
+    def load(cls, path: str):
+        """
+        Load tiles saved by `save`.
+        """
+        with np.load(path) as data:
+            tiles = {(int(i), int(j)): tile
+                     for (i, j), tile in zip(data['keys'], data['tiles'])}
+
+            return cls(data['shape'], int(data['tile_size']), tiles,
+                       data['tiles'].dtype.type(data['fill']),
+                       data['tiles'].dtype)
@@ -10,45 +10,41 @@
 
 import numpy as np
 
+from .dataset._sceneStore import SceneStore
+
 
 class EntireTrajectory():
     """
     Entire Trajectory
     -----------------
     Manage one agent's entire trajectory in datasets.
+    Trajectories are read from the `SceneStore` only when needed.
 
     Properties
     ----------
     ```python
     >>> self.agent_index
     >>> self.traj
-    >>> self.video_neighbor_list
+    >>> self.scene
     >>> self.frame_list
     >>> self.start_frame
     >>> self.end_frame
     ```
+
+    Public Methods
+    --------------
+    ```python
+    # trajectory during `frame_list[start:end:step]`, shape = (steps, 2)
+    (method) get_traj: (self: EntireTrajectory, start: int = 0, end: int = None, step: int = 1) -> ndarray
+    ```
     """
 
     def __init__(self, agent_index: int,
-                 video_neighbor_list: list[int],
-                 video_matrix: np.ndarray,
-                 frame_list: list[int],
-                 init_position: float):
+                 scene: SceneStore):
 
         self._agent_index = agent_index
-        self._traj = video_matrix[:, agent_index, :]
-        self._video_neighbor_list = video_neighbor_list
-        self._frame_list = frame_list
-
-        base = self.traj.T[0]
-        diff = base[:-1] - base[1:]
-
-        appear = np.where(diff > init_position/2)[0]
-        # disappear in next step
-        disappear = np.where(diff < -init_position/2)[0]
-
-        self._start_frame = appear[0] + 1 if len(appear) else 0
-        self._end_frame = disappear[0] + 1 if len(disappear) else len(base)
+        self._scene = scene
+        self._start_frame, self._end_frame = scene.valid_range(agent_index)
 
     @property
     def agent_index(self):
@@ -56,15 +52,18 @@ class EntireTrajectory():
 
     @property
     def traj(self):
-        return self._traj
+        """
+        trajectory during all frames, shape = `(frames, 2)`
+        """
+        return self.get_traj()
 
     @property
-    def video_neighbor_list(self):
-        return self._video_neighbor_list
+    def scene(self) -> SceneStore:
+        return self._scene
 
     @property
     def frame_list(self):
-        return self._frame_list
+        return self._scene.frame_list
 
     @property
     def start_frame(self):
@@ -73,3 +72,12 @@ class EntireTrajectory():
     @property
     def end_frame(self):
         return self._end_frame
+
+    def get_traj(self, start: int = 0,
+                 end: int = None,
+                 step: int = 1) -> np.ndarray:
+        """
+        Get trajectory during `frame_list[start:end:step]`.
+        Positions are `init_position` when the agent is absent.
+        """
+        return self._scene.traj(self._agent_index, start, end, step)
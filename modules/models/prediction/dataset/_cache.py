@@ -0,0 +1,109 @@
+"""
+@Author: Conghao Wong
+@Date: 2026-10-18 11:20:37
+@LastEditors: Conghao Wong
+@LastEditTime: 2026-10-18 11:20:37
+@Description: file content
+@Github: https://github.com/conghaowoooong
+@Copyright 2022 Conghao Wong, All Rights Reserved.
+"""
+
+import hashlib
+import json
+import os
+
+
+def hash_file(path: str, chunk_size=1024 ** 2) -> str:
+    """
+    Get the sha1 hash of all contents in a file.
+    """
+    sha = hashlib.sha1()
+    with open(path, 'rb') as f:
+        while chunk := f.read(chunk_size):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def hash_items(*items) -> str:
+    """
+    Get the sha1 hash of a set of json-serializable items.
+    """
+    text = json.dumps(items, sort_keys=True, default=str)
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+class CacheManifest():
+    """
+    CacheManifest
+    -------------
+    A json file that records the hash key of each cached artifact.
+    One artifact can be reused only if its recorded key equals
+    to the key computed from the current source files and args.
+
+    Public Methods
+    --------------
+    ```python
+    # check if the artifact is cached with the given key
+    (method) check: (self: CacheManifest, name: str, key: str) -> bool
+
+    # record the key of the artifact
+    (method) update: (self: CacheManifest, name: str, key: str) -> None
+    ```
+    """
+
+    def __init__(self, path: str):
+        """
+        :param path: path of the manifest file
+        """
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+
+    def _read(self) -> dict[str, str]:
+        if not os.path.exists(self.path):
+            return {}
+
+        with open(self.path, 'r') as f:
+            return json.load(f)
+
+    def _write(self, records: dict[str, str]):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = '{}.{}.tmp'.format(self.path, os.getpid())
+        with open(temp_path, 'w+') as f:
+            json.dump(records, f, indent=4, sort_keys=True)
+        os.replace(temp_path, self.path)
+
+    def is_valid(self, name: str, key: str) -> bool:
+        """
+        Check if the artifact exists and is cached with the given key.
+        It does not count hits or misses.
+
+        :param name: path of the artifact
+        :param key: hash key computed from the current sources
+        """
+        return (os.path.exists(name) and
+                self._read().get(name) == key)
+
+    def check(self, name: str, key: str) -> bool:
+        """
+        Check if the artifact exists and is cached with the given key,
+        and count the hit or miss.
+
+        :param name: path of the artifact
+        :param key: hash key computed from the current sources
+        """
+        hit = self.is_valid(name, key)
+
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return hit
+
+    def update(self, name: str, key: str):
+        """
+        Record the key of the (re-built) artifact.
+        """
+        records = self._read()
+        records[name] = key
+        self._write(records)
@@ -0,0 +1,135 @@
+"""
+@Author: Conghao Wong
+@Date: 2026-10-18 09:12:40
+@LastEditors: Conghao Wong
+@LastEditTime: 2026-10-18 09:12:40
+@Description: file content
+@Github: https://github.com/conghaowoooong
+@Copyright 2022 Conghao Wong, All Rights Reserved.
+"""
+
+import numpy as np
+
+
+class TrajectoryTable():
+    """
+    TrajectoryTable
+    ---------------
+    All records in one `true_pos_.csv` file.
+    Records are sorted by (person, frame) once and stored in one
+    contiguous array, and each person's records are given by offsets
+    into that array.
+
+    Properties
+    ----------
+    ```python
+    >>> self.person_ids     # real person ids, shape = (persons)
+    >>> self.offsets        # offsets of each person, shape = (persons + 1)
+    >>> self.data           # all records, shape = (rows, 3), (frame, x, y)
+    >>> self.frame_list     # a sorted array of all frame ids
+    ```
+
+    Public Methods
+    --------------
+    ```python
+    # records of the i-th person, shape = (steps, 3)
+    (method) __getitem__: (self: TrajectoryTable, index: int) -> ndarray
+    ```
+    """
+
+    def __init__(self, person_ids: np.ndarray,
+                 offsets: np.ndarray,
+                 data: np.ndarray,
+                 frame_list: np.ndarray):
+
+        self._person_ids = person_ids
+        self._offsets = offsets
+        self._data = data
+        self._frame_list = frame_list
+
+    @property
+    def person_ids(self) -> np.ndarray:
+        """
+        real person ids, shape = `(persons)`
+        """
+        return self._person_ids
+
+    @property
+    def offsets(self) -> np.ndarray:
+        """
+        records of the i-th person are `data[offsets[i]:offsets[i+1]]`,
+        shape = `(persons + 1)`
+        """
+        return self._offsets
+
+    @property
+    def data(self) -> np.ndarray:
+        """
+        all records sorted by (person, frame), shape = `(rows, 3)`.
+        Columns are `frame`, `x`, and `y`.
+        """
+        return self._data
+
+    @property
+    def frame_list(self) -> np.ndarray:
+        """
+        a sorted array of all frame ids
+        """
+        return self._frame_list
+
+    def __len__(self) -> int:
+        return len(self._person_ids)
+
+    def __getitem__(self, index: int) -> np.ndarray:
+        return self._data[self._offsets[index]:self._offsets[index+1]]
+
+    def counts(self) -> np.ndarray:
+        """
+        number of records of each person, shape = `(persons)`
+        """
+        return np.diff(self._offsets)
+
+
+def parse_csv(path: str) -> np.ndarray:
+    """
+    Parse a trajectory csv file in one pass.
+    Each line in the file stores one item (frame, person id, x or y)
+    of all records, split by commas.
+
+    :param path: path of the csv file
+    :return data: parsed values, shape = `(lines, rows)`
+    """
+    with open(path, 'r') as f:
+        lines = [np.fromstring(line, dtype=np.float64, sep=',')
+                 for line in f if line.strip()]
+
+    return np.stack(lines)
+
+
+def read_trajectory_csv(path: str, order: list[int]) -> TrajectoryTable:
+    """
+    Read a `true_pos_.csv` file into a `TrajectoryTable`.
+    Records are sorted by (person, frame) with one stable sort.
+
+    :param path: path of the csv file
+    :param order: order for coordinates, (x, y) -> `[0, 1]`, (y, x) -> `[1, 0]`
+    :return table: a `TrajectoryTable` object
+    """
+    data = parse_csv(path)
+
+    frames = data[0]
+    persons = data[1].astype(np.int32)
+
+    index = np.lexsort((frames, persons))
+    persons = persons[index]
+
+    records = np.empty([len(index), 3], dtype=np.float64)
+    records[:, 0] = frames[index]
+    records[:, 1] = data[2 + order[0], index]
+    records[:, 2] = data[2 + order[1], index]
+
+    person_ids, counts = np.unique(persons, return_counts=True)
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+    frame_list = np.unique(frames.astype(np.int32))
+
+    return TrajectoryTable(person_ids, offsets, records, frame_list)
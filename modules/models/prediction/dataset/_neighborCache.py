@@ -0,0 +1,134 @@
+"""
+@Author: Conghao Wong
+@Date: 2026-10-18 16:20:37
+@LastEditors: Conghao Wong
+@LastEditTime: 2026-10-18 16:20:37
+@Description: file content
+@Github: https://github.com/conghaowoooong
+@Copyright 2022 Conghao Wong, All Rights Reserved.
+"""
+
+import numpy as np
+
+from ...helpmethods import predict_linear
+from ._sceneStore import SceneStore
+
+
+class NeighborCache():
+    """
+    NeighborCache
+    -------------
+    Observed trajectories and linear predictions of neighbors, stored
+    once for each unique key `(neighbor, start_frame, obs_frame)`
+    (all keys share the same `frame_step`).
+    Train samples in the same frame usually have the same neighbors
+    during the same observation period, so they only keep indexes of
+    rows in this cache rather than their own copies.
+    All rows are computed in bulk with one gather and one matmul.
+
+    Properties
+    ----------
+    ```python
+    >>> self.keys           # (neighbor, start_frame, obs_frame), shape = (m, 3)
+    >>> self.traj           # observed trajectories, shape = (m, obs, 2)
+    >>> self.linear_pred    # linear predictions, shape = (m, pred, 2)
+    ```
+
+    Public Methods
+    --------------
+    ```python
+    # make the cache and the row index of each queried neighbor
+    (method) build: (cls: Type[NeighborCache], scene: SceneStore, neighbors: ndarray, start_frame: ndarray, obs_frame: ndarray, pred_length: int, frame_step: int, linear_predict=True) -> tuple[NeighborCache, ndarray]
+    ```
+    """
+
+    def __init__(self, keys: np.ndarray,
+                 traj: np.ndarray,
+                 linear_pred: np.ndarray = None):
+
+        self.keys = keys
+        self.traj = traj
+        self.linear_pred = linear_pred
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @classmethod
+    def build(cls, scene: SceneStore,
+              neighbors: np.ndarray,
+              start_frame: np.ndarray,
+              obs_frame: np.ndarray,
+              pred_length: int,
+              frame_step: int,
+              linear_predict=True):
+        """
+        Make the cache for a batch of (neighbor, start, obs) queries.
+
+        :param neighbors: indexes of neighbors, shape = `(n)`
+        :param start_frame: start frame index of each query, shape = `(n)`
+        :param obs_frame: observation frame index of each query, shape = `(n)`
+        :param pred_length: number of future steps of linear predictions
+        :param frame_step: frame step of all queries
+        :return cache: the cache, type = `NeighborCache`
+        :return index: row index of each query in the cache, shape = `(n)`
+        """
+        keys = np.stack([np.array(neighbors, dtype=np.int64),
+                         np.array(start_frame, dtype=np.int64),
+                         np.array(obs_frame, dtype=np.int64)], axis=-1)
+
+        # rows are sorted by (start, obs, neighbor), i.e., grouped by frames
+        keys = keys.reshape([-1, 3])
+        order = np.lexsort((keys[:, 0], keys[:, 2], keys[:, 1]))
+        keys = keys[order]
+
+        first = np.ones(len(keys), dtype=bool)
+        first[1:] = np.any(keys[1:] != keys[:-1], axis=-1)
+        unique = keys[first]
+
+        index = np.empty(len(keys), dtype=np.int64)
+        index[order] = np.cumsum(first) - 1
+
+        if not len(unique):
+            obs_length = 0
+        else:
+            obs_length = (unique[0, 2] - unique[0, 1]) // frame_step
+
+        frames = (unique[:, 1:2] +
+                  frame_step * np.arange(obs_length)[np.newaxis, :])
+        traj = _fill_invalid(scene.gather_traj(unique[:, 0], frames))
+
+        linear_pred = None
+        if linear_predict:
+            linear_pred = predict_linear(
+                traj, time_pred=obs_length + pred_length)[:, obs_length:]
+
+        return cls(unique, traj, linear_pred), index
+
+
+def _fill_invalid(trajs: np.ndarray, limit=5000) -> np.ndarray:
+    """
+    Replace positions before the first (and after the last) valid
+    step of each trajectory with the nearest valid position, for
+    trajectories that have positions larger than `limit`.
+    Trajectories are modified in place.
+
+    :param trajs: trajectories, shape = `(n, steps, 2)`
+    """
+    if not trajs.size:
+        return trajs
+
+    invalid = np.where(trajs.max(axis=(1, 2)) >= limit)[0]
+    if not len(invalid):
+        return trajs
+
+    steps = trajs.shape[1]
+    available = trajs[invalid, :, 0] <= limit
+    first = np.argmax(available, axis=-1)
+    last = steps - 1 - np.argmax(available[:, ::-1], axis=-1)
+
+    t = np.arange(steps)[np.newaxis, :]
+    source = np.where(t < first[:, np.newaxis], first[:, np.newaxis],
+                      np.minimum(t, last[:, np.newaxis]))
+    trajs[invalid] = np.take_along_axis(trajs[invalid],
+                                        source[:, :, np.newaxis], axis=1)
+    return trajs
@@ -0,0 +1,413 @@
+"""
+@Author: Conghao Wong
+@Date: 2026-10-18 10:05:21
+@LastEditors: Conghao Wong
+@LastEditTime: 2026-10-18 10:05:21
+@Description: file content
+@Github: https://github.com/conghaowoooong
+@Copyright 2022 Conghao Wong, All Rights Reserved.
+"""
+
+import os
+import shutil
+
+import numpy as np
+
+from ._csvReader import TrajectoryTable
+
+
+class SceneStore():
+    """
+    SceneStore
+    ----------
+    A compact (CSR-style) storage of all trajectories in one video clip.
+    It replaces the dense `video_matrix` (shape = `(frames, persons, 2)`).
+    Each person only stores positions from its first frame to its
+    last frame, and each frame stores indexes of agents appeared in it.
+    Positions outside one person's frame range (or missing in the range)
+    are given as `init_position`.
+
+    Properties
+    ----------
+    ```python
+    >>> self.frame_list         # a sorted array of all frame ids
+    >>> self.init_position      # value of positions when agents absent
+    >>> self.first_frame        # first frame index of each person
+    >>> self.last_frame         # last frame index of each person
+    >>> self.person_offsets     # offsets of each person's positions
+    >>> self.positions          # positions of all persons, shape = (n, 2)
+    >>> self.frame_offsets      # offsets of each frame's agent list
+    >>> self.frame_agents       # agent indexes of all frames
+    >>> self.nbytes             # memory cost of this store
+    ```
+
+    Public Methods
+    --------------
+    ```python
+    # trajectory of one person during `frame_list[start:end:step]`
+    (method) traj: (self: SceneStore, person: int, start: int = 0, end: int = None, step: int = 1) -> ndarray
+
+    # positions of a list of persons at one frame index, shape = (n, 2)
+    (method) positions_at: (self: SceneStore, frame: int, persons: ndarray) -> ndarray
+
+    # trajectories of a batch of persons at their own frame indexes
+    (method) gather_traj: (self: SceneStore, persons: ndarray, frames: ndarray) -> ndarray
+
+    # indexes of agents appeared at one frame index
+    (method) neighbors: (self: SceneStore, frame: int) -> ndarray
+
+    # save to or load from a folder of `.npy` files
+    (method) save: (self: SceneStore, save_dir: str) -> None
+    (method) load: (cls: Type[SceneStore], save_dir: str, init_position: float, mmap_mode='r') -> SceneStore
+    ```
+    """
+
+    __version__ = 1.0
+
+    _save_items = ['frame_list', 'first_frame', 'person_offsets',
+                   'positions', 'frame_offsets', 'frame_agents']
+
+    def __init__(self, frame_list: np.ndarray,
+                 first_frame: np.ndarray,
+                 person_offsets: np.ndarray,
+                 positions: np.ndarray,
+                 frame_offsets: np.ndarray,
+                 frame_agents: np.ndarray,
+                 init_position: float):
+
+        self._frame_list = frame_list
+        self._first_frame = first_frame
+        self._person_offsets = person_offsets
+        self._positions = positions
+        self._frame_offsets = frame_offsets
+        self._frame_agents = frame_agents
+        self._init_position = init_position
+
+    @property
+    def frame_list(self) -> np.ndarray:
+        """
+        a sorted array of all frame ids, shape = `(frames)`
+        """
+        return self._frame_list
+
+    @property
+    def init_position(self) -> float:
+        return self._init_position
+
+    @property
+    def frame_number(self) -> int:
+        return len(self._frame_list)
+
+    @property
+    def agent_count(self) -> int:
+        return len(self._first_frame)
+
+    @property
+    def first_frame(self) -> np.ndarray:
+        """
+        index of the first frame that each person appears,
+        shape = `(persons)`
+        """
+        return self._first_frame
+
+    @property
+    def last_frame(self) -> np.ndarray:
+        """
+        index of the last frame that each person appears,
+        shape = `(persons)`
+        """
+        return self._first_frame + np.diff(self._person_offsets) - 1
+
+    @property
+    def person_offsets(self) -> np.ndarray:
+        """
+        positions of the i-th person are
+        `positions[person_offsets[i]:person_offsets[i+1]]`,
+        shape = `(persons + 1)`
+        """
+        return self._person_offsets
+
+    @property
+    def positions(self) -> np.ndarray:
+        """
+        positions of all persons during their frame ranges,
+        shape = `(n, 2)`
+        """
+        return self._positions
+
+    @property
+    def frame_offsets(self) -> np.ndarray:
+        """
+        agents appeared at the i-th frame are
+        `frame_agents[frame_offsets[i]:frame_offsets[i+1]]`,
+        shape = `(frames + 1)`
+        """
+        return self._frame_offsets
+
+    @property
+    def frame_agents(self) -> np.ndarray:
+        """
+        agent indexes of all frames, shape = `(m)`
+        """
+        return self._frame_agents
+
+    @property
+    def nbytes(self) -> int:
+        """
+        memory cost (in bytes) of all arrays in this store
+        """
+        return sum([item.nbytes for item in [self._frame_list,
+                                             self._first_frame,
+                                             self._person_offsets,
+                                             self._positions,
+                                             self._frame_offsets,
+                                             self._frame_agents]])
+
+    @property
+    def dense_nbytes(self) -> int:
+        """
+        memory cost (in bytes) of the equivalent dense `video_matrix`
+        """
+        return self.frame_number * self.agent_count * 2 * 8
+
+    def traj(self, person: int,
+             start: int = 0,
+             end: int = None,
+             step: int = 1) -> np.ndarray:
+        """
+        Get the trajectory of one person during `frame_list[start:end:step]`.
+        It is the same as `video_matrix[start:end:step, person, :]`,
+        but always returns a new array.
+
+        :param person: index of the person
+        :return traj: trajectory, shape = `(steps, 2)`
+        """
+        frames = np.arange(*slice(start, end, step).indices(self.frame_number))
+        traj = self._init_position * np.ones([len(frames), 2])
+
+        first = self._first_frame[person]
+        offset = self._person_offsets[person]
+        length = self._person_offsets[person+1] - offset
+
+        valid = np.where((frames >= first) & (frames < first + length))[0]
+        traj[valid] = self._positions[offset + frames[valid] - first]
+        return traj
+
+    def positions_at(self, frame: int, persons: np.ndarray) -> np.ndarray:
+        """
+        Get positions of several persons at one frame.
+        It is the same as `video_matrix[frame, persons, :]`.
+
+        :param frame: index of the frame
+        :param persons: indexes of persons, shape = `(n)`
+        :return positions: positions, shape = `(n, 2)`
+        """
+        persons = np.array(persons)
+        index = frame - self._first_frame[persons]
+        length = (self._person_offsets[persons + 1] -
+                  self._person_offsets[persons])
+
+        positions = self._init_position * np.ones([len(persons), 2])
+        valid = np.where((index >= 0) & (index < length))[0]
+        positions[valid] = self._positions[self._person_offsets[persons[valid]]
+                                           + index[valid]]
+        return positions
+
+    def gather_traj(self, persons: np.ndarray,
+                    frames: np.ndarray) -> np.ndarray:
+        """
+        Get trajectories of a batch of persons, each at its own frames.
+        The i-th trajectory is the same as `traj(persons[i], ...)` at
+        frame indexes `frames[i]`.
+
+        :param persons: indexes of persons, shape = `(n)`
+        :param frames: frame indexes of each person, shape = `(n, steps)`
+        :return trajs: trajectories, shape = `(n, steps, 2)`
+        """
+        persons = np.array(persons, dtype=np.int64)
+        frames = np.array(frames, dtype=np.int64).reshape([len(persons), -1])
+
+        offset = self._person_offsets[persons][:, np.newaxis]
+        length = self._person_offsets[persons + 1][:, np.newaxis] - offset
+        index = frames - self._first_frame[persons][:, np.newaxis]
+
+        trajs = self._init_position * np.ones(frames.shape + (2,))
+        valid = (index >= 0) & (index < length)
+        trajs[valid] = self._positions[(offset + index)[valid]]
+        return trajs
+
+    def neighbors(self, frame: int) -> np.ndarray:
+        """
+        Get indexes of all agents that appear at one frame.
+        It is the same as `video_neighbor_list[frame]`.
+        """
+        return self._frame_agents[self._frame_offsets[frame]:
+                                  self._frame_offsets[frame+1]]
+
+    def valid_range(self, person: int) -> tuple[int, int]:
+        """
+        Get the first continuous range that one person appears in.
+        It follows the original rules on the dense video matrix, i.e.,
+        the person appears at `start` and disappears at `end`.
+
+        :return start: index of the start frame
+        :return end: index of the end frame (not included)
+        """
+        first = self._first_frame[person]
+        offset = self._person_offsets[person]
+        base = self._positions[offset:self._person_offsets[person+1], 0]
+
+        before = int(first > 0)
+        after = int(first + len(base) < self.frame_number)
+        base = np.concatenate([self._init_position * np.ones(before),
+                               base,
+                               self._init_position * np.ones(after)])
+        diff = base[:-1] - base[1:]
+
+        appear = np.where(diff > self._init_position/2)[0]
+        # disappear in next step
+        disappear = np.where(diff < -self._init_position/2)[0]
+
+        start = first - before + appear[0] + 1 if len(appear) else 0
+        end = (first - before + disappear[0] + 1 if len(disappear)
+               else self.frame_number)
+        return start, end
+
+    def save(self, save_dir: str):
+        """
+        Save all arrays into a folder as plain `.npy` files.
+        Files are written into a temporary folder first, and then
+        moved to `save_dir`, so that other processes never read
+        incomplete files.
+
+        :param save_dir: folder to save the store
+        """
+        temp_dir = '{}.{}.tmp'.format(save_dir, os.getpid())
+        os.makedirs(temp_dir, exist_ok=True)
+
+        for item in self._save_items:
+            np.save(os.path.join(temp_dir, item + '.npy'),
+                    np.ascontiguousarray(getattr(self, item)))
+
+        np.savetxt(os.path.join(temp_dir, 'version.txt'),
+                   [self.__version__])
+
+        if os.path.exists(save_dir):
+            shutil.rmtree(save_dir)
+        os.rename(temp_dir, save_dir)
+
+    @classmethod
+    def load(cls, save_dir: str,
+             init_position: float,
+             mmap_mode='r'):
+        """
+        Load the store from a folder saved by `SceneStore.save`.
+        Arrays are memory-mapped by default, so that they are read
+        only when used, and are shared by processes via the OS cache.
+
+        :param save_dir: folder of the saved store
+        :param init_position: value of positions when agents absent
+        :param mmap_mode: mode to map the files, see `np.load`.
+            Set it to `None` to read all arrays into memory.
+        """
+        arrays = [np.load(os.path.join(save_dir, item + '.npy'),
+                          mmap_mode=mmap_mode)
+                  for item in cls._save_items]
+
+        return cls(*arrays, init_position=init_position)
+
+    @classmethod
+    def saved_version(cls, save_dir: str) -> float:
+        """
+        Get the version of a saved store.
+        It returns `-1` if there are no (complete) saved files.
+        """
+        path = os.path.join(save_dir, 'version.txt')
+        if not os.path.exists(path):
+            return -1
+
+        return float(np.loadtxt(path))
+
+    @classmethod
+    def from_table(cls, table: TrajectoryTable,
+                   init_position: float):
+        """
+        Build the store from a `TrajectoryTable`.
+        """
+        frame_list = table.frame_list
+        count_p = len(table)
+        count_f = len(frame_list)
+
+        # true_frame_id -> frame_index, and record -> person_index
+        frame_index = np.searchsorted(frame_list,
+                                      table.data[:, 0].astype(np.int32))
+        person_index = np.repeat(np.arange(count_p), table.counts())
+
+        # remove repeated records (keep the last one)
+        keys = person_index * count_f + frame_index
+        keep = np.concatenate([keys[1:] != keys[:-1], [True]])
+
+        return cls._from_records(frame_list, count_p,
+                                 person_index[keep],
+                                 frame_index[keep],
+                                 table.data[keep, 1:],
+                                 init_position)
+
+    @classmethod
+    def from_matrix(cls, video_matrix: np.ndarray,
+                    frame_list: np.ndarray,
+                    init_position: float):
+        """
+        Build the store from a dense `video_matrix`,
+        shape = `(frames, persons, 2)`.
+        """
+        frame_index, person_index = np.where(
+            np.not_equal(video_matrix[:, :, 0], init_position))
+        positions = video_matrix[frame_index, person_index]
+
+        index = np.lexsort((frame_index, person_index))
+        return cls._from_records(np.array(frame_list),
+                                 video_matrix.shape[1],
+                                 person_index[index],
+                                 frame_index[index],
+                                 positions[index],
+                                 init_position)
+
+    @classmethod
+    def _from_records(cls, frame_list: np.ndarray,
+                      count_p: int,
+                      person_index: np.ndarray,
+                      frame_index: np.ndarray,
+                      positions: np.ndarray,
+                      init_position: float):
+        """
+        Build the store from records sorted by (person, frame).
+        """
+        count_f = len(frame_list)
+        counts = np.bincount(person_index, minlength=count_p)
+        record_offsets = np.concatenate([[0], np.cumsum(counts)])
+
+        # frame ranges of each person
+        first_frame = frame_index[np.minimum(record_offsets[:-1],
+                                             len(frame_index) - 1)]
+        last_frame = frame_index[np.maximum(record_offsets[1:] - 1, 0)]
+        lengths = np.where(counts > 0, last_frame - first_frame + 1, 0)
+        person_offsets = np.concatenate([[0], np.cumsum(lengths)])
+
+        all_positions = init_position * np.ones([person_offsets[-1], 2])
+        all_positions[person_offsets[person_index] +
+                      frame_index - first_frame[person_index]] = positions
+
+        # agents appeared in each frame
+        index = np.lexsort((person_index, frame_index))
+        frame_agents = person_index[index].astype(np.int32)
+        frame_offsets = np.concatenate(
+            [[0], np.cumsum(np.bincount(frame_index, minlength=count_f))])
+
+        return cls(frame_list,
+                   first_frame.astype(np.int64),
+                   person_offsets.astype(np.int64),
+                   all_positions,
+                   frame_offsets.astype(np.int64),
+                   frame_agents,
+                   init_position)
@@ -0,0 +1,117 @@
+"""
+@Author: Conghao Wong
+@Date: 2026-10-18 17:40:26
+@LastEditors: Conghao Wong
+@LastEditTime: 2026-10-18 17:40:26
+@Description: file content
+@Github: https://github.com/conghaowoooong
+@Copyright 2022 Conghao Wong, All Rights Reserved.
+"""
+
+from multiprocessing import shared_memory
+from typing import Union
+
+import numpy as np
+
+
+class SharedArrays():
+    """
+    SharedArrays
+    ------------
+    A set of named numpy arrays in `multiprocessing.shared_memory`,
+    so that worker processes can read inputs and write outputs without
+    pickling or copying them.
+    The main process creates them with `SharedArrays.create`, and
+    passes `specs` to workers, who attach them with `SharedArrays.attach`.
+    Use them as context managers so that blocks are always closed
+    (and released by the creator).
+
+    Public Methods
+    --------------
+    ```python
+    # create arrays (copies of arrays, or zeros of the given shapes)
+    (method) create: (cls: Type[SharedArrays], arrays: dict[str, ndarray | tuple]) -> SharedArrays
+
+    # attach arrays created by another process
+    (method) attach: (cls: Type[SharedArrays], specs: dict[str, tuple]) -> SharedArrays
+
+    # get one array
+    (method) __getitem__: (self: SharedArrays, name: str) -> ndarray
+    ```
+    """
+
+    def __init__(self, blocks: dict[str, shared_memory.SharedMemory],
+                 specs: dict[str, tuple],
+                 owner=False):
+
+        self.blocks = blocks
+        self.specs = specs
+        self.owner = owner
+
+        self.arrays = {}
+        for name, (_, shape, dtype) in specs.items():
+            self.arrays[name] = np.ndarray(shape, dtype=dtype,
+                                           buffer=blocks[name].buf)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.arrays[name]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """
+        Close all blocks, and release them if they are created
+        by this process.
+        """
+        self.arrays = {}
+        for block in self.blocks.values():
+            block.close()
+            if self.owner:
+                block.unlink()
+        self.blocks = {}
+
+    @classmethod
+    def create(cls, arrays: dict[str, Union[np.ndarray, tuple]]):
+        """
+        Create shared arrays.
+
+        :param arrays: a dict of arrays to copy into shared memory,
+            or `(shape, dtype)` of zero arrays to create
+        """
+        blocks, specs = {}, {}
+        for name, value in arrays.items():
+            if isinstance(value, tuple):
+                shape, dtype = value
+                value = None
+            else:
+                value = np.asarray(value)
+                shape, dtype = value.shape, value.dtype
+
+            dtype = np.dtype(dtype).str
+            size = max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1)
+            blocks[name] = shared_memory.SharedMemory(create=True, size=size)
+            specs[name] = (blocks[name].name, tuple(shape), dtype)
+
+        shared = cls(blocks, specs, owner=True)
+        for name, value in arrays.items():
+            if isinstance(value, tuple):
+                shared[name][...] = 0
+            else:
+                shared[name][...] = value
+
+        return shared
+
+    @classmethod
+    def attach(cls, specs: dict[str, tuple]):
+        """
+        Attach shared arrays created by another process.
+
+        :param specs: `specs` of the created `SharedArrays`
+        """
+        blocks = {name: shared_memory.SharedMemory(name=block_name)
+                  for name, (block_name, _, _) in specs.items()}
+        return cls(blocks, specs, owner=False)
@@ -8,18 +8,30 @@
 @Copyright 2021 Conghao Wong, All Rights Reserved.
 """
 
+import multiprocessing
 import os
+import time
+from types import SimpleNamespace
 
 import cv2
 import numpy as np
 
 from ... import base
-from ...helpmethods import dir_check
+from ...helpmethods import dir_check, predict_linear
 from ..__agent import PredictionAgent
+from ..__agentBatch import AgentBatch
 from ..__args import PredictionArgs
-from ..__maps import MapManager
+from ..__mapStore import MapStore, SocialMapRenderer
+from ..__maps import MASK_PATH, MapManager
+from ..__spatialIndex import SpatialIndex
+from ..__tiledMap import TiledMap
 from ..__traj import EntireTrajectory
-from ..__utils import calculate_length
+from ._cache import CacheManifest, hash_file, hash_items
+from ._csvReader import TrajectoryTable, read_trajectory_csv
+from ._neighborCache import NeighborCache
+from ._sceneStore import SceneStore
+from ._shared import SharedArrays
+from ._windows import TrajectoryWindows
 
 
 class TrajMapNotFoundError(FileNotFoundError):
@@ -47,6 +59,12 @@ class DatasetManager(base.DatasetManager):
     # Sample train data (a list of `PredictionAgent` objects) from dataset
     (method) sample_train_data: (self: DatasetManager) -> list[PredictionAgent]
 
+    # Sample train data as one `AgentBatch` (with shared neighbors)
+    (method) sample_train_batch: (self: DatasetManager) -> AgentBatch
+
+    # Compute all train windows, and make agents only when needed
+    (method) sample_windows: (self: DatasetManager) -> TrajectoryWindows
+
     # Load dataset files
     (method) load_data: (self: DatasetManager) -> DatasetManager
     """
@@ -54,6 +72,10 @@ class DatasetManager(base.DatasetManager):
     arg_type = PredictionArgs
     agent_type = PredictionAgent
 
+    # minimum number of agents for each map worker, since starting a
+    # (spawned) worker costs several seconds to import tensorflow
+    min_agents_per_worker = 5000
+
     def __init__(self, args: PredictionArgs, dataset_name: str, custom_list=[]):
         """
         init parameters:
@@ -66,16 +88,113 @@ class DatasetManager(base.DatasetManager):
         self._dataset_info = base.Dataset.get(dataset_name)
         self._custom_list = custom_list
 
+        self.scene: SceneStore = None
+        self.manifest = CacheManifest(
+            os.path.join(self.cache_root, dataset_name, 'manifest.json'))
+        self._scene_key = None
+
     @property
     def args(self) -> arg_type:
         return self._args
 
+    @property
+    def csv_path(self) -> str:
+        """
+        path of the dataset file `true_pos_.csv`
+        """
+        return os.path.join(self.dataset_info.dataset_dir, 'true_pos_.csv')
+
+    @property
+    def scene_key(self) -> str:
+        """
+        Hash key of the scene data.
+        It changes with contents of the csv file, the dataset info,
+        and arg `init_position`.
+        """
+        if self._scene_key is None:
+            self._scene_key = hash_items('scene',
+                                         SceneStore.__version__,
+                                         hash_file(self.csv_path),
+                                         self.dataset_info.dataset_dir,
+                                         self.dataset_info.order,
+                                         self.args.init_position)
+        return self._scene_key
+
+    @property
+    def agent_key(self) -> str:
+        """
+        Hash key of the sampled train agents.
+        It changes with the scene data and all args used when sampling.
+        """
+        return hash_items('agent',
+                          self.scene_key,
+                          PredictionAgent.__version__,
+                          AgentBatch.__version__,
+                          self.dataset_info.paras,
+                          self.args.obs_frames,
+                          self.args.pred_frames,
+                          self.args.step)
+
+    @property
+    def map_key(self) -> str:
+        """
+        Hash key of the context maps.
+        It changes with the train agents and all args used when
+        building maps.
+        """
+        return hash_items('maps',
+                          self.agent_key,
+                          hash_file(MASK_PATH),
+                          self.args.window_size_guidance_map,
+                          self.args.window_size_expand_meter,
+                          self.args.avoid_size,
+                          self.args.interest_size,
+                          self.args.map_half_size,
+                          self.args.map_dtype,
+                          self.args.map_tile_size)
+
+    @property
+    def guidance_key(self) -> str:
+        """
+        Hash key of the trajectory map (guidance map) only.
+        It is used when social maps are rendered on the fly.
+        """
+        return hash_items('guidance',
+                          self.agent_key,
+                          hash_file(MASK_PATH),
+                          self.args.window_size_guidance_map,
+                          self.args.window_size_expand_meter,
+                          self.args.map_tile_size)
+
+    @property
+    def guidance_file(self) -> str:
+        """
+        File name of the built trajectory map (guidance map).
+        """
+        return 'trajMap.npz' if self.args.map_tile_size else 'trajMap.png'
+
+    def check_cache(self, path: str, key: str) -> bool:
+        """
+        Check if the cached artifact at `path` can be reused,
+        and log the hit or miss.
+
+        :param path: path of the artifact
+        :param key: hash key computed from the current sources
+        """
+        hit = self.manifest.check(path, key)
+        self.log('Cache {} for `{}`.'.format('hit' if hit else 'miss', path))
+        return hit
+
     def load_data(self):
         if len(self._custom_list) == 3:
-            self.video_neighbor_list, self.video_matrix, self.frame_list = self._custom_list
+            _, video_matrix, frame_list = self._custom_list
+            self.scene = SceneStore.from_matrix(video_matrix,
+                                                frame_list,
+                                                self.args.init_position)
         else:
-            self.video_neighbor_list, self.video_matrix, self.frame_list = self._load_data()
+            self.scene = self._load_data()
 
+        self.frame_list = self.scene.frame_list
         self.all_entire_trajectories = self._prepare_agent_data()
         return self
 
@@ -86,127 +205,96 @@ class DatasetManager(base.DatasetManager):
         self.load_data()
         return self._sample_train_data()
 
-    def _load_data(self):
+    def sample_train_batch(self) -> AgentBatch:
+        """
+        Read Dataset, load data, and make train data as one `AgentBatch`.
+        Agents are the same as those given by `sample_train_data`.
+        """
+        self.load_data()
+        return self._sample_train_batch()
+
+    def _load_data(self) -> SceneStore:
         """
         Load (or make) dataset data
 
-        :return video_neighbor_list: a `np.ndarray` that contains all neighbor info
-        :return video_matrix: a `np.ndarray` that contains all trajectories, axises are time and agent index
-        :return frame_list: a list of agent index
+        :return scene: a `SceneStore` object that contains all
+            trajectories and neighbor info of the dataset
         """
-        dir_check('./dataset_npz')
-        base_path = dir_check('./dataset_npz/{}'.format(self.dataset_name))
-        npy_path = './dataset_npz/{}/data.npz'.format(self.dataset_name)
+        dir_check(self.cache_root)
+        base_path = dir_check(os.path.join(self.cache_root,
+                                           self.dataset_name))
+        scene_path = os.path.join(base_path, 'scene')
+        npz_path = os.path.join(base_path, 'data.npz')
 
-        if os.path.exists(npy_path):
-            all_data = np.load(npy_path, allow_pickle=True)
-            video_neighbor_list = all_data['video_neighbor_list']
-            video_matrix = all_data['video_matrix']
-            frame_list = all_data['frame_list']
+        if (self.check_cache(scene_path, self.scene_key) and
+                SceneStore.saved_version(scene_path) == SceneStore.__version__):
+            scene = SceneStore.load(scene_path, self.args.init_position)
 
         else:
-            person_data, frame_list = self._load_csv(self.dataset_name)
-            person_list = list(person_data.keys())
+            # Old pickled `data.npz` files have no keys to check them
+            # with the csv file, so they are removed and scene data
+            # are always rebuilt from the csv file
+            table = self._load_csv(self.dataset_name)
+            scene = SceneStore.from_table(table, self.args.init_position)
 
-            count_p = len(person_list)
-            count_f = len(frame_list)
-
-            video_matrix = self.args.init_position * \
-                np.ones([count_f, count_p, 2])
-
-            # true_person_id -> person_index
-            person_dict = dict(zip(person_list, np.arange(count_p)))
-
-            # true_frame_id -> frame_index
-            frame_dict = dict(zip(frame_list, np.arange(count_f)))
-
-            for person, person_index in self.log_timebar(
-                    person_dict.items(),
-                    return_enumerate=False):
+            scene.save(scene_path)
+            self.manifest.update(scene_path, self.scene_key)
+            if os.path.exists(npz_path):
+                os.remove(npz_path)
+                self.log('Remove the old scene data `{}`.'.format(npz_path))
 
-                frame_list_current \
-                    = (person_data[person]).T[0].astype(np.int32).tolist()
-                frame_index_current \
-                    = np.array([frame_dict[frame_current]
-                                for frame_current in frame_list_current])
-                video_matrix[frame_index_current, person_index, :] \
-                    = person_data[person][:, 1:]
+            scene = SceneStore.load(scene_path, self.args.init_position)
 
-            video_neighbor_list = np.array([
-                np.where(np.not_equal(data.T[0], self.args.init_position))[0]
-                for data in video_matrix], dtype=object)
+        self.log(('Scene data of `{}` costs {:.2f} MB ' +
+                  '(dense video matrix: {:.2f} MB).').format(
+            self.dataset_name,
+            scene.nbytes / 1024 ** 2,
+            scene.dense_nbytes / 1024 ** 2))
 
-            np.savez(npy_path,
-                     video_neighbor_list=video_neighbor_list,
-                     video_matrix=video_matrix,
-                     frame_list=frame_list)
+        return scene
 
-        return video_neighbor_list, video_matrix, frame_list
-
-    def _load_csv(self, dataset_name) -> tuple[dict[int, np.ndarray], list]:
+    def _load_csv(self, dataset_name) -> TrajectoryTable:
         """
         Read trajectory data from csv file.
 
         :param dataset_name: name of the dataset. See Details in `datasetManager.py`
-        :return person_data: data sorted by person ids. type = `dict[int, np.ndarray]`
-        :return frame_list: a list of all frame indexs
+        :return table: data sorted by person ids and frames, type = `TrajectoryTable`
         """
-        dataset_dir_current = self.dataset_info.dataset_dir
         order = self.dataset_info.order
-
-        csv_file_path = os.path.join(dataset_dir_current, 'true_pos_.csv')
-        data = np.genfromtxt(csv_file_path, delimiter=',').T
-
-        # Load data, and sort by person id
-        person_data = {}
-        person_list = set(data.T[1].astype(np.int32))
-        for person in person_list:
-            index_current = np.where(data.T[1] == person)[0]
-            person_data[person] = np.column_stack([
-                data[index_current, 0],
-                data[index_current, 2 + order[0]],
-                data[index_current, 2 + order[1]]])
-
-        frame_list = list(set(data.T[0].astype(np.int32)))
-        frame_list.sort()
+        csv_file_path = self.csv_path
+        table = read_trajectory_csv(csv_file_path, order)
 
         self.log('Load dataset {} done.'.format(csv_file_path))
-        return person_data, frame_list
+        return table
 
     def _prepare_agent_data(self) -> list[EntireTrajectory]:
         """
-        Get data of type `EntireTrajectory` from video matrix for each agent in dataset.
+        Get data of type `EntireTrajectory` from the scene store for each agent in dataset.
         """
-        self.frame_number, self.agent_count, _ = self.video_matrix.shape
+        self.frame_number = self.scene.frame_number
+        self.agent_count = self.scene.agent_count
         all_entire_trajectories = []
         for person in range(self.agent_count):
             all_entire_trajectories.append(
-                EntireTrajectory(person,
-                                 self.video_neighbor_list,
-                                 self.video_matrix,
-                                 self.frame_list,
-                                 self.args.init_position))
+                EntireTrajectory(person, self.scene))
 
         return all_entire_trajectories
 
-    def _get_trajectory(self, agent_index, start_frame, obs_frame, end_frame, frame_step=1, max_neighbor=15, add_noise=False):
+    def _get_trajectory(self, agent_index, start_frame, obs_frame, end_frame, frame_step=1, max_neighbor=15, add_noise=False, neighbor_list=None):
         """
         Sample single part of one specific agent's trajectory from `EntireTrajectory`.
 
+        :param neighbor_list: indexes of neighbors, default are selected
+            by `get_neighbors` at the last observation frame
         :return agent: agent manager, type = `PredictionAgent`
         """
         trajecotry_current = self.all_entire_trajectories[agent_index]
         frame_list = trajecotry_current.frame_list
 
-        neighbor_list = self.video_neighbor_list[obs_frame - frame_step]
-
-        if len(neighbor_list) > max_neighbor + 1:
-            neighbor_pos = self.video_matrix[obs_frame -
-                                             frame_step, neighbor_list, :]
-            target_pos = self.video_matrix[obs_frame -
-                                           frame_step, agent_index:agent_index+1, :]
-            dis = calculate_length(neighbor_pos - target_pos)
-            neighbor_list = neighbor_list[np.argsort(dis)[1:max_neighbor+1]]
+        if neighbor_list is None:
+            neighbor_list = self.get_neighbors([agent_index],
+                                               [obs_frame - frame_step],
+                                               max_neighbor)[0]
 
         neighbor_agents = [self.all_entire_trajectories[nei]
                            for nei in neighbor_list]
@@ -220,53 +308,172 @@ class DatasetManager(base.DatasetManager):
                                            frame_step=frame_step,
                                            add_noise=add_noise)
 
-    def _sample_train_data(self) -> list[PredictionAgent]:
+    def get_neighbors(self, agent_index: np.ndarray,
+                      frames: np.ndarray,
+                      max_neighbor=15) -> list[np.ndarray]:
         """
-        Sample all train data (type = `PredictionAgent`) from all `EntireTrajectory`.
+        Select neighbors of a batch of agents.
+        When there are more than `max_neighbor + 1` agents in the frame,
+        only the `max_neighbor` nearest agents (except the nearest one,
+        i.e., the agent itself) are selected. Otherwise, all agents in
+        the frame are selected.
+        Queries are grouped by frames, so that the spatial index of each
+        frame is built only once.
+
+        :param agent_index: indexes of target agents, shape = `(n)`
+        :param frames: frame index of each target agent, shape = `(n)`
+        :return neighbors: a list of neighbor indexes of each target agent
+        """
+        agent_index = np.array(agent_index, dtype=np.int64)
+        frames = np.array(frames, dtype=np.int64)
+
+        results = [None for _ in range(len(agent_index))]
+        order = np.argsort(frames, kind='stable')
+        unique, starts = np.unique(frames[order], return_index=True)
+
+        for frame, group in zip(unique, np.split(order, starts[1:])):
+            neighbor_list = self.scene.neighbors(frame)
+
+            if len(neighbor_list) <= max_neighbor + 1:
+                for index in group:
+                    results[index] = neighbor_list
+                continue
+
+            index = SpatialIndex(self.scene.positions_at(frame, neighbor_list))
+            nearest, _ = index.query(
+                self.scene.positions_at(frame, agent_index[group]),
+                k=max_neighbor + 1)
+
+            for index, nearest_current in zip(group, nearest):
+                results[index] = neighbor_list[nearest_current[1:]]
+
+        return results
+
+    def sample_windows(self) -> TrajectoryWindows:
         """
+        Compute all train windows (agent, start, obs, end) of the
+        dataset without making any `PredictionAgent` objects.
+        Agents are made only when indexing the returned windows.
+        """
+        if self.scene is None:
+            self.load_data()
+
         sample_rate, frame_rate = self.dataset_info.paras
         frame_step = int(0.4 / (sample_rate / frame_rate))
 
-        # Sample all train agents
-        train_agents = []
+        return TrajectoryWindows.sample(
+            self.scene,
+            start_frame=[t.start_frame for t in self.all_entire_trajectories],
+            end_frame=[t.end_frame for t in self.all_entire_trajectories],
+            obs_frames=self.args.obs_frames,
+            pred_frames=self.args.pred_frames,
+            step=self.args.step,
+            frame_step=frame_step,
+            agent_factory=self._get_trajectory)
+
+    def _sample_train_data(self) -> list[PredictionAgent]:
+        """
+        Sample all train data (type = `PredictionAgent`) from all `EntireTrajectory`.
+        """
+        return list(self._sample_train_batch())
 
-        for agent_id, _ in self.log_timebar(range(self.agent_count),
-                                            'Prepare train data...'):
-            trajecotry_current = self.all_entire_trajectories[agent_id]
-            start_frame = trajecotry_current.start_frame
-            end_frame = trajecotry_current.end_frame
+    def _sample_train_batch(self) -> AgentBatch:
+        """
+        Sample all train data into one `AgentBatch`.
+        Trajectories and linear predictions of neighbors are computed
+        only once for each `(neighbor, start_frame, obs_frame)` in a
+        `NeighborCache`, and agents keep indexes of their neighbors.
+        When `args.pred_frames == -1`, agents predict until the end of
+        their trajectories, and their future lengths are kept in
+        `future_length` of the batch.
+        """
+        windows = self.sample_windows()
+        frame_step = windows.frame_step
+        obs_length = windows.obs_length
+
+        # futures have different lengths when `pred_frames == -1`, and
+        # they are padded to the longest one
+        frames = windows.get_frames()
+        total_frame = frames.shape[1]
+        pred_length = total_frame - obs_length
+
+        neighbors = self.get_neighbors(windows.agent_index,
+                                       windows.obs_frame - frame_step)
+        count = np.array([len(n) for n in neighbors], dtype=np.int64)
+
+        cache, neighbor_index = NeighborCache.build(
+            self.scene,
+            neighbors=(np.concatenate(neighbors) if len(neighbors)
+                       else np.zeros(0, dtype=np.int64)),
+            start_frame=np.repeat(windows.start_frame, count),
+            obs_frame=np.repeat(windows.obs_frame, count),
+            pred_length=pred_length,
+            frame_step=frame_step)
+
+        self.log(('{} neighbors of {} train agents are stored in {} ' +
+                  'cached rows.').format(count.sum(), len(windows), len(cache)))
+
+        # trajectories of agents are `float32`, as `PredictionAgent` stores them
+        traj = windows.get_obs().astype(np.float32)
+        pred_linear = predict_linear(traj.astype(np.float64),
+                                     time_pred=total_frame)[:, obs_length:]
+
+        future_length = None
+        if windows.pred_length <= 0:
+            future_length = windows.get_future_length()
+            steps = ((frames[:, obs_length:] - frames[:, obs_length:obs_length+1])
+                     // frame_step)
+            pred_linear = np.take_along_axis(pred_linear,
+                                             steps[:, :, np.newaxis], axis=1)
+
+        return AgentBatch(
+            traj=traj,
+            groundtruth=windows.get_groundtruth().astype(np.float32),
+            frame_list=self.scene.frame_list[frames],
+            neighbor_offsets=np.concatenate([[0], np.cumsum(count)]),
+            all_neighbor_traj=cache.traj,
+            pred_linear=pred_linear.astype(np.float32),
+            all_neighbor_linear_pred=cache.linear_pred,
+            neighbor_index=neighbor_index,
+            future_length=future_length)
+
+    def make_guidance_map(self, agents: AgentBatch,
+                          base_path: str,
+                          save_map_file: str = 'trajMap.png',
+                          save_para_file: str = 'para.txt'):
+        """
+        Make and save the trajectory map (and map parameters) only.
+        Social maps are rendered on the fly from agents when they are
+        used (see `args.render_maps`).
 
-            for p in range(start_frame, end_frame, self.args.step * frame_step):
-                # Normal mode
-                if self.args.pred_frames > 0:
-                    if p + (self.args.obs_frames + self.args.pred_frames) * frame_step > end_frame:
-                        break
+        :param agents: agents that ready to calculate maps
+        :param base_path: base folder to save the map and map parameters
+        :param save_map_file: file name to save the built traj map
+        :param save_para_file: file name to save the map parameters
+        """
+        map_manager = MapManager(self.args, agents)
+        self._build_guidance_map(map_manager, agents,
+                                 os.path.join(base_path, save_map_file))
 
-                    obs = p + self.args.obs_frames * frame_step
-                    end = p + (self.args.obs_frames +
-                               self.args.pred_frames) * frame_step
+        np.savetxt(os.path.join(base_path, save_para_file),
+                   map_manager.real2grid_paras)
 
-                # Infinity mode, only works for destination models
-                elif self.args.pred_frames == -1:
-                    if p + (self.args.obs_frames + 1) * frame_step > end_frame:
-                        break
+    def _build_guidance_map(self, map_manager: MapManager,
+                            agents: AgentBatch,
+                            save: str):
+        """
+        Build and save the trajectory map, as tiles when
+        `args.map_tile_size` is set.
+        """
+        if self.args.map_tile_size:
+            return map_manager.build_tiled_guidance_map(
+                agents=agents,
+                tile_size=self.args.map_tile_size,
+                save=save)
 
-                    obs = p + self.args.obs_frames * frame_step
-                    end = end_frame
+        return map_manager.build_guidance_map(agents=agents, save=save)
 
-                else:
-                    raise ValueError(
-                        '`pred_frames` should be a positive integer or -1.')
-
-                train_agents.append(self._get_trajectory(agent_id,
-                                                         start_frame=p,
-                                                         obs_frame=obs,
-                                                         end_frame=end,
-                                                         frame_step=frame_step,
-                                                         add_noise=False))
-        return train_agents
-
-    def make_maps(self, agents: list[PredictionAgent],
+    def make_maps(self, agents: AgentBatch,
                   base_path: str,
                   save_map_file: str = None,
                   save_social_file: str = 'socialMap.npy',
@@ -274,13 +481,16 @@ class DatasetManager(base.DatasetManager):
                   save_centers_file: str = 'centers.txt'):
         """
         Make maps for input agents, and save them in the numpy format.
+        Social maps are quantized into `args.map_dtype`, and written
+        into a memory-mapped `.npy` file one by one.
 
-        :param agents: a list of agents that ready to calculate maps
+        :param agents: agents that ready to calculate maps
         :param base_path: base folder to save the map and map parameters
         :param load_map_file: file name for the saved trajectory map (`.jpg` or `.png`).
         default is `None`. When this item is `None`, MapManager will build
         trajectory maps according to trajectories of the input agents.
         :param save_map_file: file name to save the built traj map
+            (`.png`, or `.npz` for tiled maps)
         :param save_social_file: file name to save the social map (already cut)
         :param save_para_file: file name to save the map parameters
         :param save_centers_file: path to save the centers
@@ -289,33 +499,87 @@ class DatasetManager(base.DatasetManager):
         map_manager = MapManager(self.args, agents)
 
         if save_map_file:
-            traj_map = map_manager.build_guidance_map(
-                agents=agents,
-                save=os.path.join(base_path, save_map_file))
-
-        social_maps = []
-        centers = []
-        for agent in self.log_timebar(agents,
-                                      'Build maps...',
-                                      return_enumerate=False):
-
-            centers.append(agent.traj[-1:, :])
-            social_maps.append(map_manager.build_social_map(
-                target_agent=agent,
-                traj_neighbors=agent.get_pred_traj_neighbor_linear()))
-
-        social_maps = np.array(social_maps)  # (batch, a, b)
-
-        centers = np.concatenate(centers, axis=0)
-        centers = map_manager.real2grid(centers)
-        cuts = map_manager.cut_map(social_maps,
-                                   centers,
-                                   self.args.map_half_size)
+            self._build_guidance_map(map_manager, agents,
+                                     os.path.join(base_path, save_map_file))
+
+        # social maps are rendered into their local windows directly
+        half_size = self.args.map_half_size
+        centers = map_manager.real2grid(agents.traj[:, -1, :])
+
+        social_path = os.path.join(base_path, save_social_file)
+        temp_path = '{}.{}.tmp.npy'.format(social_path, os.getpid())
+        cuts = np.lib.format.open_memmap(
+            temp_path, mode='w+', dtype=self.args.map_dtype,
+            shape=(len(agents), 2 * half_size, 2 * half_size))
+
+        inputs = get_social_inputs(agents, centers)
+
+        # small datasets are built faster without starting workers
+        workers = min(self.args.map_workers,
+                      len(agents) // self.min_agents_per_worker)
+
+        if workers > 1:
+            self._make_social_maps_parallel(map_manager, inputs, cuts,
+                                            workers)
+        else:
+            _make_social_maps(self.args, map_manager, inputs, cuts,
+                              self.log_timebar(range(len(agents)),
+                                               'Build maps...',
+                                               return_enumerate=False))
+
+        cuts.flush()
+        del cuts
+        os.replace(temp_path, social_path)
+
         paras = map_manager.real2grid_paras
 
         np.savetxt(os.path.join(base_path, save_centers_file), centers)
         np.savetxt(os.path.join(base_path, save_para_file), paras)
-        np.save(os.path.join(base_path, save_social_file), cuts)
+
+    def _make_social_maps_parallel(self, map_manager: MapManager,
+                                   inputs: dict[str, np.ndarray],
+                                   cuts: np.ndarray,
+                                   workers: int):
+        """
+        Build social maps with several processes.
+        Inputs, the map shape, and outputs are placed in shared memory,
+        so that each worker only receives a range of agents to render.
+        Results are the same as building them in the main process.
+
+        :param map_manager: the map manager of this dataset
+        :param inputs: linear predictions of agents and their neighbors,
+            and map centers
+        :param cuts: the array to save social maps (already quantized)
+        :param workers: number of processes
+        """
+        count = len(cuts)
+        self.log('Build social maps of {} agents with {} workers...'.format(
+            count, workers))
+
+        arrays = dict(inputs)
+        arrays['map_shape'] = np.array(map_manager.void_map.shape)
+        arrays['paras'] = map_manager.real2grid_paras
+        arrays['maps'] = (cuts.shape, cuts.dtype)
+
+        # several chunks for each worker to balance their loads
+        bounds = np.linspace(0, count, min(4 * workers, count) + 1)
+        bounds = bounds.astype(np.int64)
+
+        # use `spawn` to avoid forking an initialized tensorflow runtime
+        context = multiprocessing.get_context('spawn')
+
+        with SharedArrays.create(arrays) as shared:
+            tasks = [(self.args, shared.specs, start, end)
+                     for start, end in zip(bounds[:-1], bounds[1:])]
+
+            with context.Pool(workers) as pool:
+                for _ in self.log_timebar(
+                        pool.imap_unordered(_build_social_maps, tasks),
+                        'Build maps...',
+                        return_enumerate=False):
+                    pass
+
+            cuts[:] = shared['maps']
 
 
 class DatasetsManager(base.DatasetsManager):
@@ -328,11 +592,11 @@ class DatasetsManager(base.DatasetsManager):
     --------------
     ```python
     # Prepare train agents from `DatasetManager`s
-    (method) load_fromManagers: (self: DatasetsManager, dataset_managers: list[DatasetManager], mode='test') -> list[PredictionAgent]
+    (method) load_fromManagers: (self: DatasetsManager, dataset_managers: list[DatasetManager], mode='test') -> AgentBatch
+    (method) load_fromManager: (self: DatasetsManager, dm: DatasetManager) -> AgentBatch
 
-    # Save and load agents' data
-    (method) zip_and_save: (save_dir, agents: list[PredictionAgent]) -> None
-    (method) load_and_unzip: (cls: Type[DatasetsManager], save_dir) -> list[PredictionAgent]
+    # Build caches of several datasets in parallel
+    (method) prepare_parallel: (self: DatasetsManager, dataset_managers: list[DatasetManager]) -> None
     ```
     """
 
@@ -348,138 +612,343 @@ class DatasetsManager(base.DatasetsManager):
         return self._args
 
     def load_fromManagers(self, dataset_managers: list[DatasetManager],
-                          mode='test') -> list[PredictionAgent]:
+                          mode='test') -> AgentBatch:
         """
         Make or load train files to get train agents.
-        (a list of agent managers, type = `PredictionAgent`)
+        (a batch of agents, type = `AgentBatch`)
+        When `args.load_workers > 1`, caches of all subsets are built
+        concurrently first, and then loaded in the given order.
 
         :param dataset_managers: a list of dataset managers (`DatasetManager`)
-        :return all_agents: a list of train agents (`PredictionAgent`)
+        :return all_agents: train agents of all datasets (`AgentBatch`)
         """
         all_agents = []
-        count = 1
-        dir_check('./dataset_npz/')
+        dir_check(self.datasetManager_type.cache_root)
 
-        for dm in dataset_managers:
+        if self.args.load_workers > 1:
+            self.prepare_parallel(dataset_managers)
+
+        for count, dm in enumerate(dataset_managers):
             print('({}/{})  Prepare test data in `{}`...'.format(
-                count, len(dataset_managers), dm.dataset_name))
+                count + 1, len(dataset_managers), dm.dataset_name))
+            all_agents.append(self.load_fromManager(dm))
 
-            if (self.args.obs_frames, self.args.pred_frames) == (8, 12):
-                data_path = './dataset_npz/{}/agent'.format(dm.dataset_name)
-            else:
-                data_path = './dataset_npz/{}/agent_{}to{}'.format(dm.dataset_name,
-                                                                   self.args.obs_frames,
-                                                                   self.args.pred_frames)
+        self.log('Cache: {} hits, {} misses.'.format(
+            sum([dm.manifest.hits for dm in dataset_managers]),
+            sum([dm.manifest.misses for dm in dataset_managers])))
+        return AgentBatch.concat(all_agents)
 
-            endstring = '' if self.args.step == 4 else self.args.step
-            data_path += '{}.npz'.format(endstring)
+    def get_cache_paths(self, dm: DatasetManager) -> tuple[str, str]:
+        """
+        Get paths of the cached agents and maps of one dataset.
 
-            if not os.path.exists(data_path):
-                agents = dm.sample_train_data()
-                self.zip_and_save(data_path, agents)
-            else:
-                agents = self.load_and_unzip(data_path)
-            self.log('Successfully load train agents from `{}`'.format(data_path))
-
-            if self.args.use_maps:
-                map_path = dir_check(data_path.split('.np')[0] + '_maps')
-                map_file = ('trajMap.png' if not self.args.use_extra_maps
-                            else 'trajMap_load.png')
-
-                try:
-                    agents = self.load_maps(map_path, agents,
-                                            map_file=map_file,
-                                            social_file='socialMap.npy',
-                                            para_file='para.txt',
-                                            centers_file='centers.txt')
-
-                except TrajMapNotFoundError:
-                    path = os.path.join(map_path, map_file)
-                    self.log(s := ('Trajectory map `{}`'.format(path) +
-                                   ' not found, stop running...'),
-                             level='error')
-                    exit()
-
-                except:
-                    self.log('Load maps failed, start re-making...')
+        :return data_path: folder of the agent files
+        :return map_path: folder of the map files
+        """
+        if (self.args.obs_frames, self.args.pred_frames) == (8, 12):
+            name = 'agent'
+        else:
+            name = 'agent_{}to{}'.format(self.args.obs_frames,
+                                         self.args.pred_frames)
 
-                    dm.make_maps(agents, map_path,
-                                 save_map_file='trajMap.png',
-                                 save_social_file='socialMap.npy',
-                                 save_para_file='para.txt',
-                                 save_centers_file='centers.txt')
+        data_path = os.path.join(dm.cache_root, dm.dataset_name, name)
+
+        endstring = '' if self.args.step == 4 else self.args.step
+        data_path += '{}'.format(endstring)
+        map_path = data_path + '_maps'
+        return data_path, map_path
+
+    def is_cached(self, dm: DatasetManager) -> bool:
+        """
+        Check if agents (and maps) of one dataset are all cached
+        with valid keys.
+        """
+        data_path, map_path = self.get_cache_paths(dm)
+
+        if not dm.manifest.is_valid(data_path, dm.agent_key):
+            return False
+
+        if self.args.use_maps and self.args.render_maps:
+            return dm.manifest.is_valid(os.path.join(map_path, dm.guidance_file),
+                                        dm.guidance_key)
+
+        if self.args.use_maps:
+            return dm.manifest.is_valid(map_path, dm.map_key)
+
+        return True
 
-                    agents = self.load_maps(map_path, agents,
-                                            map_file=map_file,
-                                            social_file='socialMap.npy',
-                                            para_file='para.txt',
-                                            centers_file='centers.txt')
+    def prepare_parallel(self, dataset_managers: list[DatasetManager]):
+        """
+        Build caches (scene data, agents, and maps) of several datasets
+        concurrently in a process pool with `args.load_workers` workers.
+        Datasets that have been cached will be skipped.
+        """
+        names = []
+        for dm in dataset_managers:
+            if (not dm.dataset_name in names) and (not self.is_cached(dm)):
+                names.append(dm.dataset_name)
+
+        if len(names) <= 1:
+            return
+
+        workers = min(self.args.load_workers, len(names))
+        self.log('Build caches of {} datasets with {} workers...'.format(
+            len(names), workers))
 
-                self.log('Successfully load maps from `{}`.'.format(map_path))
+        # use `spawn` to avoid forking an initialized tensorflow runtime
+        context = multiprocessing.get_context('spawn')
+        tasks = [(type(self), self.args, name,
+                  self.datasetManager_type.cache_root) for name in names]
 
-            all_agents += agents
-            count += 1
-        return all_agents
+        with context.Pool(workers) as pool:
+            for name, cost, pid in self.log_timebar(
+                    pool.imap_unordered(_build_caches, tasks),
+                    'Build caches...',
+                    return_enumerate=False):
 
-    def zip_and_save(self, save_dir, agents: list[PredictionAgent]):
-        save_dict = {}
-        for index, agent in enumerate(agents):
-            save_dict[str(index)] = agent.zip_data()
-        np.savez(save_dir, **save_dict)
+                self.log('Caches of `{}` built in {:.2f}s by worker {}.'.format(
+                    name, cost, pid))
 
-    def load_and_unzip(self, save_dir) -> list[PredictionAgent]:
-        save_dict = np.load(save_dir, allow_pickle=True)
+    def load_fromManager(self, dm: DatasetManager) -> AgentBatch:
+        """
+        Make or load train agents (and their maps) of one dataset.
 
-        if save_dict['0'].tolist()['__version__'] < PredictionAgent.__version__:
-            self.log(('Saved agent managers\' version is {}, ' +
-                      'which is lower than current {}. Please delete ' +
-                      'them and re-run this program, or there could ' +
-                      'happen something wrong.').format(save_dict['0'].tolist()['__version__'],
-                                                        PredictionAgent.__version__),
-                     level='error')
+        :param dm: the dataset manager, type = `DatasetManager`
+        :return agents: train agents of the dataset (`AgentBatch`)
+        """
+        data_path, map_path = self.get_cache_paths(dm)
 
-        return [PredictionAgent().load_data(save_dict[key].tolist()) for key in save_dict.keys()]
+        if not dm.check_cache(data_path, agent_key := dm.agent_key):
+            agents = dm.sample_train_batch()
+            agents.save(data_path)
+            dm.manifest.update(data_path, agent_key)
+
+            # remove agents saved in the legacy (pickled) format
+            if os.path.exists(legacy_path := data_path + '.npz'):
+                os.remove(legacy_path)
+        else:
+            agents = AgentBatch.load(data_path)
+        self.log('Successfully load train agents from `{}`'.format(data_path))
+
+        if self.args.use_maps:
+            map_path = dir_check(map_path)
+            map_file = (dm.guidance_file if not self.args.use_extra_maps
+                        else 'trajMap_load.png')
+
+            if self.args.render_maps:
+                if not dm.check_cache(guidance_path := os.path.join(map_path, dm.guidance_file),
+                                      guidance_key := dm.guidance_key):
+                    dm.make_guidance_map(agents, map_path,
+                                         save_map_file=dm.guidance_file,
+                                         save_para_file='para.txt')
+                    dm.manifest.update(guidance_path, guidance_key)
+
+            elif not dm.check_cache(map_path, map_key := dm.map_key):
+                dm.make_maps(agents, map_path,
+                             save_map_file=dm.guidance_file,
+                             save_social_file='socialMap.npy',
+                             save_para_file='para.txt',
+                             save_centers_file='centers.txt')
+                dm.manifest.update(map_path, map_key)
+
+            try:
+                agents = self.load_maps(map_path, agents,
+                                        map_file=map_file,
+                                        social_file='socialMap.npy',
+                                        para_file='para.txt',
+                                        centers_file='centers.txt')
+
+            except TrajMapNotFoundError:
+                path = os.path.join(map_path, map_file)
+                self.log(s := ('Trajectory map `{}`'.format(path) +
+                               ' not found, stop running...'),
+                         level='error')
+                exit()
+
+            except:
+                self.log('Load maps failed, start re-making...')
+
+                if self.args.render_maps:
+                    dm.make_guidance_map(agents, map_path,
+                                         save_map_file=dm.guidance_file,
+                                         save_para_file='para.txt')
+                    dm.manifest.update(guidance_path, guidance_key)
+                else:
+                    dm.make_maps(agents, map_path,
+                                 save_map_file=dm.guidance_file,
+                                 save_social_file='socialMap.npy',
+                                 save_para_file='para.txt',
+                                 save_centers_file='centers.txt')
+                    dm.manifest.update(map_path, map_key)
+
+                agents = self.load_maps(map_path, agents,
+                                        map_file=map_file,
+                                        social_file='socialMap.npy',
+                                        para_file='para.txt',
+                                        centers_file='centers.txt')
+
+            self.log('Successfully load maps from `{}`.'.format(map_path))
+
+        return agents
 
     def load_maps(self, base_path: str,
-                  agents: list[PredictionAgent],
+                  agents: AgentBatch,
                   map_file: str,
                   social_file: str,
                   para_file: str,
-                  centers_file: str) -> list[PredictionAgent]:
+                  centers_file: str) -> AgentBatch:
         """
         Load maps from the base folder
 
         :param base_path: base save folder
         :param agents: agents to assign maps
-        :param map_file: file name for traj maps, support `.jpg` or `.png`
+        :param map_file: file name for traj maps, support `.jpg` or `.png`,
+            or `.npz` for tiled maps
         :param social_file: file name for social maps, support `.npy`
         :param para_file: file name for map parameters, support `.txt`
         :param centers_file: file name for centers, support `.txt`
 
-        :return agents: agents with maps
+        :return agents: agents with maps (a `MapStore`)
+
+        Social maps (and centers) are not loaded but rendered from
+        agents when they are used if `args.render_maps` is set.
         """
-        traj_map = cv2.imread(os.path.join(base_path, map_file))
+        if map_file.endswith('.npz'):
+            traj_map = TiledMap.load(os.path.join(base_path, map_file))
+            traj_map = traj_map.dequantize()
 
-        if traj_map is None:
+        elif (traj_map := cv2.imread(os.path.join(base_path, map_file))) is None:
             if self.args.use_extra_maps:
                 raise TrajMapNotFoundError
             else:
                 raise FileNotFoundError
 
-        traj_map = (traj_map[:, :, 0]).astype(np.float32)/255.0
+        else:
+            traj_map = (traj_map[:, :, 0]).astype(np.float32)/255.0
 
-        social_map = np.load(os.path.join(
-            base_path, social_file), allow_pickle=True)
         para = np.loadtxt(os.path.join(base_path, para_file))
-        centers = np.loadtxt(os.path.join(base_path, centers_file))
 
+        if self.args.render_maps:
+            map_manager = MapManager(self.args, init_manager=SimpleNamespace(
+                void_map=np.broadcast_to(np.float32(0), traj_map.shape),
+                W=para[0], b=para[1]))
+
+            centers = map_manager.real2grid(agents.traj[:, -1, :])
+            social_map = SocialMapRenderer(
+                map_manager, **get_social_inputs(agents, centers),
+                half_size=self.args.map_half_size)
+
+        else:
+            social_map = np.load(os.path.join(base_path, social_file),
+                                 mmap_mode='r')
+            centers = np.loadtxt(os.path.join(base_path, centers_file))
+            centers = centers.reshape([-1, 2]).astype(np.int32)
+
+        # maps are made from the memory-mapped (or rendered) social maps
+        # when they are used
         batch_size = len(social_map)
-        traj_map = np.repeat(traj_map[np.newaxis, :, :], batch_size, axis=0)
-        traj_map_cut = MapManager.cut_map(traj_map,
-                                          centers,
-                                          self.args.map_half_size)
+        maps = MapStore([traj_map], [social_map], [centers],
+                        self.args.map_half_size)
 
-        for agent, t_map, s_map in zip(agents, traj_map_cut, social_map):
-            PredictionAgent.set_map(agent, 0.5*t_map + 0.5*s_map, para)
+        if self.args.render_maps:
+            self.log('Social maps in `{}` are rendered on the fly.'.format(
+                base_path))
+        else:
+            self.log('Social maps in `{}` cost {:.2f} MB ({}).'.format(
+                base_path, maps.nbytes / 1024 ** 2, social_map.dtype))
 
+        agents.set_maps(maps, np.broadcast_to(para, (batch_size,) + para.shape))
         return agents
+
+
+def _build_caches(task: tuple) -> tuple[str, float, int]:
+    """
+    Build caches of one dataset in a worker process.
+
+    :param task: a tuple of (`DatasetsManager` type, args, dataset name,
+        the cache folder)
+    :return name: name of the dataset
+    :return cost: time cost (in seconds)
+    :return pid: id of the worker process
+    """
+    dms_type, args, name, cache_root = task
+    start = time.time()
+
+    # class attributes are not sent to spawned processes
+    dms_type.datasetManager_type.cache_root = cache_root
+
+    dms = dms_type(args)
+    dms.load_fromManager(dms.datasetManager_type(args, name))
+    return name, time.time() - start, os.getpid()
+
+
+def get_social_inputs(agents: AgentBatch,
+                      centers: np.ndarray) -> dict[str, np.ndarray]:
+    """
+    Get inputs to render social maps of a batch of agents.
+
+    :param agents: agents (with linear predictions of their neighbors)
+    :param centers: map centers (in grids), shape = `(n, 2)`
+    :return inputs: a dict of `pred_linear`, `neighbor_linear_pred`,
+        `neighbor_offsets`, `future_length`, and `centers`
+    """
+    offsets = agents.neighbor_offsets
+    return {'pred_linear': agents.pred_linear,
+            'neighbor_linear_pred': agents._get_ragged('all_neighbor_linear_pred'),
+            'neighbor_offsets': offsets - offsets[0],
+            'future_length': agents.get_future_length(),
+            'centers': centers}
+
+
+def _make_social_maps(args: PredictionArgs,
+                      map_manager: MapManager,
+                      inputs: dict[str, np.ndarray],
+                      cuts: np.ndarray,
+                      indexes):
+    """
+    Render social maps of agents into their local windows, and save
+    them (quantized into `args.map_dtype`) in `cuts`.
+
+    :param map_manager: the map manager of the dataset
+    :param inputs: a dict (or `SharedArrays`) of `pred_linear`,
+        `neighbor_linear_pred`, `neighbor_offsets`, `future_length`,
+        and `centers`
+    :param cuts: the array to save social maps
+    :param indexes: indexes of agents to render
+    """
+    renderer = SocialMapRenderer(map_manager,
+                                 inputs['pred_linear'],
+                                 inputs['neighbor_linear_pred'],
+                                 inputs['neighbor_offsets'],
+                                 inputs['centers'],
+                                 args.map_half_size,
+                                 inputs['future_length'])
+
+    cut = np.zeros(cuts.shape[1:], dtype=map_manager.void_map.dtype)
+    for index in indexes:
+        renderer.render(index, out=cut)
+        cuts[index] = MapStore.quantize(cut, args.map_dtype)
+
+
+def _build_social_maps(task: tuple) -> int:
+    """
+    Build social maps of a range of agents in a worker process.
+
+    :param task: a tuple of (args, specs of `SharedArrays`, start, end)
+    :return count: number of agents
+    """
+    args, specs, start, end = task
+
+    with SharedArrays.attach(specs) as shared:
+        paras = shared['paras']
+        map_manager = MapManager(args, init_manager=SimpleNamespace(
+            void_map=np.broadcast_to(np.float32(0), shared['map_shape']),
+            W=paras[0], b=paras[1]))
+
+        _make_social_maps(args, map_manager, shared, shared['maps'],
+                          range(start, end))
+
+        # release views of shared blocks before closing them
+        del map_manager, paras
+
+    return end - start
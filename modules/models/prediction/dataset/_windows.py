@@ -0,0 +1,246 @@
+"""
+@Author: Conghao Wong
+@Date: 2026-10-18 13:02:16
+@LastEditors: Conghao Wong
+@LastEditTime: 2026-10-18 13:02:16
+@Description: file content
+@Github: https://github.com/conghaowoooong
+@Copyright 2022 Conghao Wong, All Rights Reserved.
+"""
+
+from typing import Callable
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from ._sceneStore import SceneStore
+
+
+class TrajectoryWindows():
+    """
+    TrajectoryWindows
+    -----------------
+    All sliding windows (train samples) in one scene.
+    Windows are computed with array operations, and their trajectories
+    are given as strided views over positions in the `SceneStore`,
+    so that nothing is copied until they are gathered.
+    Agent objects are only made when indexing or iterating.
+
+    Properties
+    ----------
+    ```python
+    >>> self.agent_index    # agent index of each window, shape = (n)
+    >>> self.start_frame    # start frame index of each window, shape = (n)
+    >>> self.obs_frame      # observation frame index, shape = (n)
+    >>> self.end_frame      # end frame index of each window, shape = (n)
+    >>> self.view           # strided view of all windows' trajectories
+    ```
+
+    Public Methods
+    --------------
+    ```python
+    # observed trajectories of windows, shape = (batch, obs, 2)
+    (method) get_obs: (self: TrajectoryWindows, index: ndarray = None) -> ndarray
+
+    # future trajectories of windows, shape = (batch, pred, 2)
+    (method) get_groundtruth: (self: TrajectoryWindows, index: ndarray = None) -> ndarray
+
+    # number of future steps of windows, shape = (batch)
+    (method) get_future_length: (self: TrajectoryWindows, index: ndarray = None) -> ndarray
+
+    # frame indexes of all steps of windows, shape = (batch, obs + pred)
+    (method) get_frames: (self: TrajectoryWindows, index: ndarray = None) -> ndarray
+
+    # make agent object of the i-th window
+    (method) __getitem__: (self: TrajectoryWindows, index: int) -> PredictionAgent
+    (method) make_agent: (self: TrajectoryWindows, index: int, **kwargs) -> PredictionAgent
+    ```
+    """
+
+    def __init__(self, scene: SceneStore,
+                 agent_index: np.ndarray,
+                 start_frame: np.ndarray,
+                 obs_frame: np.ndarray,
+                 end_frame: np.ndarray,
+                 obs_length: int,
+                 pred_length: int,
+                 frame_step: int,
+                 agent_factory: Callable = None):
+        """
+        :param pred_length: number of future steps, `-1` for windows
+            that end at the end of each agent's trajectory
+        :param agent_factory: a function to make agent objects, whose
+            args are `(agent_index, start_frame, obs_frame, end_frame, frame_step)`
+        """
+
+        self.scene = scene
+        self.agent_index = agent_index
+        self.start_frame = start_frame
+        self.obs_frame = obs_frame
+        self.end_frame = end_frame
+        self.obs_length = obs_length
+        self.pred_length = pred_length
+        self.frame_step = frame_step
+        self.agent_factory = agent_factory
+
+        # row index (in `scene.positions`) of the first step of each window
+        self.rows = (scene.person_offsets[agent_index] +
+                     start_frame - scene.first_frame[agent_index])
+
+        self._view = None
+
+    @property
+    def view(self) -> np.ndarray:
+        """
+        A strided view (no copy) of trajectories of all possible
+        windows in `scene.positions`, shape = `(rows, steps, 2)`.
+        Trajectory of the i-th window is `view[rows[i]]`.
+        """
+        if self._view is None:
+            steps = (self.obs_length + self.pred_length
+                     if self.pred_length > 0 else self.obs_length)
+            length = (steps - 1) * self.frame_step + 1
+            positions = self.scene.positions
+
+            if len(positions) < length:
+                positions = np.zeros([length, 2], dtype=positions.dtype)
+
+            view = sliding_window_view(positions, length, axis=0)
+            self._view = np.swapaxes(view[:, :, ::self.frame_step], 1, 2)
+
+        return self._view
+
+    def __len__(self) -> int:
+        return len(self.agent_index)
+
+    def __getitem__(self, index: int):
+        return self.make_agent(index)
+
+    def make_agent(self, index: int, **kwargs):
+        """
+        Make the agent object of the i-th window.
+
+        :param kwargs: other args passed to `agent_factory`
+        """
+        return self.agent_factory(int(self.agent_index[index]),
+                                  int(self.start_frame[index]),
+                                  int(self.obs_frame[index]),
+                                  int(self.end_frame[index]),
+                                  self.frame_step,
+                                  **kwargs)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def get_obs(self, index: np.ndarray = None) -> np.ndarray:
+        """
+        Gather observed trajectories of windows.
+
+        :param index: indexes of windows, default are all windows
+        :return obs: observed trajectories, shape = `(batch, obs, 2)`
+        """
+        rows = self.rows if index is None else self.rows[index]
+        return self.view[rows, :self.obs_length]
+
+    def get_groundtruth(self, index: np.ndarray = None) -> np.ndarray:
+        """
+        Gather future trajectories of windows.
+        When `pred_length == -1`, futures of windows have different
+        lengths (see `get_future_length`), and they are padded with
+        their last positions (destinations) to the longest one.
+
+        :param index: indexes of windows, default are all windows
+        :return gt: future trajectories, shape = `(batch, pred, 2)`
+        """
+        if self.pred_length <= 0:
+            frames = self.get_frames(index)[:, self.obs_length:]
+            agents = self.agent_index if index is None else self.agent_index[index]
+            return self.scene.gather_traj(agents, frames)
+
+        rows = self.rows if index is None else self.rows[index]
+        return self.view[rows, self.obs_length:]
+
+    def get_future_length(self, index: np.ndarray = None) -> np.ndarray:
+        """
+        Get the number of future steps of each window.
+        They are all `pred_length` unless `pred_length == -1`.
+
+        :param index: indexes of windows, default are all windows
+        :return length: number of future steps, shape = `(batch)`
+        """
+        start = self.start_frame if index is None else self.start_frame[index]
+        if self.pred_length > 0:
+            return np.full(len(start), self.pred_length, dtype=np.int64)
+
+        end = self.end_frame if index is None else self.end_frame[index]
+        steps = (end - start + self.frame_step - 1) // self.frame_step
+        return steps - self.obs_length
+
+    def get_frames(self, index: np.ndarray = None) -> np.ndarray:
+        """
+        Get frame indexes of all (observed and future) steps of windows.
+        Steps after the end of shorter windows repeat their last frames
+        when `pred_length == -1`.
+
+        :param index: indexes of windows, default are all windows
+        :return frames: frame indexes, shape = `(batch, obs + pred)`
+        """
+        start = self.start_frame if index is None else self.start_frame[index]
+        total = self.obs_length + self.get_future_length(index)
+
+        longest = self.obs_length + max(self.pred_length, 1)
+        steps = np.arange(np.max(total, initial=longest))
+        steps = np.minimum(steps[np.newaxis, :], total[:, np.newaxis] - 1)
+        return start[:, np.newaxis] + self.frame_step * steps
+
+    @classmethod
+    def sample(cls, scene: SceneStore,
+               start_frame: np.ndarray,
+               end_frame: np.ndarray,
+               obs_frames: int,
+               pred_frames: int,
+               step: int,
+               frame_step: int,
+               agent_factory: Callable = None):
+        """
+        Compute all windows in one scene.
+        For each agent, windows start from `start_frame` every
+        `step * frame_step` frames, and all windows should end
+        before `end_frame`.
+
+        :param start_frame: start frame index of each agent, shape = `(agents)`
+        :param end_frame: end frame index of each agent, shape = `(agents)`
+        :param pred_frames: number of future frames, or `-1` to predict
+            until the end of each agent's trajectory
+        """
+        start_frame = np.array(start_frame, dtype=np.int64)
+        end_frame = np.array(end_frame, dtype=np.int64)
+
+        if pred_frames > 0:
+            length = (obs_frames + pred_frames) * frame_step
+        elif pred_frames == -1:
+            length = (obs_frames + 1) * frame_step
+        else:
+            raise ValueError(
+                '`pred_frames` should be a positive integer or -1.')
+
+        # number of windows of each agent
+        stride = step * frame_step
+        space = end_frame - start_frame - length
+        counts = np.where(space >= 0, space // stride + 1, 0)
+
+        agent_index = np.repeat(np.arange(len(counts)), counts)
+        order = (np.arange(len(agent_index)) -
+                 np.repeat(np.cumsum(counts) - counts, counts))
+
+        starts = start_frame[agent_index] + stride * order
+        obs = starts + obs_frames * frame_step
+        ends = (starts + length if pred_frames > 0
+                else end_frame[agent_index])
+
+        return cls(scene, agent_index, starts, obs, ends,
+                   obs_length=obs_frames,
+                   pred_length=pred_frames,
+                   frame_step=frame_step,
+                   agent_factory=agent_factory)
@@ -8,4 +8,4 @@
 @Copyright 2021 Conghao Wong, All Rights Reserved.
 """
 
-from .__io import get_inputs_by_type
+from .__io import get_dataset, get_inputs_by_type
@@ -8,25 +8,31 @@
 @Copyright 2021 Conghao Wong, All Rights Reserved.
 """
 
-from typing import List
+from typing import Union
 
 import numpy as np
 import tensorflow as tf
 from tqdm import tqdm
 
 from ..__agent import PredictionAgent as Agent
+from ..__agentBatch import AgentBatch
 
 
-def get_inputs_by_type(input_agents: list[Agent],
+def get_inputs_by_type(input_agents: Union[AgentBatch, list[Agent]],
                        type_name: str) -> tf.Tensor:
     """
-    Get model inputs from a list of `Agent`-like objects.
+    Get model inputs from an `AgentBatch` or a list of `Agent`-like objects.
 
-    :param input_agents: a list of `Agent` objects or their subclass-objects
+    :param input_agents: an `AgentBatch`, or a list of `Agent` objects
+        or their subclass-objects
     :param type_name: inputs names, accept `'TRAJ'`, `'MAP'`, `'MAPPARA'`,
         `'DEST'`, and `'GT'`
     :return inputs: a tensor of stacked inputs
     """
+    if isinstance(input_agents, AgentBatch):
+        return tf.cast(np.asarray(_get_batch_source(input_agents, type_name)),
+                       tf.float32)
+
     if type_name == 'TRAJ':
         call = _get_obs_traj
     elif type_name == 'MAP':
@@ -40,6 +46,83 @@ def get_inputs_by_type(input_agents: list[Agent],
     return call(input_agents)
 
 
+def get_dataset(input_agents: Union[AgentBatch, list[Agent]],
+                type_names: list[str],
+                shuffle=False,
+                chunk_size=256) -> tf.data.Dataset:
+    """
+    Make a streaming dataset of model inputs from agents.
+    Unlike `tf.data.Dataset.from_tensor_slices`, inputs are not copied
+    into tensors at once. Instead, the dataset runs on the indexes of
+    agents, and gathers inputs of each agent from arrays in the
+    `AgentBatch` (which can be memory-mapped from the on-disk caches)
+    when it is iterated. Only indexes are kept in the shuffle buffer,
+    so that the memory cost of shuffling does not grow with the size
+    of inputs.
+
+    :param input_agents: an `AgentBatch`, or a list of `Agent` objects
+    :param type_names: a list of inputs names, see `get_inputs_by_type`
+    :param shuffle: controls if shuffle agents in each iteration
+    :param chunk_size: number of agents to gather inputs at once
+    :return dataset: a dataset whose elements are tuples of inputs
+    """
+    if not isinstance(input_agents, AgentBatch):
+        input_agents = AgentBatch.from_agents(input_agents)
+
+    sources = [_get_batch_source(input_agents, name) for name in type_names]
+    count = len(input_agents)
+
+    def gather(index):
+        return tuple([np.asarray(s[index], dtype=np.float32)
+                      for s in sources])
+
+    def load(index):
+        inputs = tf.numpy_function(gather, [index],
+                                   [tf.float32 for _ in sources])
+        return tuple([tf.ensure_shape(i, (None,) + s.shape[1:])
+                      for i, s in zip(inputs, sources)])
+
+    dataset = tf.data.Dataset.range(count)
+    if shuffle:
+        dataset = dataset.shuffle(count, reshuffle_each_iteration=True)
+
+    # gather inputs in chunks to reduce python calls
+    dataset = dataset.batch(chunk_size)
+    dataset = dataset.map(load, num_parallel_calls=tf.data.AUTOTUNE)
+    dataset = dataset.unbatch()
+    dataset = dataset.apply(tf.data.experimental.assert_cardinality(count))
+    return dataset.prefetch(tf.data.AUTOTUNE)
+
+
+def _get_batch_source(batch: AgentBatch, type_name: str) -> np.ndarray:
+    """
+    Get the array of one type of model inputs in an `AgentBatch`.
+    The array is a view of the batch whenever possible.
+    Maps are given as a `MapStore` when they are stored quantized,
+    and they are only made for agents gathered from it.
+
+    :param batch: input agents, type = `AgentBatch`
+    :param type_name: inputs names, see `get_inputs_by_type`
+    :return inputs: an array of inputs, shape = `(n, ...)`
+    """
+    if type_name == 'TRAJ':
+        return batch.traj
+    elif type_name == 'MAP':
+        return batch.maps
+    elif type_name == 'MAPPARA':
+        return batch.map_paras
+    elif type_name == 'DEST':
+        # futures are padded with destinations when they have different lengths
+        return batch.groundtruth[:, -1:]
+    elif type_name == 'GT':
+        if batch.future_length is not None:
+            raise ValueError('Future trajectories of agents have ' +
+                             'different lengths, and they can only be ' +
+                             'used as destinations (`DEST`).')
+        return batch.groundtruth
+    raise ValueError(type_name)
+
+
 def _get_obs_traj(input_agents: list[Agent]) -> tf.Tensor:
     """
     Get observed trajectories from agents.
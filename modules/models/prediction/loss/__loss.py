@@ -114,7 +114,7 @@ def context(pred, maps, paras, pred_bias=None) -> tf.Tensor:
     """
 
     if type(pred_bias) == type(None):
-        pred_bias = tf.zeros([pred.shape[0], 2], dtype=tf.float32)
+        pred_bias = tf.zeros([tf.shape(pred)[0], 2], dtype=tf.float32)
     if len(pred_bias.shape) == 2:
         pred_bias = tf.expand_dims(pred_bias, axis=1)
 
@@ -125,20 +125,21 @@ def rotate_back(trajs: tf.Tensor,
     rotate_matrix = tf.stack([[tf.cos(angle), tf.sin(angle)],
                               [-tf.sin(angle), tf.cos(angle)]])
 
-    S = tf.cast(trajs.shape, tf.int32)
+    S = tf.shape(trajs)
+    ndim = len(trajs.shape)
 
-    if len(S) >= 3:
+    if ndim >= 3:
         # traj shape = (batch, pred, 2)
         rotate_matrix = tf.transpose(rotate_matrix, [2, 0, 1])
 
-    if len(S) == 4:
+    if ndim == 4:
         # traj shape = (batch, K, pred, 2)
         trajs = tf.reshape(trajs, (S[0]*S[1], S[2], S[3]))
         rotate_matrix = tf.repeat(rotate_matrix, S[1], axis=0)
 
     traj_rotated = trajs @ rotate_matrix
 
-    if len(S) == 4:
+    if ndim == 4:
         traj_rotated = tf.reshape(traj_rotated, S)
 
     return traj_rotated
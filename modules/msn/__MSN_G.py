@@ -213,7 +213,7 @@ def angle_check(pred: tf.Tensor, obs: tf.Tensor, max_angle=135):
                    tf.float32)   # (batch, K)
     true_item = tf.gather_nd(
         pred,
-        tf.transpose([tf.range(0, obs.shape[0]),
+        tf.transpose([tf.range(0, tf.shape(obs)[0]),
                       tf.argsort(mask, axis=-1)[:, -1]])
     )[:, tf.newaxis, :, :]
 
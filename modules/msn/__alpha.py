@@ -123,7 +123,7 @@ class MSNAlpha(M.prediction.Structure):
         opt = tf.keras.optimizers.Adam(self.args.lr)
         return model, opt
 
-    def min_FDE(self, outputs, labels) -> tf.Tensor:
+    def min_FDE(self, outputs, labels, *args, **kwargs) -> tf.Tensor:
         distance = tf.linalg.norm(
             outputs[0] - tf.expand_dims(labels[:, -1, :], 1), axis=-1)   # shape = [batch, K]
         return tf.reduce_mean(tf.reduce_min(distance, axis=-1))
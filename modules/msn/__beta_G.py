@@ -142,7 +142,7 @@ class MSNBeta_GModel(M.prediction.Model):
 
         all_outputs = []
         for repeat in range(K):
-            z = tf.random.normal(features.shape, 0.0, sigma)
+            z = tf.random.normal(tf.shape(features), 0.0, sigma)
             all_outputs.append(self.G([features, z]))
 
         # shape = (batch, K, pred, 2)
@@ -23,10 +23,15 @@ class OuterLayer(tf.keras.layers.Layer):
     :param b_dim: the last dimension of the second input feature
     :param reshape: if `reshape == True`, output shape = `(..., a_dim * b_dim)`
         else output shape = `(..., a_dim, b_dim)`
+    :param max_pooling: if `max_pooling == True`, it also applies a
+        `(2, 2)` max pooling on the last two dimensions of the outer
+        product (the same as `MaxPooling2D` with `channels_first`),
+        and output shape = `(..., a_dim // 2, b_dim // 2)`
     """
 
     def __init__(self, a_dim: int, b_dim: int,
                  reshape=False,
+                 max_pooling=False,
                  *args, **kwargs):
 
         super().__init__(*args, **kwargs)
@@ -34,6 +39,7 @@ class OuterLayer(tf.keras.layers.Layer):
         self.M = a_dim
         self.N = b_dim
         self.reshape = reshape
+        self.max_pooling = max_pooling
 
     def call(self, tensorA: tf.Tensor, tensorB: tf.Tensor):
         """
@@ -45,18 +51,46 @@ class OuterLayer(tf.keras.layers.Layer):
             else its output shape = (..., M*N)
         """
 
-        _a = tf.expand_dims(tensorA, axis=-1)
-        _b = tf.expand_dims(tensorB, axis=-2)
+        if not self.max_pooling:
+            outer = self.outer(tensorA, tensorB)
+            M, N = self.M, self.N
 
-        _a = tf.repeat(_a, self.N, axis=-1)
-        _b = tf.repeat(_b, self.M, axis=-2)
-
-        outer = _a * _b
+        else:
+            # The max of `a_i * b_j` in each 2x2 window is the product
+            # of the max or min of `a` (and `b`) in that window, so
+            # only outer products of these `M/2` and `N/2` values are
+            # computed, and the full outer product is never made.
+            M, N = self.M // 2, self.N // 2
+            a_max, a_min = _pair_max_min(tensorA, M)
+            b_max, b_min = _pair_max_min(tensorB, N)
+
+            outer = tf.maximum(self.outer(a_max, b_max),
+                               self.outer(a_min, b_min))
+            outer = tf.maximum(outer, self.outer(a_max, b_min))
+            outer = tf.maximum(outer, self.outer(a_min, b_max))
 
         if not self.reshape:
             return outer
         else:
-            return tf.reshape(outer, list(outer.shape[:-2]) + [self.M*self.N])
+            return tf.reshape(outer, tf.concat([tf.shape(outer)[:-2],
+                                                [M*N]], axis=0))
+
+    @staticmethod
+    def outer(tensorA: tf.Tensor, tensorB: tf.Tensor) -> tf.Tensor:
+        """
+        Outer product of the last dimension by broadcasting.
+        """
+        return tf.expand_dims(tensorA, axis=-1) * tf.expand_dims(tensorB, axis=-2)
+
+
+def _pair_max_min(tensor: tf.Tensor, n: int) -> tuple[tf.Tensor, tf.Tensor]:
+    """
+    Max and min values of each pair on the last dimension
+    (the last one is dropped if it is odd, the same as pooling).
+    """
+    pairs = tf.reshape(tensor[..., :2*n],
+                       tf.concat([tf.shape(tensor)[:-1], [n, 2]], axis=0))
+    return tf.reduce_max(pairs, axis=-1), tf.reduce_min(pairs, axis=-1)
 
 
 class WaveletLayer(tf.keras.layers.Layer):
@@ -80,7 +80,7 @@ class Agent47Model(M.prediction.Model):
 
         # unpack inputs
         trajs = inputs[0]   # (batch, obs, 2)
-        bs = trajs.shape[0]
+        bs = tf.shape(trajs)[0]
 
         # feature embedding and encoding -> (batch, obs, d/2)
         spec_features = self.te.call(trajs)
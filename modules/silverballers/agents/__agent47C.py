@@ -49,10 +49,8 @@ class Agent47CModel(M.prediction.Model):
         self.te = TrajEncoding(self.d//2, tf.nn.relu, useFFT=True)
 
         # Bilinear structure (outer product + pooling + fc)
-        self.outer = OuterLayer(self.d//2, self.d//2, reshape=False)
-        self.pooling = tf.keras.layers.MaxPooling2D(
-            pool_size=(2, 2),
-            data_format='channels_first')
+        self.outer = OuterLayer(self.d//2, self.d//2,
+                                reshape=True, max_pooling=True)
         self.outer_fc = tf.keras.layers.Dense(self.d//2, tf.nn.tanh)
 
         # Random id encoding
@@ -99,14 +97,12 @@ class Agent47CModel(M.prediction.Model):
 
         # unpack inputs
         trajs = inputs[0]   # (batch, obs, 2)
-        bs = trajs.shape[0]
+        bs = tf.shape(trajs)[0]
 
         # feature embedding and encoding -> (batch, obs, d/2)
         # uses bilinear structure to encode features
         f = self.te.call(trajs)             # (batch, obs, d/2)
-        f = self.outer.call(f, f)           # (batch, obs, d/2, d/2)
-        f = self.pooling(f)                 # (batch, obs, d/4, d/4)
-        f = tf.reshape(f, [f.shape[0], f.shape[1], -1])
+        f = self.outer.call(f, f)           # (batch, obs, d/4 * d/4)
         spec_features = self.outer_fc(f)    # (batch, obs, d/2)
 
         # Sample random predictions
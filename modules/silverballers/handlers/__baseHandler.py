@@ -39,6 +39,11 @@ class BaseHandlerModel(M.prediction.Model):
             pi = [int(i) for i in key_points.split('_')]
             self.points_index = tf.cast(pi, tf.float32)
 
+    @property
+    def graph_compatible(self) -> bool:
+        # keypoints are sampled with `numpy` when training the single model
+        return bool(self.asHandler or self.key_points != 'null')
+
     def call_as_handler(self, inputs: list[tf.Tensor],
                         keypoints: tf.Tensor,
                         keypoints_index: tf.Tensor,
@@ -51,10 +51,9 @@ class BurnwoodCModel(BaseHandlerModel):
                                            output_channels=self.steps,
                                            activation=tf.nn.tanh)
 
-        self.outer = OuterLayer(self.d//2, self.d//2, reshape=False)
-        self.pooling = tf.keras.layers.MaxPooling2D(
-            pool_size=(2, 2),
-            data_format='channels_first')
+        # outer product and (2, 2) max pooling
+        self.outer = OuterLayer(self.d//2, self.d//2,
+                                reshape=True, max_pooling=True)
             
         self.outer_fc = tf.keras.layers.Dense(self.d, tf.nn.tanh)
 
@@ -103,9 +102,7 @@ class BurnwoodCModel(BaseHandlerModel):
         f = tf.concat([traj_feature, context_feature], axis=-1)
 
         # Outer product
-        f = self.outer.call(f, f)   # (batch, obs+pred, d/4, d/4)
-        f = self.pooling(f)         # (batch, obs+pred, d/8, d/8)
-        f = tf.reshape(f, [f.shape[0], f.shape[1], -1])
+        f = self.outer.call(f, f)   # (batch, obs+pred, d/8 * d/8)
         f = self.outer_fc(f)        # (batch, obs+pred, d)
 
         # Encode features with Transformer Encoder
@@ -174,7 +174,7 @@ class VIrisAlphaGModel(M.prediction.Model):
         # decode
         predictions = []
         for _ in range(K):
-            z = tf.random.normal(features.shape, 0.0, sigma)
+            z = tf.random.normal(tf.shape(features), 0.0, sigma)
             predictions.append(self.decoder.call(features, z))
 
         # shape = (batch, Kc*K, N, 2)
@@ -153,7 +153,7 @@ class VIrisBetaModel(M.prediction.Model):
 
         # transformer inputs shape = (batch, obs, 128)
         t_inputs = self.concat([traj_feature, context_feature])
-        t_inputs_index = tf.range([t_inputs.shape[0]])
+        t_inputs_index = tf.range(tf.shape(t_inputs)[0])
         t_inputs_index = tf.repeat(t_inputs_index, K, axis=0)
 
         # transformer target shape = (batch, obs+pred, 4)
@@ -189,6 +189,11 @@ class VIrisBetaModel(M.prediction.Model):
         p = tf.reshape(p, [-1, K, self.args.pred_frames, 2])
         return p
 
+    @property
+    def graph_compatible(self) -> bool:
+        # points are sampled with `numpy` when training the single model
+        return bool(self.asSecondStage)
+
     def forward(self, model_inputs: list[tf.Tensor],
                 training=None,
                 *args, **kwargs):
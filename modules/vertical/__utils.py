@@ -10,6 +10,8 @@
 
 import tensorflow as tf
 
+from ..applications.layers import LinearInterpolation
+
 
 class Utils():
 
@@ -23,20 +25,4 @@ class Utils():
         :param y: values, shape = `(..., n, 2)`
         :return yp: linear interpolations, shape = `(..., m, 2)`
         """
-        linear_results = []
-        for output_index in range(x.shape[0] - 1):
-            p_start = x[output_index]
-            p_end = x[output_index+1]
-
-            # shape = (..., 2)
-            start = tf.gather(y, output_index, axis=-2)
-            end = tf.gather(y, output_index+1, axis=-2)
-
-            for p in tf.range(p_start+1, p_end+1):
-                linear_results.append(tf.expand_dims(
-                    (end - start) * (p - p_start) / (p_end - p_start)
-                    + start
-                , axis=-2))   # (..., 1, 2)
-
-        # shape = (..., n, 2)
-        return tf.concat(linear_results, axis=-2)
\ No newline at end of file
+        return LinearInterpolation.interpolate(x, y)
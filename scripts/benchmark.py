@@ -0,0 +1,1127 @@
+"""
+@Author: Conghao Wong
+@Date: 2026-10-18 09:30:12
+@LastEditors: Conghao Wong
+@LastEditTime: 2026-10-18 09:30:12
+@Description: Benchmarks for the data preparation and model implementation.
+@Github: https://github.com/conghaowoooong
+@Copyright 2022 Conghao Wong, All Rights Reserved.
+
+Usage
+-----
+Run benchmarks from the root folder of this project:
+```bash
+python scripts/benchmark.py BENCHMARK_NAME [--KEY VALUE ...]
+```
+Run `python scripts/benchmark.py` to list all available benchmarks.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath('.'))
+
+
+def timeit(func, *args, repeat=1, **kwargs):
+    """
+    Run `func` for `repeat` times and return the best time cost
+    (in seconds) and the last result.
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        cost = time.perf_counter() - start
+        best = cost if best is None else min(best, cost)
+    return best, result
+
+
+def print_table(title: str, rows: list[list]):
+    print('\n>>> ' + title + ':')
+    widths = [max(len(str(row[i])) for row in rows)
+              for i in range(len(rows[0]))]
+    for row in rows:
+        print('    ' + '  '.join(str(item).ljust(w)
+                                  for item, w in zip(row, widths)))
+    print('')
+
+
+def parse_options(argv: list[str], **defaults) -> dict:
+    """
+    Parse `--key value` pairs with the types of their default values.
+    """
+    options = dict(defaults)
+    for key, value in zip(argv[::2], argv[1::2]):
+        key = key.lstrip('-')
+        options[key] = type(defaults.get(key, ''))(value)
+    return options
+
+
+# ----------------------------------------------------------------------------
+# Dataset ingestion
+# ----------------------------------------------------------------------------
+
+def make_synthetic_csv(path: str, rows: int, persons: int, seed=0):
+    """
+    Write a synthetic `true_pos_.csv` file with `rows` records.
+    Each person walks for a random continuous period.
+    """
+    rng = np.random.default_rng(seed)
+    lengths = rng.multinomial(rows - persons, np.ones(persons)/persons) + 1
+    starts = rng.integers(0, max(rows // persons, 1) * 10, size=persons)
+
+    person_ids = np.repeat(np.arange(persons), lengths)
+    steps = np.arange(rows) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    frames = 10 * (np.repeat(starts, lengths) + steps)
+    positions = rng.normal(0, 10, size=[rows, 2])
+
+    index = np.argsort(frames, kind='stable')
+    data = np.stack([frames, person_ids,
+                     positions.T[0], positions.T[1]])[:, index]
+
+    with open(path, 'w') as f:
+        for line, fmt in zip(data, ['%d', '%d', '%.4f', '%.4f']):
+            f.write(','.join(fmt % v for v in line) + '\n')
+
+
+def legacy_load_csv(path: str, order: list[int]):
+    """
+    The original `DatasetManager._load_csv` implementation.
+    """
+    data = np.genfromtxt(path, delimiter=',').T
+
+    person_data = {}
+    person_list = set(data.T[1].astype(np.int32))
+    for person in person_list:
+        index_current = np.where(data.T[1] == person)[0]
+        person_data[person] = np.column_stack([
+            data[index_current, 0],
+            data[index_current, 2 + order[0]],
+            data[index_current, 2 + order[1]]])
+
+    frame_list = list(set(data.T[0].astype(np.int32)))
+    frame_list.sort()
+    return person_data, frame_list
+
+
+def bench_csv(argv: list[str]):
+    """
+    Compare the single-pass csv reader with the original `_load_csv`.
+    Options: `--rows 1000000 --persons 2000 --legacy 1`
+    """
+    from modules.models.prediction.dataset._csvReader import \
+        read_trajectory_csv
+
+    opt = parse_options(argv, rows=1000000, persons=2000, legacy=1)
+    order = [1, 0]
+
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, 'true_pos_.csv')
+        make_synthetic_csv(path, opt['rows'], opt['persons'])
+        size = os.path.getsize(path) / 1024 ** 2
+
+        t_new, table = timeit(read_trajectory_csv, path, order, repeat=3)
+        rows = [['method', 'time (s)', 'speedup'],
+                ['read_trajectory_csv', '{:.3f}'.format(t_new), '1.0x']]
+
+        if opt['legacy']:
+            t_old, (person_data, _) = timeit(legacy_load_csv, path, order)
+            for index, person in enumerate(table.person_ids):
+                assert np.array_equal(person_data[person], table[index])
+            rows.append(['legacy _load_csv', '{:.3f}'.format(t_old),
+                         '{:.1f}x slower'.format(t_old / t_new)])
+
+    print_table('csv ingestion, {} rows, {} persons, {:.1f} MB'.format(
+        opt['rows'], opt['persons'], size), rows)
+
+
+# ----------------------------------------------------------------------------
+# Scene storage
+# ----------------------------------------------------------------------------
+
+def bench_scene(argv: list[str]):
+    """
+    Compare memory of the `SceneStore` with the dense video matrix.
+    Options: `--rows 1000000 --persons 2000`
+    """
+    from modules.models.prediction.dataset._csvReader import \
+        read_trajectory_csv
+    from modules.models.prediction.dataset._sceneStore import SceneStore
+
+    opt = parse_options(argv, rows=1000000, persons=2000)
+    init_position = 10000
+
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, 'true_pos_.csv')
+        make_synthetic_csv(path, opt['rows'], opt['persons'])
+        table = read_trajectory_csv(path, [1, 0])
+
+    t_build, scene = timeit(SceneStore.from_table, table, init_position)
+
+    rows = [['storage', 'memory (MB)', 'build time (s)'],
+            ['dense video_matrix',
+             '{:.2f}'.format(scene.dense_nbytes / 1024 ** 2), '-'],
+            ['SceneStore',
+             '{:.2f}'.format(scene.nbytes / 1024 ** 2),
+             '{:.3f}'.format(t_build)]]
+
+    print_table('scene storage, {} frames, {} persons'.format(
+        scene.frame_number, scene.agent_count), rows)
+
+
+# ----------------------------------------------------------------------------
+# Sliding-window sampling
+# ----------------------------------------------------------------------------
+
+def bench_windows(argv: list[str]):
+    """
+    Compare the vectorized window sampler with the original per-window loop.
+    Options: `--rows 1100000 --persons 1000 --legacy_windows 20000`
+    """
+    from modules.models.prediction.dataset._csvReader import \
+        read_trajectory_csv
+    from modules.models.prediction.dataset._sceneStore import SceneStore
+    from modules.models.prediction.dataset._windows import \
+        TrajectoryWindows
+
+    opt = parse_options(argv, rows=1100000, persons=1000,
+                        legacy_windows=20000)
+    obs_frames, pred_frames, step, frame_step = 8, 12, 1, 1
+
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, 'true_pos_.csv')
+        make_synthetic_csv(path, opt['rows'], opt['persons'])
+        scene = SceneStore.from_table(read_trajectory_csv(path, [1, 0]),
+                                      init_position=10000)
+
+    ranges = np.array([scene.valid_range(p)
+                       for p in range(scene.agent_count)])
+
+    def vectorized():
+        windows = TrajectoryWindows.sample(scene, ranges[:, 0], ranges[:, 1],
+                                           obs_frames, pred_frames,
+                                           step, frame_step)
+        return windows, windows.get_obs(), windows.get_groundtruth()
+
+    def legacy(max_windows: int):
+        obs, gt = [], []
+        for agent_id, (start_frame, end_frame) in enumerate(ranges):
+            traj = scene.traj(agent_id)
+            for p in range(start_frame, end_frame, step * frame_step):
+                if p + (obs_frames + pred_frames) * frame_step > end_frame:
+                    break
+                obs_frame = p + obs_frames * frame_step
+                end = p + (obs_frames + pred_frames) * frame_step
+                obs.append(traj[p:obs_frame:frame_step].copy())
+                gt.append(traj[obs_frame:end:frame_step].copy())
+                if len(obs) >= max_windows:
+                    return obs, gt
+        return obs, gt
+
+    t_new, (windows, obs, gt) = timeit(vectorized, repeat=3)
+    n = len(windows)
+    m = min(opt['legacy_windows'], n)
+    t_old, (obs_old, gt_old) = timeit(legacy, m)
+    assert np.array_equal(np.array(obs_old), obs[:m])
+    assert np.array_equal(np.array(gt_old), gt[:m])
+
+    t_old = t_old * n / m
+    rows = [['method', 'time (s)', 'windows/s'],
+            ['TrajectoryWindows', '{:.3f}'.format(t_new),
+             '{:.3g}'.format(n / t_new)],
+            ['legacy loop (estimated)', '{:.3f}'.format(t_old),
+             '{:.3g}'.format(n / t_old)]]
+
+    print_table('window sampling, {} windows'.format(n), rows)
+
+
+# ----------------------------------------------------------------------------
+# Linear prediction
+# ----------------------------------------------------------------------------
+
+def legacy_predict_linear_for_person(position, time_pred,
+                                     different_weights=0.95):
+    """
+    The original `predict_linear_for_person` implementation.
+    """
+    from modules.models.helpmethods import softmax
+
+    def _predict(x, y, x_p, diff_weights=0):
+        if diff_weights == 0:
+            P = np.diag(np.ones(shape=[x.shape[0]]))
+        else:
+            P = np.diag(softmax([(i+1)**diff_weights
+                                 for i in range(x.shape[0])]))
+
+        A = np.stack([np.ones_like(x), x]).T
+        A_p = np.stack([np.ones_like(x_p), x_p]).T
+        B = np.matmul(np.matmul(np.matmul(np.linalg.inv(
+            np.matmul(np.matmul(A.T, P), A)), A.T), P), y.T)
+        return np.matmul(A_p, B)
+
+    t = np.arange(position.shape[0])
+    t_p = np.arange(time_pred)
+    x_p = _predict(t, position.T[0], t_p, different_weights)
+    y_p = _predict(t, position.T[1], t_p, different_weights)
+    return np.stack([x_p, y_p]).T
+
+
+def bench_linear(argv: list[str]):
+    """
+    Compare the batched linear predictor with the original per-trajectory one.
+    Options: `--batch 100000 --obs 8 --total 20`
+    """
+    from modules.models.helpmethods import predict_linear
+
+    opt = parse_options(argv, batch=100000, obs=8, total=20)
+    trajs = np.random.default_rng(0).normal(size=[opt['batch'], opt['obs'], 2])
+
+    t_new, pred = timeit(predict_linear, trajs, opt['total'], repeat=3)
+    t_old, pred_old = timeit(lambda: np.array(
+        [legacy_predict_linear_for_person(t, opt['total']) for t in trajs]))
+    assert np.allclose(pred, pred_old)
+
+    rows = [['method', 'time (s)', 'speedup'],
+            ['predict_linear', '{:.4f}'.format(t_new), '1.0x'],
+            ['legacy predict_linear_for_person', '{:.3f}'.format(t_old),
+             '{:.1f}x slower'.format(t_old / t_new)]]
+
+    print_table('linear prediction, batch = {}'.format(opt['batch']), rows)
+
+
+# ----------------------------------------------------------------------------
+# Neighbor selection
+# ----------------------------------------------------------------------------
+
+def bench_neighbors(argv: list[str]):
+    """
+    Compare the grid spatial index with the original per-sample argsort.
+    Options: `--agents 1000 --frames 20 --max_neighbor 15 --size 50.0`
+    """
+    from modules.models.prediction.__spatialIndex import SpatialIndex
+    from modules.models.prediction.__utils import calculate_length
+
+    opt = parse_options(argv, agents=1000, frames=20,
+                        max_neighbor=15, size=50.0)
+    k = opt['max_neighbor'] + 1
+    rng = np.random.default_rng(0)
+    scenes = rng.uniform(0, opt['size'], size=[opt['frames'],
+                                               opt['agents'], 2])
+
+    def legacy():
+        results = []
+        for positions in scenes:
+            for target in range(len(positions)):
+                dis = calculate_length(positions - positions[target:target+1])
+                results.append(np.argsort(dis, kind='stable')[1:k])
+        return np.array(results)
+
+    def indexed():
+        results = []
+        for positions in scenes:
+            index, _ = SpatialIndex(positions).query(positions, k)
+            results.append(index[:, 1:])
+        return np.concatenate(results)
+
+    t_new, new = timeit(indexed, repeat=3)
+    t_old, old = timeit(legacy)
+    assert np.array_equal(new, old)
+
+    rows = [['method', 'time (s)', 'speedup'],
+            ['SpatialIndex', '{:.3f}'.format(t_new), '1.0x'],
+            ['legacy argsort', '{:.3f}'.format(t_old),
+             '{:.1f}x slower'.format(t_old / t_new)]]
+
+    print_table('neighbor selection, {} frames x {} agents, k = {}'.format(
+        opt['frames'], opt['agents'], k), rows)
+
+
+# ----------------------------------------------------------------------------
+# Train agents preparation
+# ----------------------------------------------------------------------------
+
+def bench_agents(argv: list[str]):
+    """
+    Compare preparing train agents with the shared neighbor cache and
+    preparing them one by one (`PredictionAgent.init_data`).
+    Options: `--dataset univ3 --step 1`
+    """
+    from modules.models.prediction import (AgentBatch, DatasetManager,
+                                           PredictionArgs)
+
+    opt = parse_options(argv, dataset='univ3', step=1)
+    args = PredictionArgs(['null.py',
+                           '--step', str(opt['step']),
+                           '--save_base_dir', tempfile.gettempdir()])
+    dm = DatasetManager(args, opt['dataset']).load_data()
+
+    def legacy():
+        windows = dm.sample_windows()
+        neighbors = dm.get_neighbors(windows.agent_index,
+                                     windows.obs_frame - windows.frame_step)
+        return AgentBatch.from_agents(
+            [windows.make_agent(i, neighbor_list=neighbors[i])
+             for i in range(len(windows))])
+
+    t_new, new = timeit(dm._sample_train_batch, repeat=3)
+    t_old, old = timeit(legacy)
+    assert np.allclose(new.neighbor_traj_linear_pred,
+                       old.neighbor_traj_linear_pred)
+
+    def neighbor_mb(batch: AgentBatch):
+        items = [batch.all_neighbor_traj, batch.all_neighbor_linear_pred,
+                 batch.neighbor_index]
+        return sum([i.nbytes for i in items if i is not None]) / 1024 ** 2
+
+    rows = [['method', 'time (s)', 'neighbor arrays (MB)'],
+            ['NeighborCache', '{:.3f}'.format(t_new),
+             '{:.2f}'.format(neighbor_mb(new))],
+            ['per-agent init_data', '{:.3f}'.format(t_old),
+             '{:.2f}'.format(neighbor_mb(old))]]
+
+    print_table('train agents of `{}`, {} agents, {} neighbors'.format(
+        opt['dataset'], len(new), new.neighbor_offsets[-1]), rows)
+
+
+# ----------------------------------------------------------------------------
+# Context maps
+# ----------------------------------------------------------------------------
+
+def legacy_add_to_map(manager, target_map: np.ndarray,
+                      grid_trajs: np.ndarray,
+                      amplitude: np.ndarray = 1,
+                      radius: np.ndarray = 0,
+                      add_mask=None,
+                      max_limit=False,
+                      decay=True):
+    """
+    The original `MapManager._add_to_map` implementation,
+    which adds masks point by point.
+    """
+    from modules.models.prediction.__maps import get_mask
+
+    if len(grid_trajs.shape) == 2:
+        grid_trajs = grid_trajs[np.newaxis, :, :]
+
+    n_traj = grid_trajs.shape[0]
+    amplitude = np.array(amplitude)
+    if not len(amplitude.shape):
+        amplitude = amplitude * \
+            np.ones([n_traj, grid_trajs.shape[-2]], dtype=np.int32)
+        radius = radius * np.ones(n_traj, dtype=np.int32)
+
+    target_map = target_map.copy()
+    for traj, a, r in zip(grid_trajs, amplitude, radius):
+        add_mask = get_mask(add_mask, int(r))
+        target_map = manager._add_one_traj(target_map, traj, a, int(r),
+                                           add_mask,
+                                           max_limit=max_limit,
+                                           amplitude_decay=decay)
+    return target_map
+
+
+def bench_maps(argv: list[str]):
+    """
+    Compare the impulse-and-convolution map renderer with the original
+    point-by-point renderer on social maps and the guidance map.
+    Options: `--dataset univ3 --agents 2000`
+    """
+    from modules.models.prediction import (DatasetManager, MapManager,
+                                           PredictionArgs)
+
+    class LegacyMapManager(MapManager):
+        _add_to_map = legacy_add_to_map
+
+    opt = parse_options(argv, dataset='univ3', agents=2000)
+    args = PredictionArgs(['null.py',
+                           '--step', '1',
+                           '--save_base_dir', tempfile.gettempdir()])
+    agents = DatasetManager(args, opt['dataset']).sample_train_batch()
+    agents = agents[:opt['agents']]
+
+    managers = {'impulses + filter2D': MapManager(args, agents),
+                'legacy loop': LegacyMapManager(args, agents)}
+
+    rows = [['method', 'social maps (s)', 'guidance map (s)']]
+    results = []
+    for name, manager in managers.items():
+        t_social, social = timeit(lambda: np.array(
+            [manager.build_social_map(a, a.get_pred_traj_neighbor_linear())
+             for a in agents]))
+        t_guidance, guidance = timeit(manager.build_guidance_map, agents)
+        results.append((social, guidance))
+        rows.append([name, '{:.3f}'.format(t_social),
+                     '{:.4f}'.format(t_guidance)])
+
+    (social, guidance), (social_old, guidance_old) = results
+    rows.append(['max difference', '{:.2e}'.format(np.abs(social - social_old).max()),
+                 '{:.2e}'.format(np.abs(guidance - guidance_old).max())])
+
+    print_table('maps of `{}`, {} agents, map size = {}'.format(
+        opt['dataset'], len(agents), guidance.shape), rows)
+
+
+def bench_local_maps(argv: list[str]):
+    """
+    Compare building local social maps directly with building full-scene
+    social maps and then cutting them (time and peak memory).
+    Options: `--dataset univ3 --agents 2000`
+    """
+    import tracemalloc
+
+    from modules.models.prediction import (DatasetManager, MapManager,
+                                           PredictionArgs)
+
+    opt = parse_options(argv, dataset='univ3', agents=2000)
+    args = PredictionArgs(['null.py',
+                           '--step', '1',
+                           '--save_base_dir', tempfile.gettempdir()])
+    agents = DatasetManager(args, opt['dataset']).sample_train_batch()
+    agents = agents[:opt['agents']]
+
+    manager = MapManager(args, agents)
+    half_size = args.map_half_size
+    centers = manager.real2grid(agents.traj[:, -1, :])
+
+    def full():
+        maps = np.array([manager.build_social_map(
+            a, a.get_pred_traj_neighbor_linear()) for a in agents])
+        return manager.cut_map(maps, centers, half_size)
+
+    def local():
+        cuts = np.zeros([len(agents), 2 * half_size, 2 * half_size],
+                        dtype=np.float32)
+        for index, a in enumerate(agents):
+            manager.build_local_social_map(
+                a, a.get_pred_traj_neighbor_linear(),
+                centers[index], half_size, out=cuts[index])
+        return cuts
+
+    rows = [['method', 'time (s)', 'peak memory (MB)']]
+    results = []
+    for name, func in [('local windows', local), ('full maps + cut', full)]:
+        tracemalloc.start()
+        cost, result = timeit(func)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        results.append(result)
+        rows.append([name, '{:.3f}'.format(cost),
+                     '{:.1f}'.format(peak / 1024 ** 2)])
+
+    assert np.array_equal(*results)
+    print_table('social maps of `{}`, {} agents, map size = {}'.format(
+        opt['dataset'], len(agents), manager.void_map.shape), rows)
+
+
+def bench_blend_maps(argv: list[str]):
+    """
+    Compare cutting and blending windows of one shared trajectory map with
+    the original way that repeats the map for every agent.
+    Options: `--agents 2000 --height 400 --width 350 --half_size 50`
+    """
+    import tracemalloc
+
+    from modules.models.prediction import MapManager
+
+    opt = parse_options(argv, agents=2000, height=400, width=350,
+                        half_size=50)
+    rng = np.random.default_rng(0)
+    h = opt['half_size']
+    traj_map = rng.random([opt['height'], opt['width']]).astype(np.float32)
+    social_maps = rng.random([opt['agents'], 2*h, 2*h]).astype(np.float32)
+    centers = np.stack([rng.integers(0, opt['height'], opt['agents']),
+                        rng.integers(0, opt['width'], opt['agents'])], axis=-1)
+
+    def legacy():
+        maps = np.repeat(traj_map[np.newaxis], len(social_maps), axis=0)
+        c = np.maximum(centers, h)
+        c = np.array([np.minimum(c[:, 0], opt['height'] - h),
+                      np.minimum(c[:, 1], opt['width'] - h)]).T
+        cuts = np.array([m[x-h:x+h, y-h:y+h] for m, (x, y) in zip(maps, c)])
+        return 0.5 * cuts + 0.5 * social_maps
+
+    def shared():
+        return MapManager.blend_maps(traj_map, social_maps.copy(),
+                                     centers, h)
+
+    rows = [['method', 'time (s)', 'peak memory (MB)']]
+    results = []
+    for name, func in [('blend_maps', shared), ('legacy repeat + cut', legacy)]:
+        tracemalloc.start()
+        cost, result = timeit(func)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        results.append(result)
+        rows.append([name, '{:.3f}'.format(cost),
+                     '{:.1f}'.format(peak / 1024 ** 2)])
+
+    assert np.array_equal(*results)
+    print_table('blending maps of {} agents, map size = {}'.format(
+        opt['agents'], traj_map.shape), rows)
+
+
+def bench_map_workers(argv: list[str]):
+    """
+    Time building (and saving) social maps of one dataset with different
+    numbers of map workers, and check that all results are the same.
+    Maps are built without workers when there are less than
+    `--min_agents` agents for each worker.
+    Options: `--dataset univ3 --agents 4000 --workers 1,2,4,8 --min_agents 5000`
+    """
+    from modules.models.prediction import DatasetManager, PredictionArgs
+
+    opt = parse_options(argv, dataset='univ3', agents=4000,
+                        workers='1,2,4,8',
+                        min_agents=DatasetManager.min_agents_per_worker)
+    DatasetManager.min_agents_per_worker = opt['min_agents']
+
+    rows = [['workers', 'time (s)', 'speedup']]
+    agents, results = None, []
+    for workers in [int(w) for w in opt['workers'].split(',')]:
+        args = PredictionArgs(['null.py',
+                               '--step', '1',
+                               '--map_workers', str(workers),
+                               '--save_base_dir', tempfile.gettempdir()])
+        dm = DatasetManager(args, opt['dataset'])
+
+        if agents is None:
+            agents = dm.sample_train_batch()[:opt['agents']]
+
+        with tempfile.TemporaryDirectory() as base_path:
+            cost, _ = timeit(dm.make_maps, agents, base_path)
+            results.append(np.load(os.path.join(base_path, 'socialMap.npy')))
+
+        base = cost if len(rows) == 1 else base
+        rows.append([workers, '{:.2f}'.format(cost),
+                     '{:.2f}x'.format(base / cost)])
+
+    assert all([np.array_equal(results[0], r) for r in results[1:]])
+    print_table('social maps of `{}`, {} agents ({} cores)'.format(
+        opt['dataset'], len(agents), os.cpu_count()), rows)
+
+
+def bench_render_maps(argv: list[str]):
+    """
+    Compare the input pipeline throughput of stored (memory-mapped)
+    context maps and context maps rendered on the fly, and the disk
+    space of their caches.
+    Options: `--dataset zara1 --batch_size 64 --batches 50`
+    """
+    import shutil
+
+    from modules.models.prediction import (DatasetsManager, PredictionArgs,
+                                           io)
+
+    opt = parse_options(argv, dataset='zara1', batch_size=64, batches=50)
+
+    rows = [['maps', 'samples/s', 'cache (MB)']]
+    for render in [0, 1]:
+        if os.path.exists(p := os.path.join('./dataset_npz', opt['dataset'])):
+            shutil.rmtree(p)
+
+        args = PredictionArgs(['null.py',
+                               '--use_maps', '1',
+                               '--render_maps', str(render),
+                               '--save_base_dir', tempfile.gettempdir()])
+        agents = DatasetsManager.load(args, [opt['dataset']], mode='test')
+
+        _, map_path = DatasetsManager(args).get_cache_paths(
+            DatasetsManager.datasetManager_type(args, opt['dataset']))
+        size = sum([os.path.getsize(os.path.join(map_path, f))
+                    for f in os.listdir(map_path)])
+
+        dataset = io.get_dataset(agents, ['TRAJ', 'MAP'], shuffle=True)
+        dataset = dataset.batch(opt['batch_size']).repeat().take(opt['batches'])
+
+        def run():
+            for _ in dataset:
+                pass
+
+        cost, _ = timeit(run)
+        rows.append(['rendered' if render else 'stored',
+                     '{:.0f}'.format(opt['batches'] * opt['batch_size'] / cost),
+                     '{:.2f}'.format(size / 1024 ** 2)])
+
+    print_table('context maps of `{}` ({} cores)'.format(
+        opt['dataset'], os.cpu_count()), rows)
+
+
+def bench_tiled_maps(argv: list[str]):
+    """
+    Compare dense and tiled guidance maps of a large synthetic scene,
+    where trajectories are gathered in several small areas
+    (time and peak memory of building maps, and time of cutting
+    windows for a batch of agents).
+    Options: `--extent 600 --clusters 4 --agents 2000 --tile_size 256 --batch_size 256`
+    """
+    import tracemalloc
+
+    from modules.models.prediction import MapManager, PredictionArgs
+
+    opt = parse_options(argv, extent=600, clusters=4, agents=2000,
+                        tile_size=256, batch_size=256)
+    args = PredictionArgs(['null.py', '--save_base_dir', tempfile.gettempdir()])
+
+    # trajectories walk in 20m * 20m areas around random places
+    rng = np.random.RandomState(0)
+    places = rng.uniform(0, opt['extent'], [opt['clusters'], 2])
+    places[:2] = [[0, 0], [opt['extent'], opt['extent']]]
+    starts = (places[rng.randint(opt['clusters'], size=opt['agents'])] +
+              rng.uniform(-10, 10, [opt['agents'], 2]))
+    trajs = (starts[:, np.newaxis, :] +
+             np.cumsum(rng.normal(0, 0.4, [opt['agents'], 8, 2]), axis=1))
+
+    manager = MapManager(args, trajs)
+    centers = manager.real2grid(trajs[:opt['batch_size'], -1, :])
+
+    rows = [['map', 'build (s)', 'build peak (MB)', 'map (MB)', 'cut (s)']]
+    results = []
+    for name, build in [('tiled', lambda: manager.build_tiled_guidance_map(
+                            trajs, opt['tile_size'])),
+                        ('dense', lambda: manager.build_guidance_map(trajs))]:
+        tracemalloc.start()
+        cost, guidance_map = timeit(build)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        cut_cost, cuts = timeit(manager.cut_map, guidance_map, centers,
+                                args.map_half_size, repeat=5)
+
+        results.append(cuts)
+        rows.append([name, '{:.3f}'.format(cost),
+                     '{:.1f}'.format(peak / 1024 ** 2),
+                     '{:.1f}'.format(guidance_map.nbytes / 1024 ** 2),
+                     '{:.4f}'.format(cut_cost)])
+        del guidance_map
+
+    assert np.allclose(*results, atol=1e-6)
+    print_table('guidance maps of {} agents, map size = {}'.format(
+        opt['agents'], manager.void_map.shape), rows)
+
+
+# ----------------------------------------------------------------------------
+# Model implementation
+# ----------------------------------------------------------------------------
+
+def make_model_inputs(structure, batch_size: int, seed=0) -> tuple[list, object]:
+    """
+    Make random model inputs and labels (with the shapes used in
+    datasets) of a structure.
+    """
+    a = structure.args
+    shapes = {'TRAJ': [a.obs_frames, 2],
+              'MAP': [2 * a.map_half_size, 2 * a.map_half_size],
+              'MAPPARA': [2, 2],
+              'DEST': [1, 2],
+              'GT': [a.pred_frames, 2]}
+
+    rng = np.random.default_rng(seed)
+    inputs = [rng.random([batch_size] + shapes[t], dtype=np.float32)
+              for t in structure.model_inputs]
+    gt = rng.random([batch_size] + shapes[structure.model_groundtruths[0]],
+                    dtype=np.float32)
+    return inputs, gt
+
+
+def bench_graph_mode(argv: list[str]):
+    """
+    Compare train steps and test forwards per second of each model
+    family, running eagerly, as graphs (`--graph_mode 1`), and as graphs
+    compiled by XLA (`--jit 1`), and count how many times they are traced
+    (batches of the last step are smaller).
+    Options: `--models linear,msn,vertical,silverballers --modes eager,graph,xla --batch_size 64 --steps 20`
+    """
+    import tensorflow as tf
+
+    import modules as M
+
+    opt = parse_options(argv, models='linear,msn,vertical,silverballers',
+                        modes='eager,graph,xla', batch_size=64, steps=20)
+    modes = {'eager': ['--graph_mode', '0'],
+             'graph': ['--graph_mode', '1'],
+             'xla': ['--jit', '1']}
+
+    structures = {'linear': M.linear.LinearStructure,
+                  'msn': M.msn.MSNAlpha,
+                  'vertical': M.vertical.VIrisAlpha,
+                  'silverballers': M.silverballers.agents.Agent47}
+
+    rows = [['model', 'mode', 'train (steps/s)', 'test (steps/s)', 'traces']]
+    for name in opt['models'].split(','):
+        for mode in opt['modes'].split(','):
+            s = structures[name](['null.py',
+                                  '--batch_size', str(opt['batch_size']),
+                                  '--save_base_dir', tempfile.gettempdir()]
+                                 + modes[mode])
+            s.model, s.optimizer = s.create_model()
+
+            batches = [make_model_inputs(s, opt['batch_size'], seed=i)
+                       for i in range(opt['steps'] - 1)]
+            batches.append(make_model_inputs(s, opt['batch_size'] // 2 + 1))
+
+            # build variables and traces
+            loss_move_average = tf.Variable(0.0, dtype=tf.float32)
+            for inputs, gt in [batches[0], batches[0], batches[-1]]:
+                s.gradient_operations(inputs, gt, loss_move_average)
+                s.model_forward(inputs, training=None)
+
+            def train():
+                for inputs, gt in batches:
+                    s.gradient_operations(inputs, gt, loss_move_average)
+
+            def test():
+                for inputs, _ in batches:
+                    s.model_forward(inputs, training=None)
+
+            train_cost, _ = timeit(train)
+            test_cost, _ = timeit(test)
+            rows.append([name, mode,
+                         '{:.1f}'.format(len(batches) / train_cost),
+                         '{:.1f}'.format(len(batches) / test_cost),
+                         sum(s.trace_counts.values())])
+
+    print_table('graph mode, batch size = {} ({} cores)'.format(
+        opt['batch_size'], os.cpu_count()), rows)
+
+
+def legacy_fft(inputs):
+    """
+    The original `FFTlayer.call` implementation.
+    """
+    import tensorflow as tf
+
+    ffts = []
+    for index in range(0, inputs.shape[-1]):
+        seq = tf.cast(tf.gather(inputs, index, axis=-1), tf.complex64)
+        ffts.append(tf.expand_dims(tf.signal.fft(seq), -1))
+
+    ffts = tf.concat(ffts, axis=-1)
+    return (tf.math.real(ffts), tf.math.imag(ffts))
+
+
+def legacy_ifft(real, imag):
+    """
+    The original `IFFTlayer.call` implementation.
+    """
+    import tensorflow as tf
+
+    ffts = []
+    for index in range(0, real.shape[-1]):
+        r = tf.gather(real, index, axis=-1)
+        i = tf.gather(imag, index, axis=-1)
+        ffts.append(tf.expand_dims(
+            tf.math.real(tf.signal.ifft(tf.complex(r, i))), axis=-1))
+
+    return tf.concat(ffts, axis=-1)
+
+
+def bench_fft(argv: list[str]):
+    """
+    Compare the batched `FFTlayer` and `IFFTlayer` with the original
+    per-channel implementations (eagerly and as graphs), and check that
+    their results are the same.
+    Options: `--shapes 1280x8x2,1280x20x4,64x20x8x4 --repeat 200`
+    """
+    import tensorflow as tf
+
+    from modules.applications.layers import FFTlayer, IFFTlayer
+
+    opt = parse_options(argv, shapes='1280x8x2,1280x20x4,64x20x8x4',
+                        repeat=200)
+    fft, ifft = FFTlayer(), IFFTlayer()
+
+    rows = [['shape', 'mode', 'legacy (us)', 'batched (us)', 'speedup']]
+    for shape in opt['shapes'].split(','):
+        shape = [int(i) for i in shape.split('x')]
+        x = tf.constant(np.random.default_rng(0).normal(size=shape),
+                        dtype=tf.float32)
+
+        def legacy(x):
+            return legacy_ifft(*legacy_fft(x))
+
+        def batched(x):
+            return ifft.call(*fft.call(x))
+
+        for r_old, r_new in zip(legacy_fft(x), fft.call(x)):
+            assert np.array_equal(r_old.numpy(), r_new.numpy())
+        assert np.array_equal(legacy(x).numpy(), batched(x).numpy())
+
+        for mode in ['eager', 'graph']:
+            funcs = [legacy, batched]
+            if mode == 'graph':
+                funcs = [tf.function(f) for f in funcs]
+                [f(x) for f in funcs]
+
+            costs = [timeit(lambda: [f(x) for _ in range(opt['repeat'])])[0]
+                     * 1e6 / opt['repeat'] for f in funcs]
+            rows.append(['x'.join([str(i) for i in shape]), mode,
+                         '{:.0f}'.format(costs[0]), '{:.0f}'.format(costs[1]),
+                         '{:.1f}x'.format(costs[0] / costs[1])])
+
+    print_table('fft + ifft of all channels', rows)
+
+
+def legacy_interpolation(index, value):
+    """
+    The original `LinearInterpolation.call` implementation.
+    """
+    import tensorflow as tf
+
+    linear_results = []
+    for output_index in range(index.shape[0] - 1):
+        p_start = index[output_index]
+        p_end = index[output_index+1]
+
+        start = tf.gather(value, output_index, axis=-2)
+        end = tf.gather(value, output_index+1, axis=-2)
+
+        for p in tf.range(p_start+1, p_end+1):
+            linear_results.append(tf.expand_dims(
+                (end - start) * (p - p_start) / (p_end - p_start)
+                + start, axis=-2))
+
+    return tf.concat(linear_results, axis=-2)
+
+
+def bench_interpolation(argv: list[str]):
+    """
+    Compare `LinearInterpolation` (with cached interpolation matrices)
+    with the original per-step implementation on `(batch, K, n, 2)`
+    key points, and check that their results are the same.
+    Options: `--indexes 11;3_7_11;0_1_2_3_4_5_6_7_8_9_10_11 --batch_size 64 --K 20 --repeat 50`
+    """
+    import tensorflow as tf
+
+    from modules.applications.layers import LinearInterpolation
+
+    opt = parse_options(argv, indexes='11;3_7_11;0_1_2_3_4_5_6_7_8_9_10_11',
+                        batch_size=64, K=20, repeat=50)
+    layer = LinearInterpolation()
+
+    rows = [['index', 'legacy (us)', 'matrix (us)', 'matrix, graph (us)',
+             'speedup (eager)']]
+    for index in opt['indexes'].split(';'):
+        points = [float(i) for i in index.split('_')]
+        pos = tf.concat([[-1.0], points], axis=0)
+        value = tf.constant(np.random.default_rng(0).normal(
+            size=[opt['batch_size'], opt['K'], len(points) + 1, 2]),
+            dtype=tf.float32)
+
+        old, new = legacy_interpolation(pos, value), layer.call(pos, value)
+        assert np.allclose(old.numpy(), new.numpy(), atol=1e-5)
+
+        def run(func, *args):
+            return timeit(lambda: [func(*args) for _ in range(opt['repeat'])]
+                          )[0] * 1e6 / opt['repeat']
+
+        # index is made inside graphs, as how models use it
+        # (the original implementation can not be traced)
+        @tf.function
+        def matrix(value):
+            return layer.call(tf.concat([[-1.0], points], 0), value)
+
+        assert np.allclose(old.numpy(), matrix(value).numpy(), atol=1e-5)
+
+        t_old = run(legacy_interpolation, pos, value)
+        t_new = run(layer.call, pos, value)
+        t_graph = run(matrix, value)
+        rows.append([index, '{:.0f}'.format(t_old), '{:.0f}'.format(t_new),
+                     '{:.0f}'.format(t_graph),
+                     '{:.1f}x'.format(t_old / t_new)])
+
+    print_table('linear interpolation, values = ({}, {}, n, 2)'.format(
+        opt['batch_size'], opt['K']), rows)
+
+
+def legacy_outer(tensorA, tensorB, M: int, N: int):
+    """
+    The original `OuterLayer.call` implementation (`reshape=False`).
+    """
+    import tensorflow as tf
+
+    _a = tf.repeat(tf.expand_dims(tensorA, axis=-1), N, axis=-1)
+    _b = tf.repeat(tf.expand_dims(tensorB, axis=-2), M, axis=-2)
+    return _a * _b
+
+
+def bench_outer(argv: list[str]):
+    """
+    Compare the original `OuterLayer` (which repeats both inputs) and
+    `MaxPooling2D` with the broadcast and the fused pooling `OuterLayer`
+    on `(batch, frames, d/2)` features (time and peak memory, each one
+    runs in a new process), and check that their results are the same.
+    Options: `--batch_sizes 64,256,1024 --frames 8 --d 128 --repeat 10`
+    """
+    import json
+    import resource
+    import subprocess
+
+    opt = parse_options(argv, batch_sizes='64,256,1024', frames=8, d=128,
+                        repeat=10, method='', batch_size=0)
+    methods = ['repeat', 'broadcast', 'repeat + pooling', 'fused pooling']
+
+    if not opt['method']:
+        rows = [['batch', 'method', 'time (ms)', 'peak memory (MB)']]
+        for batch_size in opt['batch_sizes'].split(','):
+            for method in methods:
+                out = subprocess.run(
+                    [sys.executable, __file__, 'outer',
+                     '--method', method, '--batch_size', batch_size,
+                     '--frames', str(opt['frames']), '--d', str(opt['d']),
+                     '--repeat', str(opt['repeat'])],
+                    env=dict(os.environ, TF_CPP_MIN_LOG_LEVEL='3'),
+                    check=True, capture_output=True, text=True).stdout
+                r = json.loads(out.strip().split('\n')[-1])
+                rows.append([batch_size, method,
+                             '{:.1f}'.format(r['time'] * 1e3),
+                             '{:.1f}'.format(r['memory'] / 1024)])
+
+        print_table('outer products of (batch, {}, {}) features'.format(
+            opt['frames'], opt['d'] // 2), rows)
+        return
+
+    import tensorflow as tf
+
+    from modules.silverballers.__layers import OuterLayer
+
+    M = opt['d'] // 2
+    pooling = tf.keras.layers.MaxPooling2D((2, 2), data_format='channels_first')
+    layers = {'broadcast': OuterLayer(M, M),
+              'fused pooling': OuterLayer(M, M, max_pooling=True)}
+
+    funcs = {'repeat': lambda f: legacy_outer(f, f, M, M),
+             'broadcast': lambda f: layers['broadcast'].call(f, f),
+             'repeat + pooling': lambda f: pooling(legacy_outer(f, f, M, M)),
+             'fused pooling': lambda f: layers['fused pooling'].call(f, f)}
+
+    def features(batch_size: int, seed=0):
+        return tf.constant(np.random.default_rng(seed).normal(
+            size=[batch_size, opt['frames'], M]), dtype=tf.float32)
+
+    # check results (on small inputs) and warm up
+    f = features(8, seed=1)
+    assert np.array_equal(funcs['repeat'](f), funcs['broadcast'](f))
+    assert np.array_equal(funcs['repeat + pooling'](f),
+                          funcs['fused pooling'](f))
+
+    f = features(opt['batch_size'])
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    cost, _ = timeit(funcs[opt['method']], f, repeat=opt['repeat'])
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({'time': cost, 'memory': peak - base}))
+
+
+# ----------------------------------------------------------------------------
+# Parallel dataset loading
+# ----------------------------------------------------------------------------
+
+def bench_load(argv: list[str]):
+    """
+    Time cold-cache preparation of datasets with different worker counts.
+    Caches of these datasets in `./dataset_npz` are removed before each run.
+    Options: `--datasets zara1,eth,hotel,univ3 --workers 1,2,4 --use_maps 1`
+    """
+    import shutil
+
+    from modules.models.prediction import DatasetsManager, PredictionArgs
+
+    opt = parse_options(argv, datasets='zara1,eth,hotel,univ3',
+                        workers='1,2,4', use_maps=1)
+    datasets = opt['datasets'].split(',')
+
+    rows = [['workers', 'time (s)', 'speedup']]
+    for workers in [int(w) for w in opt['workers'].split(',')]:
+        for name in datasets:
+            if os.path.exists(p := os.path.join('./dataset_npz', name)):
+                shutil.rmtree(p)
+
+        args = PredictionArgs(['null.py',
+                               '--load_workers', str(workers),
+                               '--use_maps', str(opt['use_maps']),
+                               '--save_base_dir', tempfile.gettempdir()])
+        cost, _ = timeit(DatasetsManager.load, args, datasets, mode='test')
+
+        base = cost if len(rows) == 1 else base
+        rows.append([workers, '{:.2f}'.format(cost),
+                     '{:.2f}x'.format(base / cost)])
+
+    print_table('cold-cache loading of {} ({} cores)'.format(
+        opt['datasets'], os.cpu_count()), rows)
+
+
+# ----------------------------------------------------------------------------
+# Startup
+# ----------------------------------------------------------------------------
+
+def bench_startup(argv: list[str]):
+    """
+    Time `import modules` (from another working directory) and a short
+    `main.py --model test` run in new processes.
+    Options: `--repeat 3 --epochs 1`
+    """
+    import subprocess
+
+    opt = parse_options(argv, repeat=3, epochs=1)
+    root = os.path.abspath('.')
+    env = dict(os.environ, TF_CPP_MIN_LOG_LEVEL='3')
+
+    def run(command: list[str], cwd: str):
+        subprocess.run(command, cwd=cwd, env=env, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    rows = [['command', 'time (s)']]
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cost, _ = timeit(run, [sys.executable, '-c',
+                               'import sys; sys.path.insert(0, {}); '
+                               'import modules'.format(repr(root))],
+                         temp_dir, repeat=opt['repeat'])
+        rows.append(['import modules', '{:.2f}'.format(cost)])
+
+        cost, _ = timeit(run, [sys.executable, 'main.py',
+                               '--model', 'test',
+                               '--epochs', str(opt['epochs']),
+                               '--use_maps', '0',
+                               '--step', '4',
+                               '--save_base_dir', temp_dir],
+                         root, repeat=opt['repeat'])
+        rows.append(['main.py --model test', '{:.2f}'.format(cost)])
+
+    print_table('startup (best of {} runs)'.format(opt['repeat']), rows)
+
+
+BENCHMARKS = {
+    'csv': bench_csv,
+    'scene': bench_scene,
+    'windows': bench_windows,
+    'linear': bench_linear,
+    'neighbors': bench_neighbors,
+    'agents': bench_agents,
+    'maps': bench_maps,
+    'local_maps': bench_local_maps,
+    'blend_maps': bench_blend_maps,
+    'map_workers': bench_map_workers,
+    'render_maps': bench_render_maps,
+    'tiled_maps': bench_tiled_maps,
+    'graph_mode': bench_graph_mode,
+    'fft': bench_fft,
+    'interpolation': bench_interpolation,
+    'outer': bench_outer,
+    'load': bench_load,
+    'startup': bench_startup,
+}
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] not in BENCHMARKS:
+        print('Available benchmarks:')
+        for name, func in BENCHMARKS.items():
+            print('  - `{}`: {}'.format(name, func.__doc__.strip()))
+        exit()
+
+    BENCHMARKS[sys.argv[1]](sys.argv[2:])
@@ -76,7 +76,7 @@ if __name__ == '__main__':
     for model in ['MSN', 'Vertical', 'Silverballers']:
         files = ['./modules/models/base/__args/args.py',
                  './modules/models/prediction/__args.py',
-                 './modules/{}/__args.py'.format(model)]
+                 './modules/{}/__args.py'.format(model.lower())]
         titles = ['Basic args',
                   'Prediction args',
                   '{} args'.format(model)]
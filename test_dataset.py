@@ -0,0 +1,282 @@
+"""
+@Author: Conghao Wong
+@Date: 2026-10-18 21:05:12
+@LastEditors: Conghao Wong
+@LastEditTime: 2026-10-18 21:05:12
+@Description: file content
+@Github: https://github.com/conghaowoooong
+@Copyright 2022 Conghao Wong, All Rights Reserved.
+"""
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pytest
+
+from modules.models.helpmethods import predict_linear_for_person
+from modules.models.prediction import (AgentBatch, DatasetManager,
+                                       DatasetsManager, PredictionAgent,
+                                       PredictionArgs)
+from modules.models.prediction.__spatialIndex import SpatialIndex
+from modules.models.prediction.__utils import calculate_length
+from modules.models.prediction.dataset._sceneStore import SceneStore
+from modules.models.prediction.dataset._windows import TrajectoryWindows
+from modules.models.prediction.io.__io import _get_batch_source
+
+INIT_POSITION = 10000
+
+
+def make_video_matrix(frames=80, persons=16, seed=0) -> np.ndarray:
+    """
+    Make a dense video matrix, where each person appears in one
+    continuous range of frames (some of them are too short to sample
+    any windows).
+    """
+    rng = np.random.default_rng(seed)
+    matrix = INIT_POSITION * np.ones([frames, persons, 2])
+    for person in range(persons):
+        start = rng.integers(0, frames - 2)
+        end = rng.integers(start + 1, frames + 1)
+        matrix[start:end, person] = rng.normal(0, 10, [end - start, 2])
+    return matrix
+
+
+def legacy_windows(matrix: np.ndarray, obs_frames: int, pred_frames: int,
+                   step: int, frame_step: int):
+    """
+    The original per-agent loop to sample windows on the dense matrix.
+    """
+    windows = []
+    for person in range(matrix.shape[1]):
+        base = matrix[:, person, 0]
+        diff = base[:-1] - base[1:]
+        appear = np.where(diff > INIT_POSITION/2)[0]
+        disappear = np.where(diff < -INIT_POSITION/2)[0]
+        start_frame = appear[0] + 1 if len(appear) else 0
+        end_frame = disappear[0] + 1 if len(disappear) else len(base)
+
+        for p in range(start_frame, end_frame, step * frame_step):
+            if pred_frames > 0:
+                if p + (obs_frames + pred_frames) * frame_step > end_frame:
+                    break
+                end = p + (obs_frames + pred_frames) * frame_step
+            else:
+                if p + (obs_frames + 1) * frame_step > end_frame:
+                    break
+                end = end_frame
+
+            windows.append((person, p, p + obs_frames * frame_step, end))
+    return windows
+
+
+class TestClass():
+    """
+    TestClass
+    ---
+
+    Test methods to validate if dataset caches and train samples are
+    the same as those made in the original ways.
+    """
+
+    def setup_class(self):
+        self.dataset = 'zara1'
+
+        # caches are made in a temp folder, rather than `./dataset_npz`
+        self.cache_root = DatasetManager.cache_root
+        DatasetManager.cache_root = tempfile.mkdtemp()
+        self.base_path = os.path.join(DatasetManager.cache_root, self.dataset)
+
+    def teardown_class(self):
+        shutil.rmtree(DatasetManager.cache_root)
+        DatasetManager.cache_root = self.cache_root
+
+    def get_manager(self, *args) -> DatasetManager:
+        args = PredictionArgs(['null.py', '--save_base_dir',
+                               tempfile.gettempdir()] + list(args))
+        return DatasetManager(args, self.dataset)
+
+    def test_windows(self):
+        matrix = make_video_matrix()
+        scene = SceneStore.from_matrix(matrix, np.arange(len(matrix)),
+                                       INIT_POSITION)
+        ranges = np.array([scene.valid_range(p)
+                           for p in range(scene.agent_count)])
+
+        for obs_frames, pred_frames, step, frame_step in [
+                (8, 12, 1, 1), (4, 6, 2, 3), (8, -1, 1, 2), (40, 40, 1, 1)]:
+
+            windows = TrajectoryWindows.sample(scene, ranges[:, 0],
+                                               ranges[:, 1], obs_frames,
+                                               pred_frames, step, frame_step)
+            old = legacy_windows(matrix, obs_frames, pred_frames,
+                                 step, frame_step)
+
+            new = list(zip(windows.agent_index, windows.start_frame,
+                           windows.obs_frame, windows.end_frame))
+            assert new == old
+
+            if not len(old):
+                continue
+
+            obs = [matrix[p:o:frame_step, a] for a, p, o, _ in old]
+            assert np.array_equal(windows.get_obs(), obs)
+
+            # futures with different lengths are padded with destinations
+            gt = [matrix[o:e:frame_step, a] for a, _, o, e in old]
+            length = windows.get_future_length()
+            assert np.array_equal(length, [len(g) for g in gt])
+
+            padded = windows.get_groundtruth()
+            for g, p, l in zip(gt, padded, length):
+                assert np.array_equal(p[:l], g) and np.all(p[l:] == g[-1])
+
+    def test_pred_frames(self):
+        # agents predict until the end of their trajectories, and their
+        # futures (with different lengths) are saved and loaded as a batch
+        dm = self.get_manager('--pred_frames', '-1')
+        agents = DatasetsManager(dm.args).load_fromManager(dm)
+        windows = dm.sample_windows()
+
+        length = agents.future_length
+        assert len(agents) == len(windows) and len(agents.maps) == len(agents)
+        assert np.array_equal(length, windows.get_future_length())
+        assert length.min() < length.max() == agents.groundtruth.shape[1]
+
+        # agents are the same as those made agent by agent
+        for index in range(0, len(agents), 97):
+            new, old = agents[index], windows[index]
+            assert np.array_equal(new.traj, old.traj)
+            assert np.array_equal(new.groundtruth, old.groundtruth)
+            assert np.array_equal(new.pred_linear, old.pred_linear)
+            assert new.frame_list == old.frame_list
+
+            for n_new, n_old in zip(new.get_pred_traj_neighbor_linear(),
+                                    old.get_pred_traj_neighbor_linear()):
+                assert np.allclose(n_new, n_old)
+
+        # agents are padded in the same way when batched again
+        rebuilt = AgentBatch.from_agents(list(agents[::97]))
+        steps = rebuilt.groundtruth.shape[1]
+        assert np.array_equal(rebuilt.future_length, length[::97])
+        assert np.array_equal(rebuilt.groundtruth,
+                              agents.groundtruth[::97, :steps])
+
+        # futures are padded with destinations
+        dest = _get_batch_source(agents, 'DEST')
+        assert np.array_equal(dest[:, 0], agents.groundtruth[:, -1])
+        assert np.array_equal(
+            dest[:, 0], agents.groundtruth[np.arange(len(agents)), length-1])
+
+        with pytest.raises(ValueError):
+            _get_batch_source(agents, 'GT')
+
+        # and with futures of agents that predict fixed steps
+        fixed = self.get_manager('--pred_frames', '4').sample_train_batch()
+        batch = AgentBatch.concat([agents[::2], fixed[:10], agents[1::2]])
+        assert np.array_equal(
+            batch.future_length,
+            np.concatenate([length[::2], 4 * np.ones(10), length[1::2]]))
+        assert np.array_equal(batch[len(length[::2])].groundtruth,
+                              fixed[0].groundtruth)
+
+    def test_batch_dtype(self):
+        # trajectories of agents are `float32` (as `PredictionAgent`
+        # stores them), and neighbors keep the dtype of the scene data
+        dm = self.get_manager()
+        agents = dm.sample_train_batch()
+        windows = dm.sample_windows()
+
+        for item in [agents.traj, agents.groundtruth, agents.pred_linear]:
+            assert item.dtype == np.float32
+        assert agents.all_neighbor_traj.dtype == dm.scene.positions.dtype
+
+        obs = windows.get_obs()
+        assert np.array_equal(agents.traj, obs.astype(np.float32))
+        assert np.array_equal(agents.groundtruth,
+                              windows.get_groundtruth().astype(np.float32))
+
+        # linear predictions are the same as those made agent by agent
+        for index in range(0, len(agents), 97):
+            agent = PredictionAgent()
+            agent.traj = obs[index]
+            agent.pred_linear = predict_linear_for_person(
+                agent.traj, time_pred=agents.total_frame)[agents.obs_length:]
+
+            assert np.array_equal(agents[index].traj, agent.traj)
+            assert np.array_equal(agents.pred_linear[index], agent.pred_linear)
+
+    def test_spatial_index(self):
+        rng = np.random.default_rng(0)
+        for case in range(300):
+            n = int(rng.integers(0, 3 * SpatialIndex.brute_force_limit))
+            k = int(rng.integers(1, 20))
+
+            # points on a line, with repeated points (equal distances),
+            # and with far away points (sparse areas)
+            positions = rng.uniform(0, 50, [n, 2])
+            if case % 3 == 1:
+                positions[:, 1] = 0.0
+            if case % 3 == 2:
+                positions = np.round(positions / 10)
+            if case % 5 == 0 and n:
+                positions[0] = [1000.0, -1000.0]
+
+            # queries inside and outside the grid
+            queries = np.concatenate([positions[:10],
+                                      rng.uniform(-100, 150, [5, 2])])
+
+            index, distance = SpatialIndex(positions).query(queries, k)
+
+            for q, point in enumerate(queries):
+                dis = calculate_length(positions - point)
+                order = np.argsort(dis, kind='stable')[:k]
+                assert np.array_equal(index[q, :len(order)], order)
+                assert np.array_equal(distance[q, :len(order)], dis[order])
+
+                # less than `k` points
+                assert np.all(index[q, len(order):] == -1)
+                assert np.all(distance[q, len(order):] == np.inf)
+
+    def test_spatial_index_empty(self):
+        index, distance = SpatialIndex(np.zeros([0, 2])).query(
+            np.ones([3, 2]), k=4)
+        assert index.shape == (3, 4) and np.all(index == -1)
+        assert np.all(distance == np.inf)
+
+        index, _ = SpatialIndex(np.ones([100, 2])).query(np.zeros([0, 2]), 4)
+        assert index.shape == (0, 4)
+
+    def test_concat_empty_batches(self):
+        def batch(n: int) -> AgentBatch:
+            return AgentBatch(traj=np.ones([n, 8, 2]),
+                              groundtruth=np.ones([n, 12, 2]),
+                              frame_list=np.ones([n, 20]))
+
+        # all subsets give no windows
+        empty = AgentBatch.concat([batch(0), batch(0)])
+        assert len(empty) == 0
+
+        agents = AgentBatch.concat([batch(0), batch(3), batch(0)])
+        assert len(agents) == 3
+
+    def test_legacy_npz_is_rebuilt(self):
+        # a stale `data.npz` (left by older versions) without any
+        # manifest record should not be trusted
+        if os.path.exists(self.base_path):
+            shutil.rmtree(self.base_path)
+
+        os.makedirs(self.base_path)
+        npz_path = os.path.join(self.base_path, 'data.npz')
+        np.savez(npz_path,
+                 video_matrix=np.zeros([3, 2, 2]),
+                 frame_list=np.arange(3))
+
+        scene = self.get_manager().load_data().scene
+        assert not os.path.exists(npz_path)
+
+        shutil.rmtree(self.base_path)
+        fresh = self.get_manager().load_data().scene
+        assert np.array_equal(scene.frame_list, fresh.frame_list)
+        assert np.array_equal(scene.positions, fresh.positions)
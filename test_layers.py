@@ -0,0 +1,168 @@
+"""
+@Author: Conghao Wong
+@Date: 2026-10-18 22:10:37
+@LastEditors: Conghao Wong
+@LastEditTime: 2026-10-18 22:10:37
+@Description: file content
+@Github: https://github.com/conghaowoooong
+@Copyright 2022 Conghao Wong, All Rights Reserved.
+"""
+
+import numpy as np
+import pytest
+import tensorflow as tf
+
+from modules.applications import layers
+from modules.silverballers.__layers import OuterLayer
+from modules.vertical import __layers as vertical_layers
+from modules.vertical.__utils import Utils
+
+
+def legacy_fft(inputs):
+    """
+    The original `FFTlayer.call`, which runs fft channel by channel.
+    """
+    ffts = []
+    for index in range(0, inputs.shape[-1]):
+        seq = tf.cast(tf.gather(inputs, index, axis=-1), tf.complex64)
+        ffts.append(tf.expand_dims(tf.signal.fft(seq), -1))
+
+    ffts = tf.concat(ffts, axis=-1)
+    return (tf.math.real(ffts), tf.math.imag(ffts))
+
+
+def legacy_ifft(real, imag):
+    """
+    The original `IFFTlayer.call`, which runs ifft channel by channel.
+    """
+    ffts = []
+    for index in range(0, real.shape[-1]):
+        r = tf.gather(real, index, axis=-1)
+        i = tf.gather(imag, index, axis=-1)
+        ffts.append(tf.expand_dims(
+            tf.math.real(tf.signal.ifft(tf.complex(r, i))), axis=-1))
+
+    return tf.concat(ffts, axis=-1)
+
+
+def legacy_interpolation(index, value):
+    """
+    The original `LinearInterpolation.call`, which computes each
+    output step one by one.
+    """
+    linear_results = []
+    for output_index in range(index.shape[0] - 1):
+        p_start = index[output_index]
+        p_end = index[output_index+1]
+
+        start = tf.gather(value, output_index, axis=-2)
+        end = tf.gather(value, output_index+1, axis=-2)
+
+        for p in tf.range(p_start+1, p_end+1):
+            linear_results.append(tf.expand_dims(
+                (end - start) * (p - p_start) / (p_end - p_start)
+                + start, axis=-2))
+
+    return tf.concat(linear_results, axis=-2)
+
+
+def legacy_outer(tensorA, tensorB, M: int, N: int):
+    """
+    The original `OuterLayer.call` (`reshape=False`), which repeats
+    both inputs before multiplying them.
+    """
+    _a = tf.repeat(tf.expand_dims(tensorA, axis=-1), N, axis=-1)
+    _b = tf.repeat(tf.expand_dims(tensorB, axis=-2), M, axis=-2)
+    return _a * _b
+
+
+class TestClass():
+    """
+    TestClass
+    ---
+
+    Test methods to validate if layers give the same results as their
+    original implementations.
+    """
+
+    def setup_class(self):
+        self.rng = np.random.default_rng(0)
+
+    def random(self, shape: list[int]) -> tf.Tensor:
+        return tf.constant(self.rng.normal(size=shape), dtype=tf.float32)
+
+    def test_fft(self):
+        fft, ifft = layers.FFTlayer(), layers.IFFTlayer()
+
+        # (batch, steps, dim) and (batch, K, steps, dim) inputs
+        for shape in [[16, 8, 2], [16, 20, 4], [4, 20, 8, 4], [3, 1, 5, 1]]:
+            x = self.random(shape)
+
+            for old, new in zip(legacy_fft(x), fft(x)):
+                assert np.array_equal(old.numpy(), new.numpy())
+
+            real, imag = self.random(shape), self.random(shape)
+            assert np.array_equal(legacy_ifft(real, imag).numpy(),
+                                  ifft(real, imag).numpy())
+
+        # vertical models use the same layers
+        assert vertical_layers.FFTlayer is layers.FFTlayer
+        assert vertical_layers.IFFTlayer is layers.IFFTlayer
+
+    def test_interpolation(self):
+        layer = layers.LinearInterpolation()
+
+        for points in [[11.0], [3.0, 7.0, 11.0], [0.0, 2.0],
+                       [float(i) for i in range(12)]]:
+            index = tf.constant([-1.0] + points)
+            for shape in [[len(index), 2], [8, 20, len(index), 2]]:
+                value = self.random(shape)
+                old = legacy_interpolation(index, value).numpy()
+
+                assert np.allclose(layer(index, value).numpy(), old,
+                                   atol=1e-5)
+                assert np.allclose(Utils.LinearInterpolation(index, value),
+                                   old, atol=1e-5)
+
+                # indexes made inside graphs are known when tracing
+                @tf.function
+                def interpolate(value):
+                    return layer(tf.concat([[-1.0], points], 0), value)
+
+                assert np.allclose(interpolate(value).numpy(), old,
+                                   atol=1e-5)
+
+        # indexes that are only known when running graphs
+        @tf.function
+        def interpolate(index, value):
+            return layer(index, value)
+
+        with pytest.raises(ValueError):
+            interpolate(tf.constant([-1.0, 3.0]), self.random([8, 2, 2]))
+
+    def test_outer(self):
+        pooling = tf.keras.layers.MaxPooling2D((2, 2),
+                                               data_format='channels_first')
+
+        # even and odd dimensions
+        for M, N in [(64, 64), (8, 6), (7, 9), (1, 4)]:
+            a, b = self.random([16, 8, M]), self.random([16, 8, N])
+            old = legacy_outer(a, b, M, N)
+
+            assert np.array_equal(OuterLayer(M, N)(a, b).numpy(),
+                                  old.numpy())
+            assert np.array_equal(
+                OuterLayer(M, N, reshape=True)(a, b).numpy(),
+                tf.reshape(old, [16, 8, M*N]).numpy())
+
+            # the fused pooling
+            if M < 2 or N < 2:
+                continue
+
+            old = pooling(old)
+            assert np.array_equal(
+                OuterLayer(M, N, max_pooling=True)(a, b).numpy(),
+                old.numpy())
+            assert np.array_equal(
+                OuterLayer(M, N, reshape=True, max_pooling=True)(a, b).numpy(),
+                tf.reshape(old, [16, 8, (M//2) * (N//2)]).numpy())
@@ -0,0 +1,237 @@
+"""
+@Author: Conghao Wong
+@Date: 2026-10-18 21:40:26
+@LastEditors: Conghao Wong
+@LastEditTime: 2026-10-18 21:40:26
+@Description: file content
+@Github: https://github.com/conghaowoooong
+@Copyright 2022 Conghao Wong, All Rights Reserved.
+"""
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from modules.models.prediction import (AgentBatch, DatasetManager,
+                                       MapManager, MapStore, PredictionArgs,
+                                       TiledMap)
+from modules.models.prediction.__maps import get_mask
+
+
+class LegacyMapManager(MapManager):
+    """
+    The map manager that adds masks point by point with `_add_one_traj`
+    (the original way to render maps).
+    """
+
+    def _add_to_map(self, target_map: np.ndarray,
+                    grid_trajs: np.ndarray,
+                    amplitude: np.ndarray = 1,
+                    radius: np.ndarray = 0,
+                    add_mask=None,
+                    max_limit=False,
+                    decay=True):
+
+        if len(grid_trajs.shape) == 2:
+            grid_trajs = grid_trajs[np.newaxis, :, :]
+
+        n_traj = grid_trajs.shape[0]
+        amplitude = np.array(amplitude)
+        if not len(amplitude.shape):
+            amplitude = amplitude * \
+                np.ones([n_traj, grid_trajs.shape[-2]], dtype=np.int32)
+            radius = radius * np.ones(n_traj, dtype=np.int32)
+
+        target_map = target_map.copy()
+        for traj, a, r in zip(grid_trajs, amplitude, radius):
+            add_mask = get_mask(add_mask, int(r))
+            target_map = self._add_one_traj(target_map, traj, a, int(r),
+                                            add_mask,
+                                            max_limit=max_limit,
+                                            amplitude_decay=decay)
+        return target_map
+
+
+def legacy_cut_map(maps: np.ndarray, centers: np.ndarray,
+                   half_size: int) -> np.ndarray:
+    """
+    The original `cut_map`, which cuts windows of maps one by one.
+    """
+    a, b = maps.shape[-2:]
+    centers = np.maximum(np.array(centers).astype(np.int32), half_size)
+    centers = np.array([np.minimum(centers[:, 0], a - half_size),
+                        np.minimum(centers[:, 1], b - half_size)]).T
+
+    return np.array([m[x-half_size:x+half_size, y-half_size:y+half_size]
+                     for m, (x, y) in zip(maps, centers)])
+
+
+class TestClass():
+    """
+    TestClass
+    ---
+
+    Test methods to validate if context maps are the same as those
+    made in the original ways.
+    """
+
+    def setup_class(self):
+        # caches are made in a temp folder, rather than `./dataset_npz`
+        self.cache_root = DatasetManager.cache_root
+        DatasetManager.cache_root = tempfile.mkdtemp()
+
+        self.args = PredictionArgs(['null.py', '--save_base_dir',
+                                    tempfile.gettempdir()])
+        self.agents = DatasetManager(self.args, 'zara1').sample_train_batch()
+        self.agents = self.agents[:200]
+
+        self.manager = MapManager(self.args, self.agents)
+        self.legacy = LegacyMapManager(self.args, self.agents)
+
+    def teardown_class(self):
+        shutil.rmtree(DatasetManager.cache_root)
+        DatasetManager.cache_root = self.cache_root
+
+    def test_social_maps(self):
+        for agent in self.agents:
+            neighbors = np.array(agent.get_pred_traj_neighbor_linear())
+            for n in [neighbors, np.zeros([0, self.args.pred_frames, 2])]:
+                assert np.allclose(self.manager.build_social_map(agent, n),
+                                   self.legacy.build_social_map(agent, n),
+                                   atol=1e-5)
+
+    def test_batch_maps(self, monkeypatch):
+        # maps of a batch are the same as those of a list of agents
+        agents = list(self.agents)
+        old = MapManager(self.args, agents)
+        old_map = old.build_guidance_map(agents)
+        old_tiles = old.build_tiled_guidance_map(agents, 64)
+
+        # and they are built from arrays of the batch, without making
+        # agent objects one by one
+        def make_agent(*args):
+            raise AssertionError('agent objects should not be made')
+
+        monkeypatch.setattr(AgentBatch, '_get_agent', make_agent)
+
+        manager = MapManager(self.args, self.agents)
+        assert np.array_equal(manager.real2grid_paras, old.real2grid_paras)
+        assert np.array_equal(manager.build_guidance_map(self.agents),
+                              old_map)
+        assert np.array_equal(
+            manager.build_tiled_guidance_map(self.agents, 64).to_dense(),
+            old_tiles.to_dense())
+
+    def test_guidance_map(self):
+        assert np.allclose(self.manager.build_guidance_map(self.agents),
+                           self.legacy.build_guidance_map(self.agents),
+                           atol=1e-5)
+
+        # points whose masks are partly outside the map are not added
+        shape = np.array(self.manager.void_map.shape)
+        rng = np.random.default_rng(0)
+        grids = rng.uniform(-5, shape + 5, [50, 8, 2])
+        assert np.any((grids < 7) | (grids + 8 >= shape))
+
+        trajs = grids / self.manager.W + self.manager.b
+        assert np.allclose(self.manager.build_guidance_map(trajs),
+                           self.legacy.build_guidance_map(trajs),
+                           atol=1e-5)
+
+    def test_local_social_maps(self):
+        h = self.args.map_half_size
+        shape = np.array(self.manager.void_map.shape)
+        centers = self.manager.real2grid(self.agents.traj[:, -1, :])
+
+        # windows on the borders of (or outside) the map are clipped
+        rng = np.random.default_rng(0)
+        centers[::3] = rng.integers(-20, shape + 20, [len(centers[::3]), 2])
+
+        for agent, center in zip(self.agents, centers):
+            neighbors = np.array(agent.get_pred_traj_neighbor_linear())
+            for n in [neighbors, np.zeros([0, self.args.pred_frames, 2])]:
+                full = self.manager.build_social_map(agent, n)
+                cut = self.manager.cut_map(full[np.newaxis],
+                                           center[np.newaxis], h)[0]
+                local = self.manager.build_local_social_map(agent, n,
+                                                            center, h)
+                assert np.array_equal(local, cut)
+
+    def test_cut_map(self):
+        rng = np.random.default_rng(0)
+        h = 20
+        traj_map = rng.random([100, 75]).astype(np.float32)
+        maps = rng.random([30, 100, 75]).astype(np.float32)
+
+        # centers inside, on the borders of, and outside the map
+        centers = rng.integers(-10, [110, 85], [30, 2])
+        centers[:4] = [[0, 0], [99, 74], [h, h], [100 - h, 75 - h]]
+
+        repeated = np.repeat(traj_map[np.newaxis], len(centers), axis=0)
+        cuts = legacy_cut_map(repeated, centers, h)
+
+        # one shared map, and one map for each center
+        assert np.array_equal(MapManager.cut_map(traj_map, centers, h), cuts)
+        assert np.array_equal(MapManager.cut_map(maps, centers, h),
+                              legacy_cut_map(maps, centers, h))
+
+        # blend windows chunk by chunk (with a smaller last chunk)
+        social_maps = rng.random([30, 2*h, 2*h]).astype(np.float32)
+        blended = MapManager.blend_maps(traj_map, social_maps.copy(),
+                                        centers, h, chunk_size=7)
+        assert np.array_equal(blended, 0.5 * cuts + 0.5 * social_maps)
+
+    def test_stored_maps(self):
+        # maps are stored without changing their values by default
+        rng = np.random.default_rng(0)
+        maps = rng.random([10, 20, 20]).astype(np.float32)
+        stored = MapStore.quantize(maps, self.args.map_dtype)
+        assert np.array_equal(MapStore.dequantize(stored), maps)
+
+        # and with bounded errors when quantized into `uint8`
+        stored = MapStore.quantize(maps, 'uint8')
+        error = np.abs(MapStore.dequantize(stored) - maps).max()
+        assert error <= 0.5 / 255 + 1e-7
+
+    def test_tiled_map(self):
+        # trajectories walk around several small areas of a large scene
+        rng = np.random.RandomState(0)
+        places = rng.uniform(0, 200, [4, 2])
+        places[:2] = [[0, 0], [200, 200]]
+        starts = (places[rng.randint(4, size=300)] +
+                  rng.uniform(-10, 10, [300, 2]))
+        trajs = (starts[:, np.newaxis, :] +
+                 np.cumsum(rng.normal(0, 0.4, [300, 8, 2]), axis=1))
+
+        manager = MapManager(self.args, trajs)
+        dense = manager.build_guidance_map(trajs)
+        shape = np.array(dense.shape)
+
+        # tiles on the borders of the map are only partly used
+        tile_size = 64
+        assert np.any(shape % tile_size)
+
+        tiled = manager.build_tiled_guidance_map(trajs, tile_size)
+        assert len(tiled.tiles) < np.prod(tiled.grid_shape)
+        assert np.allclose(tiled.to_dense(), dense, atol=1e-6)
+
+        h = self.args.map_half_size
+        centers = np.concatenate([manager.real2grid(trajs[:, -1, :]),
+                                  rng.randint(-20, shape + 20, [50, 2])])
+        assert np.allclose(MapManager.cut_map(tiled, centers, h),
+                           MapManager.cut_map(dense, centers, h),
+                           atol=1e-6)
+
+        # tiles are saved in the same way as `cv2.imwrite(255 * map)`
+        with tempfile.TemporaryDirectory() as base_path:
+            path = os.path.join(base_path, 'tiles.npz')
+            tiled.quantize().save(path)
+            loaded = TiledMap.load(path)
+
+        quantized = np.clip(np.round(255 * dense), 0, 255)
+        assert np.array_equal(loaded.to_dense(), quantized)
+        assert np.allclose(loaded.dequantize().cut(centers, h),
+                           MapManager.cut_map(quantized / 255, centers, h),
+                           atol=1e-6)